@@ -1,8 +1,10 @@
+import base64
 import datetime
 import json
 import re
 import requests
 import threading
+import urllib.parse
 from enum import Enum
 
 from app.callback import callback_manager, EventName
@@ -22,7 +24,63 @@ column_types = {
 sql_manager.create_table(AccountTable.TABLE_NAME, column_types)
 
 
+class SessionState(Enum):
+    UNKNOWN = 'unknown'
+    ALIVE = 'alive'
+    SUSPECT = 'suspect'
+    EXPIRED = 'expired'
+
+
+class SteamWebToken:
+    def __init__(self, token: str, expires_at: datetime.datetime | None = None):
+        self.token = token
+        self.expires_at = expires_at or self.get_expires_at(token)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> expires_at: {self.expires_at}'
+
+    @staticmethod
+    def get_expires_at(token: str) -> datetime.datetime | None:
+        # JWT: header.payload.signature, срок жизни — поле exp (unix time) в payload
+        if not token: return None
+        try:
+            payload = token.split('.')[1]
+            payload_json = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            return datetime.datetime.fromtimestamp(int(payload_json['exp']))
+        except Exception:
+            return None
+
+    @classmethod
+    def create_from_save_data(cls, save_data: dict) -> 'SteamWebToken | None':
+        if not save_data or not save_data.get('token'): return None
+        expires_at = save_data.get('expires_at')
+        return cls(save_data['token'], datetime.datetime.fromtimestamp(expires_at) if expires_at else None)
+
+    def get_save_data(self) -> dict:
+        return {
+            'token': self.token,
+            'expires_at': int(self.expires_at.timestamp()) if self.expires_at else None,
+        }
+
+    def is_valid(self, margin: datetime.timedelta = datetime.timedelta(0)) -> bool:
+        # Срок без exp неизвестен: токен считается рабочим, пока Steam не ответит ошибкой авторизации
+        if not self.token: return False
+        if not self.expires_at: return True
+        return self.expires_at - margin > datetime.datetime.now()
+
+    def get_refresh_delay(self, margin: datetime.timedelta) -> float | None:
+        if not self.expires_at: return None
+        return max(0.0, (self.expires_at - margin - datetime.datetime.now()).total_seconds())
+
+
 class Account:
+    session_alive_ttl = datetime.timedelta(minutes=5)
+    session_expired_ttl = datetime.timedelta(seconds=30)
+    web_token_expiry_margin = datetime.timedelta(minutes=1)
+    web_token_refresh_margin = datetime.timedelta(minutes=30)
+    web_token_retry_delay = 60
+    web_token_retry_max_delay = 30 * 60
+
     def __init__(self):
         self.password = None
         self.steam_id = None
@@ -32,41 +90,125 @@ class Account:
         self.wallet_currency: int | None = None
         self.wallet_country: str | None = None
 
-        self.__access_token = None
+        self.__web_token: SteamWebToken | None = None
+        self.__web_token_timer: threading.Timer | None = None
+        self.__web_token_failures = 0
         self.__wallet_info: dict | None = None
         self.__lock = threading.Lock()
-        self.__last_check_status = None
+        self.__session_state = SessionState.UNKNOWN
         self.__last_check_time = datetime.datetime.min
         self.__lock_check_session = threading.Lock()
 
     def is_alive_session(self, is_callback: bool = True) -> bool:
+        # Состояние проверяется запросом не чаще раза в session_alive_ttl; раньше — только если ответ обычного запроса
+        # похож на разлогин (см. on_response). Одновременные вызовы ждут одну проверку
         with self.__lock_check_session:
-            if self.__last_check_status and self.__last_check_time + datetime.timedelta(seconds=30) > datetime.datetime.now():
-                return self.__last_check_status
-            self.__last_check_time = datetime.datetime.now()
+            now = datetime.datetime.now()
+            if self.__session_state == SessionState.ALIVE and self.__last_check_time + self.session_alive_ttl > now: return True
+            if self.__session_state == SessionState.EXPIRED and self.__last_check_time + self.session_expired_ttl > now: return False
 
-            req = self.session.get("https://steamcommunity.com")
-            self.__last_check_status = req.ok and self.account_name.lower() in req.text.lower()
-            if is_callback and not self.__last_check_status: callback_manager.trigger(EventName.ON_ACCOUNT_SESSION_EXPIRED, self)
-            print(f'is_alive_session: {self.__last_check_status}')
-            return self.__last_check_status
+            is_alive = self.__probe_session()
+            if is_alive is None: return self.__session_state == SessionState.ALIVE
+            was_expired = self.__session_state == SessionState.EXPIRED
+            self.__session_state = SessionState.ALIVE if is_alive else SessionState.EXPIRED
+            self.__last_check_time = now
+            if is_callback and not is_alive and not was_expired: callback_manager.trigger(EventName.ON_ACCOUNT_SESSION_EXPIRED, self)
+            print(f'is_alive_session: {is_alive}')
+            return is_alive
 
-    def get_steam_web_token(self):
+    def get_session_state(self) -> SessionState:
+        return self.__session_state
+
+    def on_response(self, response: requests.Response):
+        # Пассивная проверка: разлогиненную сессию steamcommunity.com отправляет на страницу входа или отвечает 401/403.
+        # Сессия не считается истёкшей сразу, следующий is_alive_session перепроверит её
+        if not isinstance(response.url, str): return
+        url = urllib.parse.urlparse(response.url)
+        if url.hostname != 'steamcommunity.com': return
+        if response.status_code in (401, 403) or url.path.startswith('/login'):
+            if self.__session_state == SessionState.ALIVE: self.__session_state = SessionState.SUSPECT
+
+    def __probe_session(self) -> bool | None:
+        # Небольшой JSON вместо главной страницы; None — сеть недоступна, состояние не меняется
+        try:
+            response = self.session.get('https://steamcommunity.com/chat/clientjstoken', timeout=10)
+            if not response.ok: return False
+            data = response.json()
+        except requests.RequestException:
+            return None
+        except Exception:
+            return False
+        if not data.get('logged_in', False): return False
+        return not self.steam_id or str(data.get('steamid', '')) == str(self.steam_id)
+
+    def get_steam_web_token(self, force_refresh: bool = False) -> str | None:
+        # Токен берётся из памяти или сохранённых данных аккаунта, страница профиля загружается только
+        # когда токена нет или он истёк. Обновление до истечения выполняется в фоне
         with self.__lock:
-            if self.__access_token: return self.__access_token
-            if not self.is_alive_session(): return
-            try:
-                response = self.session.get('https://steamcommunity.com/my/', timeout=10)
+            if not force_refresh and self.__web_token and self.__web_token.is_valid(self.web_token_expiry_margin):
+                if not self.__web_token_timer: self.__schedule_web_token_refresh()
+                return self.__web_token.token
+            web_token = self.__load_steam_web_token()
+            if not web_token:
+                if not self.__web_token: return None
+                is_valid = self.__web_token.is_valid(self.web_token_expiry_margin)
+                if not is_valid or self.__session_state == SessionState.EXPIRED:
+                    # Сессия мертва или токен уже истёк: фоновые попытки прекращаются, токен загрузится при следующем запросе
+                    self.__cancel_web_token_refresh()
+                    return self.__web_token.token if is_valid else None
+                # Старый токен остаётся в работе до истечения, повтор с экспоненциальной задержкой
+                self.__web_token_failures += 1
+                delay = min(self.web_token_retry_delay * 2 ** (self.__web_token_failures - 1), self.web_token_retry_max_delay)
+                self.__schedule_web_token_refresh(delay=delay)
+                return self.__web_token.token
+            self.__web_token = web_token
+            self.__web_token_failures = 0
+            self.__schedule_web_token_refresh()
+        self.save()
+        return web_token.token
 
-                token_pattern = re.compile(r'loyalty_webapi_token\s*=\s*"([^"]+)"')
-                match = token_pattern.search(response.text)
+    def invalidate_steam_web_token(self, token: str = None):
+        # Вызывается при ошибке авторизации Web API; токен, уже обновлённый другим потоком, не сбрасывается
+        with self.__lock:
+            if not self.__web_token: return
+            if token and self.__web_token.token != token: return
+            self.__web_token = None
+
+    def __load_steam_web_token(self) -> SteamWebToken | None:
+        if not self.is_alive_session(): return None
+        try:
+            response = self.session.get('https://steamcommunity.com/my/', timeout=10)
 
-                if match:
-                    token = match.group(1).replace('&quot;', '')
-                    self.__access_token = token
-                    return token
-            except:
-                return None
+            token_pattern = re.compile(r'loyalty_webapi_token\s*=\s*"([^"]+)"')
+            match = token_pattern.search(response.text)
+            if not match: return None
+            return SteamWebToken(match.group(1).replace('&quot;', ''))
+        except:
+            return None
+
+    def stop_web_token_refresh(self):
+        # Вызывается при выходе из аккаунта или переключении на другой
+        with self.__lock:
+            self.__cancel_web_token_refresh()
+            self.__web_token_failures = 0
+
+    def __cancel_web_token_refresh(self):
+        if self.__web_token_timer: self.__web_token_timer.cancel()
+        self.__web_token_timer = None
+
+    def __schedule_web_token_refresh(self, delay: float = None):
+        self.__cancel_web_token_refresh()
+        if delay is None and self.__web_token: delay = self.__web_token.get_refresh_delay(self.web_token_refresh_margin)
+        if delay is None: return
+        self.__web_token_timer = threading.Timer(delay, self.__refresh_web_token)
+        self.__web_token_timer.daemon = True
+        self.__web_token_timer.start()
+
+    def __refresh_web_token(self):
+        try:
+            self.get_steam_web_token(force_refresh=True)
+        except Exception as e:
+            print(f"Error refreshing web token: {e}")
 
     def load_wallet_info(self):
         if self.__wallet_info: return self.__wallet_info
@@ -93,7 +235,8 @@ class Account:
             'password': self.password,
             'steam_id': self.steam_id,
             'refresh_token': self.refresh_token,
-            'session': self.session
+            'session': self.session,
+            'web_token': self.__web_token.get_save_data() if self.__web_token else None,
         }
 
     def set_save_data(self, data: dict):
@@ -103,6 +246,7 @@ class Account:
         self.refresh_token = data.get('refresh_token', None)
         session = data.get('session', None)
         if session: self.session = session
+        self.__web_token = SteamWebToken.create_from_save_data(data.get('web_token', None))
         return self
 
     def save(self):
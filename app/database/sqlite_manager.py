@@ -2,6 +2,7 @@ import json
 import pickle
 import sqlite3
 import threading
+import time
 import zlib
 from enum import Enum
 
@@ -19,15 +20,77 @@ tables_structure = {
             market_hash_name    TEXT UNIQUE,
             nameid              INTEGER
         ''',
+    'market_price_history':
+        '''
+            appid               INTEGER,
+            hash_name           TEXT,
+            time                INTEGER,
+            sell_price          INTEGER,
+            sell_listings       INTEGER
+        ''',
+    'market_price_item':
+        '''
+            appid               INTEGER,
+            hash_name           TEXT,
+            time                INTEGER,
+            item                TEXT,
+            UNIQUE (appid, hash_name)
+        ''',
+    'sell_job':
+        '''
+            id                  INTEGER PRIMARY KEY AUTOINCREMENT,
+            steam_id            TEXT,
+            appid               INTEGER,
+            contextid           INTEGER,
+            assetid             TEXT,
+            amount              INTEGER,
+            price               INTEGER,
+            name                TEXT,
+            status              TEXT,
+            attempts            INTEGER,
+            result              TEXT,
+            time_created        INTEGER,
+            time_updated        INTEGER
+        ''',
+    'market_history_event':
+        '''
+            steam_id            TEXT,
+            listingid           TEXT,
+            purchaseid          TEXT,
+            time_event          INTEGER,
+            event_type          INTEGER,
+            appid               INTEGER,
+            market_hash_name    TEXT,
+            amount              INTEGER,
+            price               INTEGER,
+            event               TEXT,
+            UNIQUE (steam_id, listingid, purchaseid, time_event, event_type)
+        ''',
+    'market_history_backfill':
+        '''
+            steam_id            TEXT UNIQUE,
+            start               INTEGER,
+            is_finished         INTEGER,
+            time_updated        INTEGER
+        ''',
+}
+
+indexes_structure = {
+    'idx_market_price_history_item': 'market_price_history (appid, hash_name, time)',
+    'idx_market_price_history_time': 'market_price_history (appid, time)',
+    'idx_sell_job_status': 'sell_job (steam_id, status)',
+    'idx_market_history_event_time': 'market_history_event (steam_id, time_event)',
 }
 
 
 class SqliteDatabaseManager:
-    def __init__(self):
-        self.db_name = 'data.db'
+    def __init__(self, db_name: str = 'data.db'):
+        self.db_name = db_name
         self._secret_key = None
         self.__db_lock = threading.Lock()
         self.__create_all_tables()
+        # item_nameid не меняются, поэтому держим их в памяти и не ходим в базу на каждый запрос
+        self.__item_nameids: dict[str, int] = {market_hash_name: nameid for market_hash_name, nameid in self.item_nameid_all_get() or []}
 
     def __connect(self):
         return sqlite3.connect(self.db_name, check_same_thread=False)
@@ -47,6 +110,12 @@ class SqliteDatabaseManager:
     def __create_all_tables(self) -> None:
         for table_name in tables_structure:
             self.__create_table(table_name, tables_structure[table_name])
+        for index_name in indexes_structure:
+            try:
+                with self.__connect() as conn:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {indexes_structure[index_name]};")
+            except sqlite3.OperationalError:
+                pass
 
     def save_data(self, table_name: str, data: dict) -> bool:
         try:
@@ -102,9 +171,21 @@ class SqliteDatabaseManager:
                 with self.__connect() as conn:
                     cursor = conn.cursor()
                     cursor.execute("INSERT OR REPLACE INTO item_nameid (market_hash_name, nameid) VALUES (?, ?)", (f'{appid}__{market_hash_name}', nameid))
+                self.__item_nameids[f'{appid}__{market_hash_name}'] = int(nameid)
             except Exception:
                 logger.exception(f"Ошибка при сохранении item_nameid {appid}__{market_hash_name} {nameid}")
 
+    def item_nameid_save_many(self, appid: int | str, nameids: dict[str, int | str]):
+        nameids = {f'{appid}__{market_hash_name}': int(nameid) for market_hash_name, nameid in nameids.items() if market_hash_name and nameid}
+        if not appid or not nameids: return
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    conn.executemany("INSERT OR REPLACE INTO item_nameid (market_hash_name, nameid) VALUES (?, ?)", nameids.items())
+                self.__item_nameids.update(nameids)
+            except Exception:
+                logger.exception(f"Ошибка при сохранении item_nameid {appid} ({len(nameids)} шт.)")
+
     def item_nameid_del(self, appid: int | str, market_hash_name: str):
         if not appid or not market_hash_name: return
         with self.__db_lock:
@@ -112,32 +193,223 @@ class SqliteDatabaseManager:
                 with self.__connect() as conn:
                     cursor = conn.cursor()
                     cursor.execute("DELETE FROM item_nameid WHERE market_hash_name=?", (f'{appid}__{market_hash_name}',))
+                self.__item_nameids.pop(f'{appid}__{market_hash_name}', None)
             except Exception:
                 logger.exception(f"Ошибка при удалении item_nameid {appid}__{market_hash_name}")
 
     def item_nameid_get(self, appid: int | str, market_hash_name: str):
         if not appid or not market_hash_name: return
+        return self.__item_nameids.get(f'{appid}__{market_hash_name}')
+
+    def item_nameid_missing_get(self, appid: int | str, market_hash_names: list[str]) -> list[str]:
+        return [market_hash_name for market_hash_name in dict.fromkeys(market_hash_names) if market_hash_name and f'{appid}__{market_hash_name}' not in self.__item_nameids]
+
+    def item_nameid_all_get(self):
         with self.__db_lock:
             try:
                 with self.__connect() as conn:
                     cursor = conn.cursor()
-                    cursor.execute("SELECT nameid FROM item_nameid WHERE market_hash_name=?", (f'{appid}__{market_hash_name}',))
-                    row = cursor.fetchone()
-                    if row:
-                        return row[0]
-                    return None
+                    cursor.execute("SELECT * FROM item_nameid")
+                    return cursor.fetchall()
+            except Exception:
+                logger.exception(f"Ошибка при получении приложений")
+
+    def market_price_save(self, appid: int | str, time: int, rows: list[tuple[str, int, int, str]]):
+        # rows: (hash_name, sell_price, sell_listings, item_json), вся выборка пишется одной транзакцией
+        if not appid or not rows: return
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    conn.executemany(
+                        "INSERT INTO market_price_history (appid, hash_name, time, sell_price, sell_listings) VALUES (?, ?, ?, ?, ?)",
+                        [(int(appid), hash_name, time, sell_price, sell_listings) for hash_name, sell_price, sell_listings, _ in rows]
+                    )
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO market_price_item (appid, hash_name, time, item) VALUES (?, ?, ?, ?)",
+                        [(int(appid), hash_name, time, item_json) for hash_name, _, _, item_json in rows]
+                    )
             except Exception:
-                logger.exception(f"Ошибка при получении item_nameid {appid}__{market_hash_name}")
+                logger.exception(f"Ошибка при сохранении цен {appid}")
 
-    def item_nameid_all_get(self):
+    def market_price_history_get(self, appid: int | str, hash_name: str, time_from: int = 0) -> list[tuple[int, int, int]]:
         with self.__db_lock:
             try:
                 with self.__connect() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT * FROM item_nameid")
+                    cursor = conn.execute(
+                        "SELECT time, sell_price, sell_listings FROM market_price_history WHERE appid=? AND hash_name=? AND time>=? ORDER BY time",
+                        (int(appid), hash_name, time_from)
+                    )
                     return cursor.fetchall()
             except Exception:
-                logger.exception(f"Ошибка при получении приложений")
+                logger.exception(f"Ошибка при получении истории цен {appid}__{hash_name}")
+                return []
+
+    def market_price_edge_get(self, appid: int | str, time_from: int = 0, hash_name: str = None, latest: bool = True) -> list[tuple[str, int, int, int]]:
+        # Для каждого предмета одна строка: последняя (latest=True) или первая запись не раньше time_from
+        aggregate = 'MAX' if latest else 'MIN'
+        condition, params = "appid=? AND time>=?", [int(appid), time_from]
+        if hash_name is not None:
+            condition += " AND hash_name=?"
+            params.append(hash_name)
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    cursor = conn.execute(
+                        f"SELECT hash_name, {aggregate}(time), sell_price, sell_listings FROM market_price_history WHERE {condition} GROUP BY hash_name",
+                        params
+                    )
+                    return cursor.fetchall()
+            except Exception:
+                logger.exception(f"Ошибка при получении цен {appid}")
+                return []
+
+    def market_price_stats_get(self, appid: int | str, time_from: int = 0, hash_name: str = None) -> list[tuple[str, int, int, float, int]]:
+        condition, params = "appid=? AND time>=?", [int(appid), time_from]
+        if hash_name is not None:
+            condition += " AND hash_name=?"
+            params.append(hash_name)
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    cursor = conn.execute(
+                        f"SELECT hash_name, MIN(sell_price), MAX(sell_price), AVG(sell_price), COUNT(*) FROM market_price_history WHERE {condition} GROUP BY hash_name",
+                        params
+                    )
+                    return cursor.fetchall()
+            except Exception:
+                logger.exception(f"Ошибка при получении статистики цен {appid}")
+                return []
+
+    def market_price_items_get(self, appid: int | str, time_from: int = 0) -> list[tuple[str, int, str]]:
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    cursor = conn.execute("SELECT hash_name, time, item FROM market_price_item WHERE appid=? AND time>=?", (int(appid), time_from))
+                    return cursor.fetchall()
+            except Exception:
+                logger.exception(f"Ошибка при получении предметов рынка {appid}")
+                return []
+
+    def sell_job_save_many(self, rows: list[dict]) -> list[int]:
+        # Все заказы пишутся одной транзакцией, возвращаются их id в том же порядке
+        if not rows: return []
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    ids = []
+                    for row in rows:
+                        columns = ', '.join(row.keys())
+                        placeholders = ', '.join('?' for _ in row)
+                        cursor = conn.execute(f"INSERT INTO sell_job ({columns}) VALUES ({placeholders})", tuple(row.values()))
+                        ids.append(cursor.lastrowid)
+                    return ids
+            except Exception:
+                logger.exception(f"Ошибка при сохранении заказов на продажу ({len(rows)} шт.)")
+                return []
+
+    def sell_job_update(self, job_ids: list[int], data: dict):
+        if not job_ids or not data: return
+        columns = ', '.join(f"{column}=?" for column in data)
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    conn.executemany(f"UPDATE sell_job SET {columns} WHERE id=?", [(*data.values(), job_id) for job_id in job_ids])
+            except Exception:
+                logger.exception(f"Ошибка при обновлении заказов на продажу {job_ids}")
+
+    def sell_job_get(self, steam_id: str | int, statuses: list[str]) -> list[dict]:
+        if not statuses: return []
+        placeholders = ', '.join('?' for _ in statuses)
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    cursor = conn.execute(f"SELECT * FROM sell_job WHERE steam_id=? AND status IN ({placeholders}) ORDER BY id", (str(steam_id), *statuses))
+                    columns = [column[0] for column in cursor.description]
+                    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            except Exception:
+                logger.exception(f"Ошибка при получении заказов на продажу {steam_id}")
+                return []
+
+    def market_history_save(self, steam_id: str | int, rows: list[tuple]) -> int:
+        # rows: (listingid, purchaseid, time_event, event_type, appid, market_hash_name, amount, price, event_json)
+        # Уже сохранённые события пропускаются, возвращается количество новых
+        if not steam_id or not rows: return 0
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    total_changes = conn.total_changes
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO market_history_event "
+                        "(steam_id, listingid, purchaseid, time_event, event_type, appid, market_hash_name, amount, price, event) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(str(steam_id), *row) for row in rows]
+                    )
+                    return conn.total_changes - total_changes
+            except Exception:
+                logger.exception(f"Ошибка при сохранении истории рынка {steam_id}")
+                return 0
+
+    def market_history_get(self, steam_id: str | int, time_from: int = 0, limit: int = -1, offset: int = 0) -> list[str]:
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    cursor = conn.execute(
+                        "SELECT event FROM market_history_event WHERE steam_id=? AND time_event>=? ORDER BY time_event DESC, rowid LIMIT ? OFFSET ?",
+                        (str(steam_id), time_from, limit, offset)
+                    )
+                    return [row[0] for row in cursor.fetchall()]
+            except Exception:
+                logger.exception(f"Ошибка при получении истории рынка {steam_id}")
+                return []
+
+    def market_history_count_get(self, steam_id: str | int) -> int:
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    return conn.execute("SELECT COUNT(*) FROM market_history_event WHERE steam_id=?", (str(steam_id),)).fetchone()[0]
+            except Exception:
+                logger.exception(f"Ошибка при получении количества событий истории рынка {steam_id}")
+                return 0
+
+    def market_history_totals_get(self, steam_id: str | int, sell_type: int, buy_type: int, time_from: int = 0) -> list[tuple[int, str, int, int, int, int]]:
+        # Для каждого предмета: (appid, market_hash_name, продано шт., получено, куплено шт., потрачено)
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    cursor = conn.execute(
+                        "SELECT appid, market_hash_name, "
+                        "SUM(CASE WHEN event_type=? THEN amount ELSE 0 END), SUM(CASE WHEN event_type=? THEN price ELSE 0 END), "
+                        "SUM(CASE WHEN event_type=? THEN amount ELSE 0 END), SUM(CASE WHEN event_type=? THEN price ELSE 0 END) "
+                        "FROM market_history_event WHERE steam_id=? AND time_event>=? AND event_type IN (?, ?) "
+                        "GROUP BY appid, market_hash_name",
+                        (sell_type, sell_type, buy_type, buy_type, str(steam_id), time_from, sell_type, buy_type)
+                    )
+                    return cursor.fetchall()
+            except Exception:
+                logger.exception(f"Ошибка при подсчёте истории рынка {steam_id}")
+                return []
+
+    def market_history_backfill_save(self, steam_id: str | int, start: int, is_finished: bool):
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO market_history_backfill (steam_id, start, is_finished, time_updated) VALUES (?, ?, ?, ?)",
+                        (str(steam_id), start, int(is_finished), int(time.time()))
+                    )
+            except Exception:
+                logger.exception(f"Ошибка при сохранении курсора догрузки истории рынка {steam_id}")
+
+    def market_history_backfill_get(self, steam_id: str | int) -> tuple[int, bool] | None:
+        # (смещение следующей страницы, загружена ли история до конца) или None, если догрузка ещё не начиналась
+        with self.__db_lock:
+            try:
+                with self.__connect() as conn:
+                    row = conn.execute("SELECT start, is_finished FROM market_history_backfill WHERE steam_id=?", (str(steam_id),)).fetchone()
+                    return (row[0], bool(row[1])) if row else None
+            except Exception:
+                logger.exception(f"Ошибка при получении курсора догрузки истории рынка {steam_id}")
+                return None
 
     def save_setting(self, name: str, value: str | list | dict):
         try:
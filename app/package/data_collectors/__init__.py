@@ -8,6 +8,7 @@ from .steam_api_utility import (
     InventoryItemTag,
     InventoryItem,
     InventoryItemRgDescriptions,
+    InventoryItemSelection,
     MarketAssetDescription,
     MarketListenItem,
     ItemOrdersHistogramOrderGraph,
@@ -28,6 +29,16 @@ from .steam_api_utility import (
     MarketMyHistoryListings,
     MarketMyHistoryParcedEvent
 )
+from .inventory_snapshot import InventorySnapshot, InventoryDiff, inventory_snapshots
+from .steam_transport import SteamTransport, RetryPolicy, steam_transport
+from .histogram_cache import HistogramCache, market_histogram_cache
+from .steam_api_utility_async import AsyncSteamAPIUtility
+from .market_price_history import MarketPricePoint, MarketPriceStats, MarketPriceHistory, market_price_history
+from .sell_jobs import SellOrderStatus, SellOrder, SellJobStats, SellJobEngine
+from .listing_cancel import AdaptiveConcurrency, ListingCancelReport, ListingCancelEngine
+from .my_listings_cache import MyListingsCache
+from .item_stacker import StackMove, StackPlan, StackReport, StackEngine
+from .market_history_archive import MarketHistoryItemTotals, MarketHistoryArchive, market_history_archive
 from .steam_id_from_url import get_steam_id_from_url
 from .steam_mini_profile_info import load_steam_mini_profile_info, SteamMiniProfileInfo
 from .steam_profile_info import get_steam_profile_info
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+
+class HistogramCache:
+    def __init__(self, ttl: float = 10, max_size: int = 4096):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.__entries: dict[tuple, tuple[float, object]] = {}
+        self.__in_flight: dict[tuple, Future] = {}
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def make_key(appid: int | str, item_nameid: int | str, currency: int | str, country: str) -> tuple:
+        return str(appid), str(item_nameid), str(currency), str(country)
+
+    def __begin(self, key: tuple) -> tuple[bool, object, Future | None]:
+        # Возвращает (найдено в кэше, значение, future); future=None у того, кто сам выполняет запрос
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return True, entry[1], None
+            future = self.__in_flight.get(key)
+            if future:
+                self.coalesced += 1
+                return False, None, future
+            self.misses += 1
+            self.__in_flight[key] = Future()
+            return False, None, None
+
+    def __finish(self, key: tuple, value: object = None, error: BaseException = None):
+        with self.__lock:
+            future = self.__in_flight.pop(key)
+            if error is None and value is not None:
+                self.__entries[key] = (time.monotonic() + self.ttl, value)
+                self.__prune()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def __prune(self):
+        if len(self.__entries) <= self.max_size: return
+        now = time.monotonic()
+        self.__entries = {key: entry for key, entry in self.__entries.items() if entry[0] > now}
+        while len(self.__entries) > self.max_size:
+            self.__entries.pop(next(iter(self.__entries)))
+
+    def get_or_load(self, key: tuple, loader: callable):
+        is_hit, value, future = self.__begin(key)
+        if is_hit: return value
+        if future: return future.result()
+        try:
+            value = loader()
+        except BaseException as e:
+            self.__finish(key, error=e)
+            raise
+        self.__finish(key, value=value)
+        return value
+
+    async def get_or_load_async(self, key: tuple, loader: callable):
+        # Future общий для потоков и event loop'ов, поэтому синхронные и асинхронные запросы схлопываются вместе
+        is_hit, value, future = self.__begin(key)
+        if is_hit: return value
+        if future: return await asyncio.wrap_future(future)
+        try:
+            value = await loader()
+        except BaseException as e:
+            self.__finish(key, error=e)
+            raise
+        self.__finish(key, value=value)
+        return value
+
+    def invalidate(self, key: tuple = None):
+        with self.__lock:
+            if key is None:
+                self.__entries.clear()
+            else:
+                self.__entries.pop(key, None)
+
+    def get_stats(self) -> dict:
+        with self.__lock:
+            return {'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced, 'size': len(self.__entries)}
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> hits: {self.hits}, misses: {self.misses}, coalesced: {self.coalesced}'
+
+
+market_histogram_cache = HistogramCache()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if TYPE_CHECKING:
+    from .steam_api_utility import InventoryItemRgDescriptions
+
+
+def is_columns_available() -> bool:
+    return np is not None
+
+
+class InventoryColumns:
+    def __init__(self, inventory: list[InventoryItemRgDescriptions]):
+        # Колонки только по описаниям: количество берётся из текущих сумм описаний и обновляется на месте
+        self.inventory = inventory
+        self.__indexes = {id(item): index for index, item in enumerate(inventory)}
+        self.tradable = np.fromiter((item.is_tradable() for item in inventory), dtype=bool, count=len(inventory))
+        self.marketable = np.fromiter((item.is_marketable() for item in inventory), dtype=bool, count=len(inventory))
+        self.description_amount = np.fromiter((item.get_amount() for item in inventory), dtype=np.int64, count=len(inventory))
+
+    def update_amount(self, item: InventoryItemRgDescriptions):
+        index = self.__indexes.get(id(item))
+        if index is not None: self.description_amount[index] = item.get_amount()
+
+    def __mask(self, only_tradable: bool = False, only_marketable: bool = False):
+        mask = np.ones(len(self.inventory), dtype=bool)
+        if only_tradable: mask &= self.tradable
+        if only_marketable: mask &= self.marketable
+        return mask
+
+    def get_items(self, only_tradable: bool = False, only_marketable: bool = False) -> list[InventoryItemRgDescriptions]:
+        return [self.inventory[i] for i in np.flatnonzero(self.__mask(only_tradable, only_marketable))]
+
+    def get_amount(self, only_tradable: bool = False, only_marketable: bool = False) -> int:
+        return int(self.description_amount[self.__mask(only_tradable, only_marketable)].sum())
+
+    def get_amount_by_item_id(self, only_tradable: bool = False) -> dict[str, int]:
+        indexes = np.flatnonzero(self.__mask(only_tradable))
+        return {self.inventory[i].get_item_id(): int(self.description_amount[i]) for i in indexes}
+
+    def get_top_items(self, count: int, only_tradable: bool = False) -> list[InventoryItemRgDescriptions]:
+        if count <= 0: return []
+        indexes = np.flatnonzero(self.__mask(only_tradable))
+        amounts = self.description_amount[indexes]
+        if count < len(indexes):
+            top = np.sort(np.argpartition(-amounts, count - 1)[:count])
+            indexes, amounts = indexes[top], amounts[top]
+        order = np.argsort(-amounts, kind='stable')
+        return [self.inventory[i] for i in indexes[order]]
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import datetime
+import threading
+from enum import Enum
+
+from app.database import sql_manager
+from .steam_api_utility import SteamAPIUtility, InventoryManager
+
+
+class InventorySnapshotTable(Enum):
+    TABLE_NAME = 'inventory_snapshots'
+    KEY = 'key'
+    SNAPSHOT = 'snapshot'
+
+
+column_types = {
+    InventorySnapshotTable.KEY: 'TEXT UNIQUE',
+    InventorySnapshotTable.SNAPSHOT: 'TEXT',
+}
+sql_manager.create_table(InventorySnapshotTable.TABLE_NAME, column_types)
+
+
+class InventoryDiff:
+    def __init__(self, old_assets: list[dict], new_assets: list[dict]):
+        old_kv = {str(asset.get('assetid', '') or asset.get('id', '')): asset for asset in old_assets}
+        new_kv = {str(asset.get('assetid', '') or asset.get('id', '')): asset for asset in new_assets}
+
+        self.added: list[dict] = [asset for assetid, asset in new_kv.items() if assetid not in old_kv]
+        self.removed: list[dict] = [asset for assetid, asset in old_kv.items() if assetid not in new_kv]
+        self.changed: list[tuple[dict, dict]] = [
+            (old_kv[assetid], asset) for assetid, asset in new_kv.items()
+            if assetid in old_kv and int(old_kv[assetid].get('amount', 0)) != int(asset.get('amount', 0))
+        ]
+
+    def __str__(self):
+        return f"InventoryDiff: added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)}"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def is_empty(self) -> bool:
+        return not self.added and not self.removed and not self.changed
+
+
+class InventorySnapshot:
+    def __init__(self, steam_id: str | int, appid: str | int, context_id: str | int = 2, assets: list[dict] = None, descriptions: list[dict] = None, time_update: datetime.datetime = None):
+        self.steam_id = str(steam_id)
+        self.appid = str(appid)
+        self.context_id = str(context_id)
+        self.assets: list[dict] = assets or []
+        self.descriptions: list[dict] = descriptions or []
+        self.time_update: datetime.datetime = time_update or datetime.datetime.now()
+        self.is_loaded_from_disk = False
+
+    @classmethod
+    def create_from_inventory(cls, steam_id: str | int, appid: str | int, context_id: str | int, inventory: InventoryManager) -> InventorySnapshot:
+        return cls(steam_id=steam_id, appid=appid, context_id=context_id, assets=inventory.assets, descriptions=inventory.descriptions)
+
+    @staticmethod
+    def make_key(steam_id: str | int, appid: str | int, context_id: str | int = 2) -> str:
+        return f'{steam_id}_{appid}_{context_id}'
+
+    def get_key(self) -> str:
+        return self.make_key(self.steam_id, self.appid, self.context_id)
+
+    def is_fresh(self, max_age: datetime.timedelta) -> bool:
+        if self.is_loaded_from_disk: return False
+        return self.time_update + max_age > datetime.datetime.now()
+
+    def to_inventory(self) -> InventoryManager:
+        return InventoryManager({
+            'success': True,
+            'assets': list(self.assets),
+            'descriptions': self.descriptions,
+        }, context_id=int(self.context_id))
+
+    def diff(self, new_snapshot: InventorySnapshot) -> InventoryDiff:
+        return InventoryDiff(self.assets, new_snapshot.assets)
+
+    def get_save_data(self) -> dict:
+        return {
+            'assets': self.assets,
+            'descriptions': self.descriptions,
+            'time_update': self.time_update,
+        }
+
+    def save(self):
+        sql_manager.save_data(
+            table_name=InventorySnapshotTable.TABLE_NAME.value,
+            data={
+                InventorySnapshotTable.KEY.value: self.get_key(),
+                InventorySnapshotTable.SNAPSHOT.value: sql_manager.encrypt_data(self.get_save_data()),
+            }
+        )
+
+    @classmethod
+    def load(cls, steam_id: str | int, appid: str | int, context_id: str | int = 2) -> InventorySnapshot | None:
+        data = sql_manager.get_data(
+            table_name=InventorySnapshotTable.TABLE_NAME.value,
+            condition={
+                InventorySnapshotTable.KEY.value: cls.make_key(steam_id, appid, context_id)
+            }
+        )
+        if not data: return None
+
+        save_data = sql_manager.decrypt_data(data[1])
+        if not save_data: return None
+
+        snapshot = cls(
+            steam_id=steam_id,
+            appid=appid,
+            context_id=context_id,
+            assets=save_data.get('assets', []),
+            descriptions=save_data.get('descriptions', []),
+            time_update=save_data.get('time_update', None),
+        )
+        snapshot.is_loaded_from_disk = True
+        return snapshot
+
+
+class InventorySnapshotManager:
+    def __init__(self, max_age: datetime.timedelta = datetime.timedelta(seconds=60)):
+        self.max_age = max_age
+        self.__snapshots: dict[str, InventorySnapshot] = {}
+        self.__locks: dict[str, threading.Lock] = {}
+        self.__lock = threading.Lock()
+
+    def __get_lock(self, key: str) -> threading.Lock:
+        with self.__lock:
+            if key not in self.__locks:
+                self.__locks[key] = threading.Lock()
+            return self.__locks[key]
+
+    def get_snapshot(self, steam_id: str | int, appid: str | int, context_id: str | int = 2) -> InventorySnapshot | None:
+        key = InventorySnapshot.make_key(steam_id, appid, context_id)
+        snapshot = self.__snapshots.get(key, None)
+        if snapshot: return snapshot
+
+        snapshot = InventorySnapshot.load(steam_id, appid, context_id)
+        if snapshot:
+            with self.__lock:
+                snapshot = self.__snapshots.setdefault(key, snapshot)
+        return snapshot
+
+    def is_fresh(self, steam_id: str | int, appid: str | int, context_id: str | int = 2) -> bool:
+        snapshot = self.__snapshots.get(InventorySnapshot.make_key(steam_id, appid, context_id), None)
+        return bool(snapshot and snapshot.is_fresh(self.max_age))
+
+    def invalidate(self, steam_id: str | int, appid: str | int, context_id: str | int = 2):
+        snapshot = self.__snapshots.get(InventorySnapshot.make_key(steam_id, appid, context_id), None)
+        if snapshot: snapshot.time_update = datetime.datetime.min
+
+    def update(self, steam_id: str | int, appid: str | int, inventory: InventoryManager, context_id: str | int = 2):
+        # Снимок инвентаря, изменённого локально по подтверждённым ответам Steam (например, после объединения стаков)
+        if not inventory: return
+        snapshot = InventorySnapshot.create_from_inventory(steam_id, appid, context_id, inventory)
+        with self.__get_lock(snapshot.get_key()):
+            snapshot.save()
+            self.__snapshots[snapshot.get_key()] = snapshot
+
+    def refresh(self, steam_api_utility: SteamAPIUtility, steam_id: str | int, appid: str | int, context_id: str | int = 2, on_page: callable = None) -> tuple[InventoryManager | None, InventoryDiff | None]:
+        # Одновременные обновления одного ключа выполняются один раз, остальные вызовы получают готовый снимок.
+        # Неполная загрузка (ошибка на середине) не сохраняется и изменения для неё не считаются.
+        key = InventorySnapshot.make_key(steam_id, appid, context_id)
+        with self.__get_lock(key):
+            snapshot = self.__snapshots.get(key, None)
+            if snapshot and snapshot.is_fresh(self.max_age):
+                return snapshot.to_inventory(), None
+
+            inventory = None
+            for inventory_page in steam_api_utility.iter_inventory_pages(steam_id=steam_id, appid=appid, context_id=context_id):
+                if inventory is None:
+                    inventory = inventory_page
+                else:
+                    inventory.add_next_invent(inventory_page)
+                if on_page: on_page(inventory, inventory_page)
+
+            if inventory is None or not inventory.is_complete(): return inventory, None
+
+            old_snapshot = snapshot or InventorySnapshot.load(steam_id, appid, context_id)
+            new_snapshot = InventorySnapshot.create_from_inventory(steam_id, appid, context_id, inventory)
+            diff = old_snapshot.diff(new_snapshot) if old_snapshot else InventoryDiff([], new_snapshot.assets)
+            if not old_snapshot or not diff.is_empty():
+                new_snapshot.save()
+            self.__snapshots[key] = new_snapshot
+            return inventory, diff
+
+
+inventory_snapshots = InventorySnapshotManager()
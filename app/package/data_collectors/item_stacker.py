@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .steam_api_utility import SteamAPIUtility, InventoryItem, InventoryItemRgDescriptions
+
+
+class StackMove:
+    def __init__(self, description: InventoryItemRgDescriptions, fromitem: InventoryItem, destitem: InventoryItem):
+        self.description = description
+        self.fromitem = fromitem
+        self.destitem = destitem
+        self.quantity = fromitem.amount
+        self.attempts = 0
+        self.status_code: int | None = None
+        self.eresult: int | None = None
+        self.is_uncertain = False
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> {self.fromitem.assetid} -> {self.destitem.assetid}, quantity: {self.quantity}, status: {self.status_code}, eresult: {self.eresult}'
+
+    def is_done(self) -> bool:
+        # Web API отвечает 200 и при ошибке, результат операции приходит в заголовке x-eresult (1 = OK)
+        return self.status_code == 200 and self.eresult == 1
+
+
+class StackPlan:
+    def __init__(self, description: InventoryItemRgDescriptions, destitem: InventoryItem, moves: list[StackMove]):
+        self.description = description
+        self.destitem = destitem
+        self.moves = moves
+
+    @classmethod
+    def create(cls, description: InventoryItemRgDescriptions) -> StackPlan | None:
+        # Цель — самый большой стак, тогда переносится меньше всего предметов
+        if not description or len(description.items) < 2: return None
+        destitem = max(description.items, key=lambda item: item.amount)
+        moves = [StackMove(description, item, destitem) for item in description.items if item.assetid != destitem.assetid]
+        return cls(description, destitem, moves)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> {self.description.name}: {len(self.moves)} moves -> {self.destitem.assetid}'
+
+    def get_quantity(self) -> int:
+        return sum(move.quantity for move in self.moves)
+
+
+class StackReport:
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.done: list[StackMove] = []
+        self.failed: list[StackMove] = []
+        self.skipped: list[StackMove] = []
+        self.time_start = time.monotonic()
+        self.time_finish: float | None = None
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__}> done: {len(self.done)}/{self.total}, failed: {len(self.failed)}, '
+                f'skipped: {len(self.skipped)}, throughput: {self.get_throughput():.2f}/s')
+
+    def get_finished(self) -> int:
+        return len(self.done) + len(self.failed) + len(self.skipped)
+
+    def get_elapsed(self) -> float:
+        return (self.time_finish or time.monotonic()) - self.time_start
+
+    def get_throughput(self) -> float:
+        elapsed = self.get_elapsed()
+        return (len(self.done) + len(self.failed)) / elapsed if elapsed > 0 else 0.0
+
+    def get_uncertain(self) -> list[StackMove]:
+        return [move for move in self.failed if move.is_uncertain]
+
+    def is_uncertain(self) -> bool:
+        return any(move.is_uncertain for move in self.failed)
+
+    def get_time_left(self) -> float | None:
+        throughput = self.get_throughput()
+        if not throughput: return None
+        return (self.total - self.get_finished()) / throughput
+
+
+class StackEngine:
+    def __init__(self, steam_api_utility: SteamAPIUtility, max_workers: int = 4, max_attempts: int = 3):
+        self.steam_api_utility = steam_api_utility
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def create_plans(descriptions: list[InventoryItemRgDescriptions]) -> list[StackPlan]:
+        return [plan for plan in map(StackPlan.create, descriptions) if plan]
+
+    @staticmethod
+    def apply(report: StackReport):
+        # Подтверждённые переносы применяются к описаниям в памяти, без повторной загрузки инвентаря
+        stacks: dict[int, tuple[InventoryItemRgDescriptions, list]] = {}
+        for move in report.done:
+            stacks.setdefault(id(move.description), (move.description, []))[1].append((move.fromitem.assetid, move.destitem.assetid, move.quantity))
+        for description, description_stacks in stacks.values():
+            description.stack_items(description_stacks)
+
+    def run(self, plans: list[StackPlan], on_progress: callable = None, should_stop: callable = None, apply: bool = True) -> StackReport:
+        # Темп задаёт transport (лимит inventory_service), пул ограничивает число запросов в полёте.
+        # on_progress вызывается после ответа Steam, а не при постановке запроса
+        moves = [move for plan in plans for move in plan.moves]
+        report = StackReport(total=len(moves))
+
+        def execute(move: StackMove):
+            result = report.skipped if should_stop and should_stop() else (report.done if self.__combine(move, should_stop) else report.failed)
+            with self.__lock:
+                result.append(move)
+                if on_progress: on_progress(move, report)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            list(executor.map(execute, moves))
+        report.time_finish = time.monotonic()
+
+        if apply: self.apply(report)
+        return report
+
+    def __combine(self, move: StackMove, should_stop: callable = None) -> bool:
+        retry_policy = self.steam_api_utility.transport.retry_policy
+        while move.attempts < self.max_attempts:
+            move.attempts += 1
+            try:
+                response = self.steam_api_utility.combine_itemstacks(fromitem=move.fromitem, destitem=move.destitem)
+            except Exception:
+                response = None
+            self.__set_result(move, response)
+            if move.is_done(): return True
+
+            # Повторяются только сетевые ошибки, 429 и 5xx: явный отказ Steam (например, ассет уже перенесён) не повторяем
+            if move.status_code is not None and not retry_policy.is_retry_status(move.status_code): return False
+            if should_stop and should_stop(): return False
+            if move.attempts < self.max_attempts: time.sleep(retry_policy.get_delay(move.attempts, response))
+        return False
+
+    @staticmethod
+    def __set_result(move: StackMove, response: requests.Response | None):
+        # Без ответа или при 5xx неизвестно, выполнил ли Steam перенос: такой результат проверяется загрузкой инвентаря
+        if response is None:
+            move.status_code, move.eresult = None, None
+            move.is_uncertain = True
+            return
+        move.status_code = response.status_code
+        if move.status_code >= 500: move.is_uncertain = True
+        # Без x-eresult ответ пришёл не от Web API (прокси, страница ошибки): исход неизвестен, перенос не применяется
+        eresult = response.headers.get('x-eresult')
+        move.eresult = int(eresult) if str(eresult).isdigit() else None
+        if move.status_code == 200 and move.eresult is None: move.is_uncertain = True
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .steam_api_utility import SteamAPIUtility, MarketListingsListing
+from .steam_transport import RetryPolicy
+
+
+class AdaptiveConcurrency:
+    def __init__(self, initial: int = 2, minimum: int = 1, maximum: int = 8, on_change: callable = None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.on_change = on_change
+        self.__in_flight = 0
+        self.__successes = 0
+        self.__condition = threading.Condition()
+
+    def acquire(self):
+        with self.__condition:
+            while self.__in_flight >= self.limit:
+                self.__condition.wait()
+            self.__in_flight += 1
+
+    def release(self, is_overloaded: bool = False):
+        # AIMD: при 429/5xx лимит делится пополам, после limit успешных ответов подряд растёт на 1
+        with self.__condition:
+            self.__in_flight -= 1
+            limit = self.limit
+            if is_overloaded:
+                self.limit = max(self.minimum, self.limit // 2)
+                self.__successes = 0
+            else:
+                self.__successes += 1
+                if self.__successes >= self.limit:
+                    self.limit = min(self.maximum, self.limit + 1)
+                    self.__successes = 0
+            if self.on_change and self.limit != limit: self.on_change(self.limit)
+            self.__condition.notify_all()
+
+
+class ListingCancelReport:
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.cancelled: list[MarketListingsListing] = []
+        self.failed: list[MarketListingsListing] = []
+        self.skipped: list[MarketListingsListing] = []
+        self.still_active: list[MarketListingsListing] = []
+        self.is_reconciled = False
+        self.time_start = time.monotonic()
+        self.time_finish: float | None = None
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__}> cancelled: {len(self.cancelled)}/{self.total}, failed: {len(self.failed)}, '
+                f'skipped: {len(self.skipped)}, still active: {len(self.still_active)}, throughput: {self.get_throughput():.2f}/s')
+
+    def get_finished(self) -> int:
+        return len(self.cancelled) + len(self.failed) + len(self.skipped)
+
+    def get_elapsed(self) -> float:
+        return (self.time_finish or time.monotonic()) - self.time_start
+
+    def get_throughput(self) -> float:
+        elapsed = self.get_elapsed()
+        return (len(self.cancelled) + len(self.failed)) / elapsed if elapsed > 0 else 0.0
+
+
+class ListingCancelEngine:
+    # 429 возвращается движку без повторов в transport: иначе AIMD увидел бы перегрузку только после исчерпания попыток
+    request_retry_policy = RetryPolicy(max_attempts=1)
+
+    def __init__(self, steam_api_utility: SteamAPIUtility, max_concurrency: int = 8, initial_concurrency: int = 2, max_attempts: int = 3, rate_per_slot: float = 2.0):
+        self.steam_api_utility = steam_api_utility
+        self.max_concurrency = max_concurrency
+        self.initial_concurrency = initial_concurrency
+        self.max_attempts = max_attempts
+        self.rate_per_slot = rate_per_slot
+        self.concurrency: AdaptiveConcurrency | None = None
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def is_overloaded(status_code: int | None) -> bool:
+        return status_code is None or status_code == 429 or status_code >= 500
+
+    def run(self, listings: list[MarketListingsListing], on_progress: callable = None, should_stop: callable = None, reconcile: bool = True) -> ListingCancelReport:
+        # Задачи запускаются в порядке listings, число одновременных запросов подстраивается под ответы Steam
+        report = ListingCancelReport(total=len(listings))
+        # У снятия лотов своя корзина в transport, её скорость следует за лимитом одновременных запросов
+        bucket = self.steam_api_utility.transport.get_bucket('market_removelisting')
+
+        def set_rate(limit: int):
+            bucket.set_rate(limit * self.rate_per_slot, capacity=limit)
+
+        self.concurrency = AdaptiveConcurrency(initial=self.initial_concurrency, maximum=self.max_concurrency, on_change=set_rate)
+        set_rate(self.concurrency.limit)
+
+        def execute(listing: MarketListingsListing):
+            result = report.skipped if should_stop and should_stop() else (report.cancelled if self.__cancel(listing, should_stop) else report.failed)
+            with self.__lock:
+                result.append(listing)
+                if on_progress: on_progress(listing, result is report.cancelled, report)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as executor:
+            list(executor.map(execute, listings))
+        report.time_finish = time.monotonic()
+
+        if reconcile: self.reconcile(report)
+        return report
+
+    def __cancel(self, listing: MarketListingsListing, should_stop: callable = None) -> bool:
+        retry_policy = self.steam_api_utility.transport.retry_policy
+        for attempt in range(1, self.max_attempts + 1):
+            self.concurrency.acquire()
+            status_code = None
+            try:
+                status_code = self.steam_api_utility.remove_my_listing_status(listing, retry_policy=self.request_retry_policy)
+            finally:
+                self.concurrency.release(is_overloaded=self.is_overloaded(status_code))
+
+            if status_code and 200 <= status_code < 400: return True
+            if not self.is_overloaded(status_code): return False
+            if attempt >= self.max_attempts or (should_stop and should_stop()): return False
+            time.sleep(retry_policy.get_delay(attempt))
+        return False
+
+    def reconcile(self, report: ListingCancelReport) -> ListingCancelReport:
+        # Сверка со свежим списком лотов: ответ 200 не гарантирует снятие, а ошибка не гарантирует, что лот остался
+        listings = self.steam_api_utility.fetch_my_listings()
+        if not listings: return report
+        active_ids = {str(listing.listingid) for listing in listings.listings + listings.listings_on_hold + listings.listings_to_confirm}
+        requested = report.cancelled + report.failed
+        report.still_active = [listing for listing in requested if str(listing.listingid) in active_ids]
+        report.cancelled = [listing for listing in requested if str(listing.listingid) not in active_ids]
+        report.failed = list(report.still_active)
+        report.is_reconciled = True
+        return report
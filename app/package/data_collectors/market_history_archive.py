@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import datetime
+import json
+
+from app.database import sql_manager
+from .steam_api_utility import SteamAPIUtility, MarketMyHistoryManager, MarketMyHistoryParcedEvent, MarketMyHistoryEvent
+
+
+class MarketHistoryItemTotals:
+    def __init__(self, appid: int, market_hash_name: str, sold_amount: int, sold_price: int, bought_amount: int, bought_price: int):
+        self.appid = appid
+        self.market_hash_name = market_hash_name
+        self.sold_amount = sold_amount or 0
+        self.sold_price = sold_price or 0
+        self.bought_amount = bought_amount or 0
+        self.bought_price = bought_price or 0
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> name: {self.market_hash_name}, sold: {self.sold_amount} ({self.sold_price}), bought: {self.bought_amount} ({self.bought_price}), profit: {self.get_profit()}'
+
+    def get_profit(self) -> int:
+        return self.sold_price - self.bought_price
+
+
+class MarketHistoryArchive:
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or sql_manager
+
+    @staticmethod
+    def __get_time_from(days: float | None) -> int:
+        if days is None: return 0
+        return int((datetime.datetime.now() - datetime.timedelta(days=days)).timestamp())
+
+    @staticmethod
+    def __create_row(event: MarketMyHistoryParcedEvent) -> tuple:
+        asset = event.asset or (event.listing.asset if event.listing else None)
+        appid = asset.appid if asset else 0
+        market_hash_name = asset.market_hash_name if asset else ''
+        price = int(round(event.get_price() * 100))
+        return (*event.get_key(), appid, market_hash_name, event.get_buy_amount(), price, json.dumps(event.get_save_data()))
+
+    def save(self, steam_id: str | int, history: MarketMyHistoryManager) -> int:
+        return self.db_manager.market_history_save(steam_id=steam_id, rows=[self.__create_row(event) for event in history.parced_events])
+
+    def sync(self, steam_api_utility: SteamAPIUtility, page_size: int = 500, max_events: int = None, on_page: callable = None) -> int:
+        # Страницы идут от новых событий к старым: как только на странице встречается уже сохранённое событие, дальше всё есть в архиве.
+        # Сверка с total_count не используется: удалённые или объединённые Steam события дали бы полный проход по истории.
+        # Если загрузка остановилась на max_events или ошибке, не дойдя до архива, оставшийся разрыв догружает backfill
+        account = steam_api_utility.account
+        if not account: return 0
+        steam_id = account.steam_id
+        new_events, next_start = self.__load_pages(steam_api_utility, steam_id, start=0, page_size=page_size, max_events=max_events, on_page=on_page, stop_on_known=True)
+
+        # Новые события сдвигают смещения старых, поэтому курсор догрузки сдвигается на их число.
+        # Разрыв после оборванного sync начинается с next_start (при 0 не загружено ничего, это повторит следующий sync)
+        cursor = self.db_manager.market_history_backfill_get(steam_id=steam_id)
+        if cursor:
+            backfill_start = None if cursor[1] else cursor[0] + new_events
+        else:
+            backfill_start = self.get_count(steam_id)
+        if next_start:
+            backfill_start = next_start if backfill_start is None else min(backfill_start, next_start)
+        self.__save_backfill_start(steam_id, backfill_start)
+        return new_events
+
+    def backfill(self, steam_api_utility: SteamAPIUtility, start: int = None, page_size: int = 500, max_events: int = None, on_page: callable = None) -> int:
+        # Догрузка старых событий с сохранённого курсора (по умолчанию) или со смещения start до конца истории.
+        # Курсор записывается после каждой страницы: прерванная догрузка продолжается с места остановки.
+        # Повторы не сохраняются дважды, поэтому перекрытие со уже загруженными страницами безопасно
+        account = steam_api_utility.account
+        if not account: return 0
+        steam_id = account.steam_id
+        if start is None: start = self.get_backfill_start(steam_id)
+        if start is None: return 0
+        new_events, _ = self.__load_pages(
+            steam_api_utility, steam_id, start=start, page_size=page_size, max_events=max_events, on_page=on_page, stop_on_known=False,
+            on_next_start=lambda next_start: self.__save_backfill_start(steam_id, next_start),
+        )
+        return new_events
+
+    def get_backfill_start(self, steam_id: str | int) -> int | None:
+        # Смещение, с которого продолжится backfill; None — история загружена до конца
+        cursor = self.db_manager.market_history_backfill_get(steam_id=steam_id)
+        if not cursor: return self.get_count(steam_id)
+        start, is_finished = cursor
+        return None if is_finished else start
+
+    def __save_backfill_start(self, steam_id: str | int, start: int | None):
+        self.db_manager.market_history_backfill_save(steam_id=steam_id, start=start or 0, is_finished=start is None)
+
+    def __load_pages(self, steam_api_utility: SteamAPIUtility, steam_id: str | int, start: int, page_size: int, max_events: int | None, on_page: callable, stop_on_known: bool, on_next_start: callable = None) -> tuple[int, int | None]:
+        # Возвращает число новых событий и смещение, на котором загрузка остановилась (None — дошли до конца истории или до архива)
+        max_count = start + max_events if max_events else float('inf')
+        new_events = 0
+        while True:
+            page = steam_api_utility.fetch_market_myhistory_page(start=start, count=page_size)
+            if not page: return new_events, start
+            saved = self.save(steam_id, page)
+            new_events += saved
+            next_start = page.get_next_page_start(max_count=float('inf'))
+            if on_next_start: on_next_start(next_start)
+            if on_page: on_page(page, saved)
+            if next_start is None or (stop_on_known and saved < len(page.parced_events)): return new_events, None
+            if next_start >= max_count: return new_events, next_start
+            start = next_start
+
+    def get_events(self, steam_id: str | int, days: float = None, limit: int = None, offset: int = 0) -> list[MarketMyHistoryParcedEvent]:
+        rows = self.db_manager.market_history_get(steam_id=steam_id, time_from=self.__get_time_from(days), limit=-1 if limit is None else limit, offset=offset)
+        return [MarketMyHistoryParcedEvent.create_from_save_data(json.loads(row)) for row in rows]
+
+    def get_history(self, steam_id: str | int, days: float = None, limit: int = None, offset: int = 0) -> MarketMyHistoryManager:
+        history = MarketMyHistoryManager({'success': True, 'total_count': self.get_count(steam_id), 'start': offset})
+        history.parced_events = self.get_events(steam_id=steam_id, days=days, limit=limit, offset=offset)
+        history.pagesize = len(history.parced_events)
+        return history
+
+    def get_count(self, steam_id: str | int) -> int:
+        return self.db_manager.market_history_count_get(steam_id=steam_id)
+
+    def get_totals(self, steam_id: str | int, days: float = None) -> list[MarketHistoryItemTotals]:
+        rows = self.db_manager.market_history_totals_get(
+            steam_id=steam_id,
+            sell_type=MarketMyHistoryEvent.SELL_LISTING.value,
+            buy_type=MarketMyHistoryEvent.BUY_LISTING.value,
+            time_from=self.__get_time_from(days),
+        )
+        return [MarketHistoryItemTotals(*row) for row in rows]
+
+
+market_history_archive = MarketHistoryArchive()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import datetime
+import json
+
+from app.database import sql_manager
+from .steam_api_utility import SteamAPIUtility, MarketListenItem
+
+
+class MarketPricePoint:
+    def __init__(self, time: int, sell_price: int, sell_listings: int):
+        self.time = datetime.datetime.fromtimestamp(time)
+        self.sell_price = sell_price
+        self.sell_listings = sell_listings
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> time: {self.time}, price: {self.sell_price}, listings: {self.sell_listings}'
+
+
+class MarketPriceStats:
+    def __init__(self, min_price: int, max_price: int, avg_price: float, count: int):
+        self.min_price = min_price
+        self.max_price = max_price
+        self.avg_price = avg_price
+        self.count = count
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> min: {self.min_price}, max: {self.max_price}, avg: {self.avg_price:.2f}, count: {self.count}'
+
+
+class MarketPriceHistory:
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or sql_manager
+
+    @staticmethod
+    def __get_time_from(days: float | None) -> int:
+        if days is None: return 0
+        return int((datetime.datetime.now() - datetime.timedelta(days=days)).timestamp())
+
+    def record(self, appid: int | str, items: list[MarketListenItem], time: datetime.datetime = None):
+        time = int((time or datetime.datetime.now()).timestamp())
+        rows = {
+            item.hash_name: (item.hash_name, int(item.sell_price or 0), int(item.sell_listings or 0), json.dumps(item.get_save_data()))
+            for item in items if not item.is_empty()
+        }
+        self.db_manager.market_price_save(appid=appid, time=time, rows=list(rows.values()))
+
+    def fetch_market_listings(self, steam_api_utility: SteamAPIUtility, appid: int | str, max_age: datetime.timedelta = None, on_page: callable = None) -> list[MarketListenItem]:
+        # Свежий снимок (не старше max_age) берётся из базы, иначе выполняется поиск по рынку и результат записывается в историю
+        if max_age is not None:
+            market_items = self.get_cached_market_listings(appid=appid, max_age=max_age)
+            if market_items:
+                if on_page: on_page(market_items)
+                return market_items
+
+        market_items = steam_api_utility.get_market_listings(appid=appid, on_page=on_page)
+        if market_items: self.record(appid=appid, items=market_items)
+        return market_items
+
+    def get_cached_market_listings(self, appid: int | str, max_age: datetime.timedelta) -> list[MarketListenItem]:
+        time_from = int((datetime.datetime.now() - max_age).timestamp())
+        rows = self.db_manager.market_price_items_get(appid=appid, time_from=time_from)
+        return [MarketListenItem(json.loads(item_json)) for hash_name, time, item_json in rows]
+
+    def get_history(self, appid: int | str, hash_name: str, days: float = None) -> list[MarketPricePoint]:
+        rows = self.db_manager.market_price_history_get(appid=appid, hash_name=hash_name, time_from=self.__get_time_from(days))
+        return [MarketPricePoint(*row) for row in rows]
+
+    def get_latest(self, appid: int | str, hash_name: str = None) -> dict[str, MarketPricePoint]:
+        rows = self.db_manager.market_price_edge_get(appid=appid, hash_name=hash_name, latest=True)
+        return {row[0]: MarketPricePoint(*row[1:]) for row in rows}
+
+    def get_stats(self, appid: int | str, days: float = 7, hash_name: str = None) -> dict[str, MarketPriceStats]:
+        rows = self.db_manager.market_price_stats_get(appid=appid, time_from=self.__get_time_from(days), hash_name=hash_name)
+        return {row[0]: MarketPriceStats(*row[1:]) for row in rows}
+
+    def get_deltas(self, appid: int | str, days: float = 1, hash_name: str = None) -> dict[str, int]:
+        # Изменение цены: последняя запись минус первая запись за последние days дней
+        time_from = self.__get_time_from(days)
+        first_rows = self.db_manager.market_price_edge_get(appid=appid, time_from=time_from, hash_name=hash_name, latest=False)
+        last_rows = self.db_manager.market_price_edge_get(appid=appid, time_from=time_from, hash_name=hash_name, latest=True)
+        first_prices = {row[0]: row[2] for row in first_rows}
+        return {row[0]: row[2] - first_prices[row[0]] for row in last_rows if row[0] in first_prices}
+
+
+market_price_history = MarketPriceHistory()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import datetime
+import threading
+
+from .steam_api_utility import SteamAPIUtility, MarketListingsManager, MarketListingsListing
+
+
+class MyListingsCache:
+    def __init__(self, steam_api_utility: SteamAPIUtility, page_size: int = 100, max_workers: int = 4, max_age: datetime.timedelta = datetime.timedelta(minutes=30)):
+        self.steam_api_utility = steam_api_utility
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.max_age = max_age
+        self.listings: MarketListingsManager | None = None
+        self.time_update: datetime.datetime | None = None
+        self.is_last_refresh_full = False
+        self.__lock = threading.Lock()
+
+    def clear(self):
+        with self.__lock:
+            self.listings = None
+            self.time_update = None
+
+    def is_fresh(self) -> bool:
+        if not self.listings or not self.time_update: return False
+        return self.time_update + self.max_age > datetime.datetime.now()
+
+    def get_listings(self, force: bool = False) -> MarketListingsManager | None:
+        with self.__lock:
+            if force or not self.is_fresh(): return self.__reload()
+            return self.__refresh()
+
+    def remove(self, listings: list[MarketListingsListing]):
+        # Снятые через приложение лоты удаляем из кэша сразу, чтобы счётчик совпадал с total_count Steam
+        with self.__lock:
+            if self.listings: self.listings.remove_listings([listing.listingid for listing in listings])
+
+    def __reload(self) -> MarketListingsManager | None:
+        listings = self.steam_api_utility.fetch_my_listings(count=self.page_size, max_workers=self.max_workers)
+        self.is_last_refresh_full = True
+        if not listings: return self.listings
+        self.listings = listings
+        self.time_update = datetime.datetime.now()
+        return self.listings
+
+    def __refresh(self) -> MarketListingsManager | None:
+        # Steam отдаёт лоты от новых к старым: догружаем страницы, пока на них есть незнакомые лоты.
+        # Если после этого число лотов не сходится с total_count (что-то продано или снято на сайте), грузим всё заново
+        first_page = self.steam_api_utility.fetch_my_listings_page(start=0, count=self.page_size)
+        if not first_page: return self.listings
+
+        known_ids = {listing.listingid for listing in self.listings.listings}
+        new_pages, page = [], first_page
+        while True:
+            new_pages.append(page)
+            if any(listing.listingid in known_ids for listing in page.listings): break
+            next_start = page.get_next_page_start()
+            if next_start is None: break
+            page = self.steam_api_utility.fetch_my_listings_page(start=next_start, count=self.page_size)
+            if not page: return self.__reload()
+
+        new_listings = [listing for page in new_pages for listing in page.listings if listing.listingid not in known_ids]
+        if len(known_ids) + len(new_listings) != first_page.total_count: return self.__reload()
+
+        self.is_last_refresh_full = False
+        for page in new_pages:
+            self.listings.assets.update(page.assets)
+        self.listings.listings = new_listings + self.listings.listings
+        self.listings.listings_on_hold = first_page.listings_on_hold
+        self.listings.listings_to_confirm = first_page.listings_to_confirm
+        self.listings.buy_orders = first_page.buy_orders
+        self.listings.total_count = first_page.total_count
+        self.listings.num_active_listings = first_page.num_active_listings
+        return self.listings
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import datetime
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+
+from app.database import sql_manager
+from .inventory_snapshot import inventory_snapshots
+from .steam_api_utility import SteamAPIUtility, InventoryItem, MarketListingsListing
+
+
+class SellOrderStatus(Enum):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    UNCERTAIN = 'uncertain'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+
+class SellOrder:
+    def __init__(self, order_dict: dict = None):
+        if not order_dict: order_dict = {}
+        self.order_id: int | None = order_dict.get('id')
+        self.steam_id = str(order_dict.get('steam_id', ''))
+        self.appid = order_dict.get('appid')
+        self.contextid = order_dict.get('contextid', 2)
+        self.assetid = str(order_dict.get('assetid', ''))
+        self.amount = int(order_dict.get('amount', 0))
+        self.price = int(order_dict.get('price', 0))
+        self.name = order_dict.get('name', '')
+        self.status = SellOrderStatus(order_dict.get('status', SellOrderStatus.PENDING.value))
+        self.attempts = int(order_dict.get('attempts', 0))
+        self.result = order_dict.get('result', '')
+        self.time_created = datetime.datetime.fromtimestamp(order_dict.get('time_created') or time.time())
+
+    @classmethod
+    def create(cls, steam_id: str | int, item: InventoryItem, amount: int, price: int, name: str = '') -> SellOrder:
+        return cls({'steam_id': steam_id, 'appid': item.appid, 'contextid': item.contextid, 'assetid': item.assetid, 'amount': amount, 'price': price, 'name': name})
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> id: {self.order_id}, name: {self.name}, assetid: {self.assetid}, amount: {self.amount}, price: {self.price}, status: {self.status.value}'
+
+    def get_save_data(self) -> dict:
+        return {
+            'steam_id': self.steam_id,
+            'appid': self.appid,
+            'contextid': self.contextid,
+            'assetid': self.assetid,
+            'amount': self.amount,
+            'price': self.price,
+            'name': self.name,
+            'status': self.status.value,
+            'attempts': self.attempts,
+            'result': self.result,
+            'time_created': int(self.time_created.timestamp()),
+            'time_updated': int(time.time()),
+        }
+
+    def get_inventory_item(self) -> InventoryItem:
+        return InventoryItem({'appid': self.appid, 'contextid': self.contextid, 'assetid': self.assetid, 'amount': self.amount})
+
+    def is_done(self) -> bool:
+        return self.status == SellOrderStatus.DONE
+
+    def is_failed(self) -> bool:
+        return self.status == SellOrderStatus.FAILED
+
+    def is_uncertain(self) -> bool:
+        return self.status == SellOrderStatus.UNCERTAIN
+
+    def is_finished(self) -> bool:
+        return self.status in (SellOrderStatus.DONE, SellOrderStatus.FAILED, SellOrderStatus.CANCELLED)
+
+    def is_listed_as(self, listing: MarketListingsListing) -> bool:
+        # Частично выставленный стак получает на рынке новый assetid, поэтому сверяем и по имени, количеству и цене
+        asset = listing.asset
+        if str(asset.appid) != str(self.appid): return False
+        if str(asset.id) == self.assetid: return True
+        return (asset.name == self.name and int(listing.original_amount_listed or 0) == self.amount
+                and int(listing.original_price_per_unit or 0) == self.price)
+
+
+class SellJobStats:
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.uncertain = 0
+        self.cancelled = 0
+        self.done_amount = 0
+        self.time_start = time.monotonic()
+        self.time_finish: float | None = None
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> done: {self.done}/{self.total}, failed: {self.failed}, uncertain: {self.uncertain}, cancelled: {self.cancelled}, throughput: {self.get_throughput():.2f}/s'
+
+    def add(self, order: SellOrder):
+        if order.is_done():
+            self.done += 1
+            self.done_amount += order.amount
+        elif order.is_failed():
+            self.failed += 1
+        elif order.is_uncertain():
+            self.uncertain += 1
+        else:
+            self.cancelled += 1
+
+    def get_finished(self) -> int:
+        return self.done + self.failed + self.uncertain + self.cancelled
+
+    def get_elapsed(self) -> float:
+        return (self.time_finish or time.monotonic()) - self.time_start
+
+    def get_throughput(self) -> float:
+        elapsed = self.get_elapsed()
+        return (self.done + self.failed) / elapsed if elapsed > 0 else 0.0
+
+
+class SellJobEngine:
+    time_started = int(time.time())
+
+    def __init__(self, steam_api_utility: SteamAPIUtility, max_workers: int = 2, db_manager=None, snapshots=None):
+        self.steam_api_utility = steam_api_utility
+        self.max_workers = max_workers
+        self.db_manager = db_manager or sql_manager
+        self.snapshots = snapshots or inventory_snapshots
+        self.__lock = threading.Lock()
+
+    def get_steam_id(self) -> str:
+        account = self.steam_api_utility.account
+        return str(account.steam_id) if account else ''
+
+    def enqueue(self, orders: list[SellOrder]) -> list[SellOrder]:
+        # Заказы сначала записываются в журнал, чтобы после падения было видно, что уже выставлено
+        ids = self.db_manager.sell_job_save_many([order.get_save_data() for order in orders])
+        for order, order_id in zip(orders, ids):
+            order.order_id = order_id
+        return orders
+
+    def get_unfinished_orders(self) -> list[SellOrder]:
+        # Незавершённые заказы прошлых запусков: PENDING не отправлялись, RUNNING и UNCERTAIN могли дойти до Steam
+        statuses = [SellOrderStatus.PENDING.value, SellOrderStatus.RUNNING.value, SellOrderStatus.UNCERTAIN.value]
+        rows = self.db_manager.sell_job_get(steam_id=self.get_steam_id(), statuses=statuses)
+        return [SellOrder(row) for row in rows if row.get('time_created', 0) < self.time_started]
+
+    def reconcile(self, orders: list[SellOrder]) -> list[SellOrder]:
+        # Продажа не идемпотентна: повтор уже выставленного частичного стака Steam примет второй раз.
+        # Заказы с неизвестным исходом сверяются с лотами на рынке и никогда не отправляются повторно
+        unknown = [order for order in orders if order.status in (SellOrderStatus.RUNNING, SellOrderStatus.UNCERTAIN)]
+        if not unknown: return orders
+
+        listings_manager = self.steam_api_utility.fetch_my_listings()
+        if not listings_manager: return [order for order in orders if order not in unknown]
+
+        listings = listings_manager.listings + listings_manager.listings_on_hold + listings_manager.listings_to_confirm
+        for order in unknown:
+            listing = next((listing for listing in listings if order.is_listed_as(listing)), None)
+            if listing:
+                listings.remove(listing)
+                self.__set_status(order, SellOrderStatus.DONE, result=json.dumps({'listingid': listing.listingid}))
+            else:
+                # Лота нет: продажа не дошла или предмет уже купили. Без проверки повтор опасен, заказ закрывается
+                self.__set_status(order, SellOrderStatus.FAILED, result='not found in listings')
+        return [order for order in orders if order not in unknown]
+
+    def submit(self, orders: list[SellOrder], on_progress: callable = None, should_stop: callable = None) -> SellJobStats:
+        return self.run(self.enqueue(orders), on_progress=on_progress, should_stop=should_stop)
+
+    def resume(self, on_progress: callable = None, should_stop: callable = None) -> SellJobStats:
+        orders = self.get_unfinished_orders()
+        stats = self.run(self.reconcile(orders), on_progress=on_progress, should_stop=should_stop)
+        # Заказы, найденные в reconcile среди лотов, тоже уже ушли из инвентаря
+        self.__invalidate_snapshots(orders)
+        return stats
+
+    def run(self, orders: list[SellOrder], on_progress: callable = None, should_stop: callable = None) -> SellJobStats:
+        # Темп запросов задаёт transport (лимит market), пул только ограничивает число одновременных продаж
+        stats = SellJobStats(total=len(orders))
+
+        def execute(order: SellOrder):
+            if should_stop and should_stop():
+                self.__set_status(order, SellOrderStatus.CANCELLED)
+            else:
+                self.__execute(order)
+            # on_progress вызывается под блокировкой, поэтому обработчикам не нужна своя синхронизация
+            with self.__lock:
+                stats.add(order)
+                if on_progress: on_progress(order, stats)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            list(executor.map(execute, orders))
+        stats.time_finish = time.monotonic()
+        self.__invalidate_snapshots(orders)
+        return stats
+
+    def __invalidate_snapshots(self, orders: list[SellOrder]):
+        # Выставленные предметы уходят из инвентаря, UNCERTAIN тоже мог уйти: снимок перечитается при следующем открытии
+        keys = {(order.steam_id, str(order.appid), str(order.contextid)) for order in orders if order.is_done() or order.is_uncertain()}
+        for steam_id, appid, contextid in keys:
+            self.snapshots.invalidate(steam_id=steam_id, appid=appid, context_id=contextid)
+
+    def __execute(self, order: SellOrder):
+        order.attempts += 1
+        self.__set_status(order, SellOrderStatus.RUNNING)
+        try:
+            response = self.steam_api_utility.sell_item(order.get_inventory_item(), amount=order.amount, price=order.price)
+        except Exception as e:
+            response, error = None, str(e)
+        else:
+            error = 'no response'
+
+        if response and response.get('success', False):
+            self.__set_status(order, SellOrderStatus.DONE, result=json.dumps(response))
+        elif response:
+            self.__set_status(order, SellOrderStatus.FAILED, result=json.dumps(response))
+        else:
+            # Без ответа запрос мог дойти до Steam: не повторяем, исход проверяется по лотам в reconcile
+            self.__set_status(order, SellOrderStatus.UNCERTAIN, result=error)
+
+    def __set_status(self, order: SellOrder, status: SellOrderStatus, result: str = None):
+        order.status = status
+        if result is not None: order.result = result
+        if order.order_id is None: return
+        data = {'status': status.value, 'attempts': order.attempts, 'time_updated': int(time.time())}
+        if result is not None: data['result'] = result
+        self.db_manager.sell_job_update(job_ids=[order.order_id], data=data)
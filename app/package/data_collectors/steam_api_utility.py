@@ -2,21 +2,39 @@ from __future__ import annotations
 
 import copy
 import datetime
+import heapq
 import json
 import re
-import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
 
+import requests
+
 from app.core import Account
 from app.database import sql_manager
+from .histogram_cache import HistogramCache, market_histogram_cache
+from .inventory_columns import InventoryColumns, is_columns_available
+from .steam_transport import SteamTransport, RetryPolicy, steam_transport
 
 
 class SteamAPIUtility:
-    def __init__(self, account: Account = None):
+    def __init__(self, account: Account = None, transport: SteamTransport = None, histogram_cache: HistogramCache = None):
+        self.transport = transport or steam_transport
+        self.histogram_cache = histogram_cache or market_histogram_cache
         self.account = account
         self.session_id: str | None = None
 
+    @property
+    def account(self) -> Account | None:
+        return self.__account
+
+    @account.setter
+    def account(self, account: Account | None):
+        # Ответы по сессии аккаунта проверяются на признаки разлогина без отдельных запросов
+        self.__account = account
+        if account: self.transport.set_response_listener(account.session, account)
+
     def create_trade_offer(self, partner_steam32id: str, partner_token: str, items: dict = None, tradeoffermessage: str = ''):
         if not self.account or not self.account.is_alive_session(): return
         if not partner_steam32id: return False
@@ -39,7 +57,7 @@ class SteamAPIUtility:
             }
 
             print(f"respons: params = {params}")
-            respons = self.account.session.post(url, data=params, headers=headers)
+            respons = self.transport.post(self.account.session, url, data=params, headers=headers)
             print(f"respons: status_code = {respons.status_code}")
             print(f"respons: text = {respons.text}")
             if respons.ok:
@@ -59,12 +77,10 @@ class SteamAPIUtility:
         if not self.account or not self.account.is_alive_session(): return
         url = "https://steamcommunity.com/market/"
         try:
-            response = self.account.session.get(url, timeout=10)
+            response = self.transport.get(self.account.session, url)
             if response.ok:
-                match = re.search(r'g_sessionID\s*=\s*"([^"]+)"', response.text)
-                if match:
-                    self.session_id = match.group(1)
-                    return self.session_id
+                self.session_id = self.parse_session_id(response.text)
+                return self.session_id
             return None
         except Exception as e:
             print(f"Error fetching session ID: {e}")
@@ -74,40 +90,54 @@ class SteamAPIUtility:
         if not self.account or not self.account.is_alive_session(): return
         url = f"https://steamcommunity.com/market/priceoverview/"
         params = {'country': 'RU', 'appid': appid, 'currency': currency, 'market_hash_name': market_hash_name}
-        market_info = self.account.session.get(f"{url}?{urllib.parse.urlencode(params)}", timeout=10)
+        market_info = self.transport.get(self.account.session, f"{url}?{urllib.parse.urlencode(params)}")
         return market_info.json() if market_info.ok else None
 
-    def get_inventory_items(self, steam_id: str | int = None, appid=3017120, start=0, context_id=2):
+    def get_inventory_items(self, steam_id: str | int = None, appid=3017120, start=0, context_id=2) -> InventoryManager | None:
+        inventory = None
+        for inventory_page in self.iter_inventory_pages(steam_id=steam_id, appid=appid, start=start, context_id=context_id):
+            if inventory is None:
+                inventory = inventory_page
+            else:
+                inventory.add_next_invent(inventory_page)
+        if inventory and not inventory.is_complete(): print(f"Inventory {steam_id or self.account.steam_id} loaded partially: {inventory.get_amount_items(only_tradable=False)} items")
+        return inventory
+
+    def iter_inventory_pages(self, steam_id: str | int = None, appid=3017120, start=0, context_id=2):
+        # Повторы 429/5xx и сетевых ошибок выполняет transport. Если страница так и не загрузилась, перебор заканчивается,
+        # а у последней страницы остаётся more_items: InventoryManager.is_complete() вернёт False
         if not self.account or not self.account.is_alive_session(): return
         if not steam_id: steam_id = self.account.steam_id
         if str(self.account.steam_id) == str(steam_id):
-            return self.__get_myinventory_items(steam_id=steam_id, appid=appid, start=start, context_id=context_id)
+            load_page = self.__load_myinventory_page
         else:
-            return self.__get_partnerinventory_items(steam_id=steam_id, appid=appid, start=start, context_id=context_id)
+            load_page = self.__load_partnerinventory_page
+
+        while True:
+            try:
+                page_json, next_start = load_page(steam_id=steam_id, appid=appid, start=start, context_id=context_id)
+            except Exception as e:
+                print(f"Error fetching inventory page (start={start}): {e}")
+                return
 
-    def __get_myinventory_items(self, steam_id: str | int, appid=3017120, start=0, context_id=2):
+            if not page_json: return
+            yield InventoryManager(page_json, context_id=context_id)
+            if not next_start: return
+            start = next_start
+
+    def __load_myinventory_page(self, steam_id: str | int, appid=3017120, start=0, context_id=2) -> tuple[dict | None, str | None]:
         def_url = f'https://steamcommunity.com/inventory/{steam_id}/{appid}/{context_id}?count=2000'
         if start:
             def_url += f'&start_assetid={start}'
-        try:
-            req = self.account.session.get(url=def_url, timeout=10)
-            if not req.ok: return None
-            req_json = req.json()
-            if not req_json.get('success', False): return None
+        req = self.transport.get(self.account.session, url=def_url)
+        if not req.ok: return None, None
+        req_json = req.json()
+        if not req_json.get('success', False): return None, None
 
-            inventory = InventoryManager(req_json, context_id=context_id)
-            if req_json.get('more_items', False):
-                more_start = req_json.get('last_assetid', None)
-                if more_start:
-                    next_inventory = self.__get_myinventory_items(steam_id=steam_id, appid=appid, start=more_start, context_id=context_id)
-                    if next_inventory:
-                        inventory.add_next_invent(next_inventory)
-            return inventory
-        except:
-            time.sleep(5)
-        return None
+        next_start = req_json.get('last_assetid', None) if req_json.get('more_items', False) else None
+        return req_json, next_start
 
-    def __get_partnerinventory_items(self, steam_id: str | int, appid=3017120, context_id=2, start=0):
+    def __load_partnerinventory_page(self, steam_id: str | int, appid=3017120, start=0, context_id=2) -> tuple[dict | None, str | None]:
         session_id = self.account.session.cookies.get('sessionid', domain='steamcommunity.com')
         params = {
             'sessionid': session_id,
@@ -118,38 +148,60 @@ class SteamAPIUtility:
         if start:
             params['start'] = start
         def_url = f'https://steamcommunity.com/tradeoffer/new/partnerinventory/'
+        headers = {
+            'referer': "https://steamcommunity.com/tradeoffer/new",
+            'host': "steamcommunity.com"
+        }
+        req = self.transport.get(self.account.session, url=def_url, params=params, headers=headers)
+        if not req.ok: return None, None
+        req_json = req.json()
+        if not req_json.get('success', False): return None, None
 
-        try:
-            headers = {
-                'referer': "https://steamcommunity.com/tradeoffer/new",
-                'host': "steamcommunity.com"
-            }
-            req = self.account.session.get(url=def_url, params=params, headers=headers, timeout=10)
-            if not req.ok: return None
-            req_json = req.json()
-            if not req_json.get('success', False): return None
-
-            inventory = InventoryManager(req_json, context_id=context_id)
-            if req_json.get('more', False):
-                more_start = req_json.get('more_start', None)
-                if more_start:
-                    next_inventory = self.__get_partnerinventory_items(steam_id=steam_id, appid=appid, context_id=context_id, start=more_start)
-                    if next_inventory:
-                        inventory.add_next_invent(next_inventory)
-            return inventory
-        except:
-            time.sleep(5)
-        return None
+        next_start = req_json.get('more_start', None) if req_json.get('more', False) else None
+        return req_json, next_start
 
-    def get_market_listings(self, appid: int | str = 3017120, start: int = 0, max_items_load: int = 1000) -> list[MarketListenItem]:
+    def get_market_listings(self, appid: int | str = 3017120, start: int = 0, max_items_load: int = 1000, max_workers: int = 4, on_page: callable = None) -> list[MarketListenItem]:
         if not self.account or not self.account.is_alive_session(): return []
-        market_listings = self.__load_market_listings(appid=appid, start=start, max_items_load=max_items_load)
-        return [MarketListenItem(item) for item in market_listings]
-
-    def __load_market_listings(self, appid: int | str = 3017120, start: int = 0, max_items_load: int = 1000) -> list:
+        return self.__load_market_listings(appid=appid, start=start, max_items_load=max_items_load, max_workers=max_workers, on_page=on_page)
+
+    def __load_market_listings(self, appid: int | str = 3017120, start: int = 0, max_items_load: int = 1000, max_workers: int = 4, on_page: callable = None) -> list[MarketListenItem]:
+        # После первой страницы известен total_count, остальные страницы грузятся параллельно (темп задаёт transport).
+        # on_page получает страницы по мере загрузки, результат собирается в порядке start.
+        count = 100
+        first_page = self.__load_market_listings_page(appid=appid, start=start, count=count)
+        if not first_page: return []
+
+        pages: dict[int, list[MarketListenItem]] = {start: [MarketListenItem(item) for item in first_page.get('results', [])]}
+        if on_page: on_page(pages[start])
+
+        total_count = min(first_page.get('total_count', 0), max_items_load)
+        failed_starts = []
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {
+                executor.submit(self.__load_market_listings_page, appid=appid, start=page_start, count=count): page_start
+                for page_start in range(start + count, total_count, count)
+            }
+            for future in as_completed(futures):
+                page_start = futures[future]
+                page = future.result()
+                if not page:
+                    failed_starts.append(page_start)
+                    continue
+                pages[page_start] = [MarketListenItem(item) for item in page.get('results', [])]
+                if on_page: on_page(pages[page_start])
+
+        for page_start in sorted(failed_starts):
+            page = self.__load_market_listings_page(appid=appid, start=page_start, count=count)
+            if not page: continue
+            pages[page_start] = [MarketListenItem(item) for item in page.get('results', [])]
+            if on_page: on_page(pages[page_start])
+
+        return [item for page_start in sorted(pages) for item in pages[page_start]]
+
+    def __load_market_listings_page(self, appid: int | str, start: int, count: int = 100) -> dict | None:
         search_params = {
             'start': start,
-            'count': 100,
+            'count': count,
             'search_descriptions': 0,
             'sort_column': 'popular',
             'sort_dir': 'desc',
@@ -157,27 +209,14 @@ class SteamAPIUtility:
             'norender': 1,
         }
         search_url = "https://steamcommunity.com/market/search/render/"
-        market_items = []
-        max_attempts = 2
-        max_items_load = max_items_load
-
-        for attempt in range(max_attempts):
-            try:
-                market_response = self.account.session.get(search_url, params=search_params, timeout=10)
-                if market_response.ok:
-                    response_data = market_response.json()
-                    if response_data.get('success', False):
-                        market_items.extend(response_data.get('results', []))
-                        total_items_available = response_data.get('total_count', 0)
-                        new_start = start + 100
-                        if total_items_available > new_start and new_start < max_items_load:
-                            market_items.extend(self.__load_market_listings(appid, new_start, max_items_load))
-                        return market_items
-            except:
-                pass
-            time.sleep(5)
-
-        return market_items
+        try:
+            market_response = self.transport.get(self.account.session, search_url, params=search_params)
+            if not market_response.ok: return None
+            response_data = market_response.json()
+            return response_data if response_data.get('success', False) else None
+        except Exception as e:
+            print(f"Error fetching market listings (start={start}): {e}")
+            return None
 
     def fetch_item_nameid(self, market_hash_name: str, appid: int = 3017120) -> int | None:
         saved_item_nameid = sql_manager.item_nameid_get(appid=appid, market_hash_name=market_hash_name)
@@ -189,6 +228,21 @@ class SteamAPIUtility:
         sql_manager.item_nameid_save(appid=appid, market_hash_name=market_hash_name, nameid=item_nameid)
         return item_nameid
 
+    def resolve_item_nameids(self, market_hash_names: list[str], appid: int = 3017120, max_workers: int = 4) -> dict[str, int]:
+        # Недостающие item_nameid грузятся параллельно (темп задаёт transport) и сохраняются одной транзакцией
+        missing = sql_manager.item_nameid_missing_get(appid=appid, market_hash_names=market_hash_names)
+        if missing and self.account and self.account.is_alive_session():
+            loaded = {}
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                futures = {executor.submit(self.__load_item_nameid, market_hash_name=market_hash_name, appid=appid): market_hash_name for market_hash_name in missing}
+                for future in as_completed(futures):
+                    item_nameid = future.result()
+                    if item_nameid: loaded[futures[future]] = item_nameid
+            sql_manager.item_nameid_save_many(appid=appid, nameids=loaded)
+
+        item_nameids = {market_hash_name: sql_manager.item_nameid_get(appid=appid, market_hash_name=market_hash_name) for market_hash_name in market_hash_names}
+        return {market_hash_name: item_nameid for market_hash_name, item_nameid in item_nameids.items() if item_nameid}
+
     def __load_item_nameid(self, market_hash_name: str, appid: int = 3017120) -> int | None:
         if not market_hash_name or not appid: return None
         if not self.account or not self.account.is_alive_session(): return None
@@ -196,36 +250,61 @@ class SteamAPIUtility:
         encoded_market_hash_name = urllib.parse.quote(market_hash_name)
         url = f"https://steamcommunity.com/market/listings/{appid}/{encoded_market_hash_name}"
         try:
-            response = self.account.session.get(url, timeout=10)
-            if response.ok:
-                _match = re.search(r'\bMarket_LoadOrderSpread\(\s*(\d+)\s*\);', response.text)
-                if not _match:
-                    _match = re.search(r'\bItemActivityTicker\.Start\(\s*(\d+)\s*\);', response.text)
-                if _match:
-                    item_nameid = int(_match.group(1))
-                    return item_nameid
-            return None
+            # Страница читается потоком до первого совпадения, остаток не скачивается
+            response = self.transport.get(self.account.session, url, stream=True)
+            try:
+                if response.ok: return self.parse_item_nameid_stream(response.iter_content(chunk_size=16384))
+                return None
+            finally:
+                response.close()
         except Exception as e:
             print(f"Error fetching market item ID: {e}")
             return None
 
+    @staticmethod
+    def parse_item_nameid(html: str) -> int | None:
+        _match = re.search(r'\bMarket_LoadOrderSpread\(\s*(\d+)\s*\);', html)
+        if not _match:
+            _match = re.search(r'\bItemActivityTicker\.Start\(\s*(\d+)\s*\);', html)
+        return int(_match.group(1)) if _match else None
+
+    @staticmethod
+    def parse_item_nameid_stream(chunks) -> int | None:
+        # Хвост предыдущего блока сохраняется, чтобы не потерять совпадение на границе блоков
+        buffer = b''
+        for chunk in chunks:
+            buffer = buffer[-128:] + chunk
+            item_nameid = SteamAPIUtility.parse_item_nameid(buffer.decode('utf-8', errors='ignore'))
+            if item_nameid: return item_nameid
+        return None
+
+    @staticmethod
+    def parse_session_id(html: str) -> str | None:
+        _match = re.search(r'g_sessionID\s*=\s*"([^"]+)"', html)
+        return _match.group(1) if _match else None
+
     def fetch_market_itemordershistogram(self, market_hash_name: str, appid: int = 3017120) -> ItemOrdersHistogram | None:
         if not self.account or not self.account.is_alive_session(): return None
         item_nameid = self.fetch_item_nameid(market_hash_name=market_hash_name, appid=appid)
+        if not item_nameid: return None
         self.account.load_wallet_info()
         country = self.account.wallet_country
         currency = self.account.wallet_currency
-        json_itemordershistogram = self.__load_market_itemordershistogram(country=country, currency=currency, item_nameid=item_nameid)
-        if not json_itemordershistogram: return
-        class_itemordershistogram = ItemOrdersHistogram(json_itemordershistogram)
-        if not class_itemordershistogram.is_successful(): return
-        return class_itemordershistogram
+
+        def load() -> ItemOrdersHistogram | None:
+            json_itemordershistogram = self.__load_market_itemordershistogram(country=country, currency=currency, item_nameid=item_nameid)
+            if not json_itemordershistogram: return None
+            class_itemordershistogram = ItemOrdersHistogram(json_itemordershistogram)
+            return class_itemordershistogram if class_itemordershistogram.is_successful() else None
+
+        key = self.histogram_cache.make_key(appid=appid, item_nameid=item_nameid, currency=currency, country=country)
+        return self.histogram_cache.get_or_load(key, load)
 
     def __load_market_itemordershistogram(self, country='KZ', language='english', currency=37, item_nameid=None) -> dict | None:
         if not item_nameid: return None
         url = f"https://steamcommunity.com/market/itemordershistogram"
         params = {'country': country, 'language': language, 'currency': currency, 'item_nameid': item_nameid}
-        market_info = self.account.session.get(f"{url}?{urllib.parse.urlencode(params)}", timeout=10)
+        market_info = self.transport.get(self.account.session, f"{url}?{urllib.parse.urlencode(params)}")
         return market_info.json() if market_info.ok else None
 
     def sell_item(self, item: InventoryItem, amount: int | str = 1, price: int | str = 0) -> dict | None:
@@ -251,10 +330,10 @@ class SteamAPIUtility:
             "Referrer-Policy": "strict-origin-when-cross-origin",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.150 Safari/537.36"
         }
-        market_info = self.account.session.post(url=url, timeout=10, headers=headers, data=params)
+        market_info = self.transport.post(self.account.session, url=url, headers=headers, data=params)
         return market_info.json() if market_info.ok else None
 
-    def combine_itemstacks(self, fromitem: InventoryItem, destitem: InventoryItem) -> str | None:
+    def combine_itemstacks(self, fromitem: InventoryItem, destitem: InventoryItem) -> requests.Response | None:
         if not fromitem or not destitem: return
         if fromitem.appid != destitem.appid: return
         if fromitem.assetid == destitem.assetid: return
@@ -265,28 +344,43 @@ class SteamAPIUtility:
 
     def _start_stack_items(self, appid: int | str, fromitemid: int | str, destitemid: int | str, quantity: int | str):
         if not self.account or not self.account.is_alive_session(): return
-        access_token = self.account.get_steam_web_token()
-        if not access_token: return
-        steam_id = self.account.steam_id
-        try:
-            url = 'https://api.steampowered.com/IInventoryService/CombineItemStacks/v1/'
-            data = {
-                'access_token': access_token,
-                'appid': appid,
-                'fromitemid': fromitemid,
-                'destitemid': destitemid,
-                'quantity': quantity,
-                'steamid': steam_id,
-            }
-            response = self.account.session.post(url, data=data, timeout=10)
-            return response
-        except:
-            return None
+        url = 'https://api.steampowered.com/IInventoryService/CombineItemStacks/v1/'
+        data = {
+            'appid': appid,
+            'fromitemid': fromitemid,
+            'destitemid': destitemid,
+            'quantity': quantity,
+            'steamid': self.account.steam_id,
+        }
+        return self.post_web_api(url, data=data)
+
+    def post_web_api(self, url: str, data: dict) -> requests.Response | None:
+        # access_token подставляется из кеша аккаунта; при 401/403 токен сбрасывается и запрос повторяется один раз со свежим
+        for attempt in range(2):
+            access_token = self.account.get_steam_web_token()
+            if not access_token: return None
+            try:
+                response = self.transport.post(self.account.session, url, data={'access_token': access_token, **data})
+            except:
+                return None
+            if response.status_code not in (401, 403) or attempt: return response
+            self.account.invalidate_steam_web_token(access_token)
+        return None
 
-    def fetch_my_listings(self) -> MarketListingsManager | None:
-        return self.__load_mylistings()
+    def fetch_my_listings(self, count: int = 100, max_workers: int = 4) -> MarketListingsManager | None:
+        # После первой страницы известен total_count, остальные страницы грузятся параллельно (темп задаёт transport)
+        listings = self.fetch_my_listings_page(start=0, count=count)
+        if not listings or listings.get_next_page_start() is None: return listings
 
-    def __load_mylistings(self, start: int = 0, count: int = 100) -> MarketListingsManager | None:
+        page_size = listings.pagesize or count
+        starts = list(range(listings.get_next_page_start(), listings.total_count, page_size))
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            pages = list(executor.map(lambda start: self.fetch_my_listings_page(start=start, count=page_size), starts))
+
+        pages = [page or self.fetch_my_listings_page(start=start, count=page_size) for start, page in zip(starts, pages)]
+        return listings.add_next_pages(pages)
+
+    def fetch_my_listings_page(self, start: int = 0, count: int = 100) -> MarketListingsManager | None:
         if not self.account or not self.account.is_alive_session(): return None
         def_url = f'https://steamcommunity.com/market/mylistings'
         def_params = {
@@ -295,29 +389,28 @@ class SteamAPIUtility:
             'count': count,
         }
         try:
-            req = self.account.session.get(url=def_url, params=def_params, timeout=10)
+            req = self.transport.get(self.account.session, url=def_url, params=def_params)
             if not req.ok: return None
             req_json = req.json()
             if not req_json.get('success', False): return None
-
-            listings = MarketListingsManager(req_json)
-            next_page_start = listings.get_next_page_start()
-            if next_page_start is not None:
-                next_listings = self.__load_mylistings(start=next_page_start, count=count)
-                listings.add_next_page(next_listings)
-            return listings
-        except:
-            time.sleep(5)
+            return MarketListingsManager(req_json)
+        except Exception as e:
+            print(f"Error fetching {def_url} (start={start}): {e}")
         return None
 
     def remove_my_listing(self, item: MarketListingsListing) -> bool:
-        if not item or not item.listingid: return False
-        return self.__start_remove_my_listing(item.listingid)
+        status_code = self.remove_my_listing_status(item)
+        return bool(status_code and 200 <= status_code < 400)
 
-    def __start_remove_my_listing(self, listingid: str | int) -> bool:
-        if not self.account or not self.account.is_alive_session(): return False
+    def remove_my_listing_status(self, item: MarketListingsListing, retry_policy: RetryPolicy = None) -> int | None:
+        # HTTP-статус ответа нужен вызывающему коду, чтобы подстраивать темп под 429/5xx
+        if not item or not item.listingid: return None
+        return self.__start_remove_my_listing(item.listingid, retry_policy=retry_policy)
+
+    def __start_remove_my_listing(self, listingid: str | int, retry_policy: RetryPolicy = None) -> int | None:
+        if not self.account or not self.account.is_alive_session(): return None
         sessionid = self.fetch_session_id()
-        if not sessionid: return False
+        if not sessionid: return None
         try:
             url = f'https://steamcommunity.com/market/removelisting/{listingid}'
             params = {
@@ -327,16 +420,29 @@ class SteamAPIUtility:
                 "Origin": f"https://steamcommunity.com",
                 "Referer": f"https://steamcommunity.com/market/",
             }
-            market_info = self.account.session.post(url=url, timeout=10, headers=headers, data=params)
-            return market_info.ok
+            market_info = self.transport.post(self.account.session, url=url, headers=headers, data=params, retry_policy=retry_policy)
+            return market_info.status_code
         except:
-            return False
+            return None
 
     def fetch_market_myhistory(self, amount: int = 500):
         return self.__load_market_history(fetch_amount=amount)
 
     def __load_market_history(self, fetch_amount: int = 500, start: int = 0, count: int = 500):
         if not self.account or not self.account.is_alive_session(): return False
+        history = self.fetch_market_myhistory_page(start=start, count=count)
+        if not history: return None
+
+        # Страницы собираются целиком и сливаются один раз, а не пересортировкой после каждой
+        next_pages, page = [], history
+        while (next_page_start := page.get_next_page_start(max_count=fetch_amount)) is not None:
+            page = self.fetch_market_myhistory_page(start=next_page_start, count=count)
+            if not page: break
+            next_pages.append(page)
+        return history.add_next_pages(next_pages)
+
+    def fetch_market_myhistory_page(self, start: int = 0, count: int = 500) -> MarketMyHistoryManager | None:
+        if not self.account or not self.account.is_alive_session(): return None
         def_url = f'https://steamcommunity.com/market/myhistory/render/'
         def_params = {
             'query': None,
@@ -345,27 +451,27 @@ class SteamAPIUtility:
             'count': count,
         }
         try:
-            req = self.account.session.get(url=def_url, params=def_params, timeout=10)
+            req = self.transport.get(self.account.session, url=def_url, params=def_params)
             if not req.ok: return None
             req_json = req.json()
             if not req_json.get('success', False): return None
-            history = MarketMyHistoryManager(req_json)
-            next_page_start = history.get_next_page_start(max_count=fetch_amount)
-            if next_page_start is not None:
-                next_listings = self.__load_market_history(fetch_amount=fetch_amount, start=next_page_start, count=count)
-                history.add_next_page(next_listings)
-            return history
-        except:
-            time.sleep(5)
+            return MarketMyHistoryManager(req_json)
+        except Exception as e:
+            print(f"Error fetching {def_url} (start={start}): {e}")
         return None
 
 
 class ItemDescription:
+    __slots__ = ('type', 'value')
+
     def __init__(self, description_dict: dict = None):
         if not description_dict: description_dict = {}
         self.type = description_dict.get('type', '')
         self.value = description_dict.get('value', '')
 
+    def get_save_data(self) -> dict:
+        return {'type': self.type, 'value': self.value}
+
     def __repr__(self):
         return f"ItemDescription: type={self.type}, value={self.value}"
 
@@ -375,56 +481,140 @@ class ItemDescription:
 
 class InventoryManager:
     def __init__(self, items: dict, context_id=2):
-        self.data_json = items
-        self.descriptions: list = items.get('descriptions', []) or [description for name, description in items.get('rgDescriptions', {}).items()]
-        self.assets: list = items.get('assets', []) or [asset for name, asset in items.get('rgInventory', {}).items()]
+        descriptions: list = items.get('descriptions', []) or [description for name, description in items.get('rgDescriptions', {}).items()]
+        assets: list = items.get('assets', []) or [asset for name, asset in items.get('rgInventory', {}).items()]
         self.success: bool = bool(items.get('success', False))
+        self.more_items: bool = bool(items.get('more_items', False) or items.get('more', False))
 
         self.inventory: list[InventoryItemRgDescriptions] = []
         self.context_id = context_id
-        self.parse_inventory()
+        self.__inventory_index: dict[tuple, InventoryItemRgDescriptions] = {}
+        self.__orphan_assets: dict[tuple, list[tuple]] = {}
+        self.__appid = assets[0].get('appid', 0) if assets else 0
+        self.__columns: InventoryColumns | None = None
+        self.parse_inventory(descriptions, assets)
+
+    @property
+    def descriptions(self) -> list[dict]:
+        return [item.get_save_data() for item in self.inventory]
+
+    @property
+    def assets(self) -> list[dict]:
+        assets = [i.get_save_data() for item in self.inventory for i in item.items]
+        for (classid, instanceid), rows in self.__orphan_assets.items():
+            assets.extend(InventoryItem.create_from_row(row, self.__appid, classid, instanceid).get_save_data() for row in rows)
+        return assets
+
+    @staticmethod
+    def __get_key(data: dict) -> tuple:
+        return data.get('classid', 0), data.get('instanceid', 0)
+
+    @staticmethod
+    def __attach_assets(item: InventoryItemRgDescriptions, rows: list[tuple]):
+        item.extend_asset_rows(rows)
+
+    def __get_columns(self) -> InventoryColumns | None:
+        if not is_columns_available(): return None
+        if self.__columns is None:
+            self.__columns = InventoryColumns(self.inventory)
+        return self.__columns
+
+    def __invalidate_columns(self):
+        self.__columns = None
+
+    def __on_item_change(self, item: InventoryItemRgDescriptions):
+        # Добавление и удаление предметов не меняет состав описаний: колонки не пересобираются
+        if self.__columns is not None: self.__columns.update_amount(item)
 
     def add_next_invent(self, next_invent: InventoryManager):
         if not isinstance(next_invent, InventoryManager): return
-        self.assets.extend(next_invent.assets)
-        for des in next_invent.descriptions:
-            classid = des.get('classid', 0)
-            instanceid = des.get('instanceid', 0)
-            if any((des_d.get('classid', 0) == classid and des_d.get('instanceid', 0) == instanceid) for des_d in self.descriptions if des):
-                continue
-            self.descriptions.append(des)
-        self.parse_inventory()
-
-    def parse_inventory(self):
-        inventory: list = []
-        for des in self.descriptions:
-            classid = des.get('classid', 0)
-            instanceid = des.get('instanceid', 0)
-            if any((des_d.get('classid', 0) == classid and des_d.get('instanceid', 0) == instanceid) for des_d in inventory if des):
+        self.more_items = next_invent.more_items
+        if not self.__appid: self.__appid = next_invent.__appid
+        self.__invalidate_columns()
+
+        for key, next_item in next_invent.__inventory_index.items():
+            original_item = self.__inventory_index.get(key)
+            if original_item:
+                original_item.extend_description(next_item)
                 continue
-            inventory.append(des)
-
-        for item in inventory:
-            classid = item.get('classid', 0)
-            if classid == 0: continue
-            instanceid = item.get('instanceid', 0)
-            item['items'] = [
-                item_d for item_d in self.assets if item_d.get('classid', 0) == classid and item_d.get('instanceid', 0) == instanceid
-            ]
-        self.inventory = [InventoryItemRgDescriptions(item) for item in inventory]
+            next_item.callback_change = self.__on_item_change
+            self.__inventory_index[key] = next_item
+            self.inventory.append(next_item)
+            orphan_assets = self.__orphan_assets.pop(key, None)
+            if orphan_assets: self.__attach_assets(next_item, orphan_assets)
+
+        for key, assets in next_invent.__orphan_assets.items():
+            original_item = self.__inventory_index.get(key)
+            if original_item:
+                self.__attach_assets(original_item, assets)
+            else:
+                self.__orphan_assets.setdefault(key, []).extend(assets)
+
+    def parse_inventory(self, descriptions: list[dict], assets: list[dict]):
+        self.inventory = []
+        self.__inventory_index = {}
+        self.__orphan_assets = {}
+        self.__invalidate_columns()
+
+        # Ассеты сразу сворачиваются в компактные строки InventoryItem.get_row, словари ответа не сохраняются.
+        # Ключ и строка собираются без вызовов функций: цикл выполняется для каждого ассета
+        orphan_assets = self.__orphan_assets
+        for asset in assets:
+            get = asset.get
+            key = (get('classid', 0), get('instanceid', 0))
+            if key[0] == 0: continue
+            row = (get('assetid') or get('id', ''), int(get('amount', 0)), get('contextid', 2), get('hide_in_china', 0), get('pos', 0))
+            group = orphan_assets.get(key)
+            if group is None: orphan_assets[key] = [row]
+            else: group.append(row)
+
+        for des in descriptions:
+            key = self.__get_key(des)
+            if key in self.__inventory_index: continue
+            item = InventoryItemRgDescriptions(des)
+            if key[0] != 0:
+                self.__attach_assets(item, self.__orphan_assets.pop(key, []))
+            item.callback_change = self.__on_item_change
+            self.__inventory_index[key] = item
+            self.inventory.append(item)
+
+    def is_complete(self) -> bool:
+        # more_items остаётся True, если догрузка следующих страниц оборвалась
+        return self.success and not self.more_items
 
     def get_tradable_inventory(self) -> list[InventoryItemRgDescriptions]:
+        columns = self.__get_columns()
+        if columns: return columns.get_items(only_tradable=True)
         return [item for item in self.inventory if item.is_tradable()]
 
     def get_marketable_inventory(self) -> list[InventoryItemRgDescriptions]:
+        columns = self.__get_columns()
+        if columns: return columns.get_items(only_marketable=True)
         return [item for item in self.inventory if item.is_marketable()]
 
     def get_amount_items(self, only_tradable=True) -> int:
+        columns = self.__get_columns()
+        if columns: return columns.get_amount(only_tradable=only_tradable)
         inventory = self.get_tradable_inventory() if only_tradable else self.inventory
         return sum([item.get_amount() for item in inventory])
 
+    def get_amount_by_item_id(self, only_tradable=False) -> dict[str, int]:
+        columns = self.__get_columns()
+        if columns: return columns.get_amount_by_item_id(only_tradable=only_tradable)
+        inventory = self.get_tradable_inventory() if only_tradable else self.inventory
+        return {item.get_item_id(): item.get_amount() for item in inventory}
+
+    def get_top_items(self, count: int, only_tradable=False) -> list[InventoryItemRgDescriptions]:
+        columns = self.__get_columns()
+        if columns: return columns.get_top_items(count, only_tradable=only_tradable)
+        if count <= 0: return []
+        inventory = self.get_tradable_inventory() if only_tradable else self.inventory
+        return sorted(inventory, key=lambda item: item.get_amount(), reverse=True)[:count]
+
 
 class InventoryItemTag:
+    __slots__ = ('category', 'internal_name', 'category_name', 'name')
+
     def __init__(self, tag_dict: dict = None):
         if not tag_dict: tag_dict = {}
         self.category = tag_dict.get('category', '')
@@ -432,11 +622,15 @@ class InventoryItemTag:
         self.category_name = tag_dict.get('category_name', '')
         self.name = tag_dict.get('name', '')
 
+    def get_save_data(self) -> dict:
+        return {'category': self.category, 'internal_name': self.internal_name, 'category_name': self.category_name, 'name': self.name}
+
 
 class InventoryItem:
+    __slots__ = ('appid', 'contextid', 'assetid', 'classid', 'instanceid', 'amount', 'hide_in_china', 'pos')
+
     def __init__(self, item_dict: dict = None):
         if not item_dict: item_dict = {}
-        self.data_json = item_dict
         self.appid = item_dict.get('appid', 0)
         self.contextid = item_dict.get('contextid', 2)
         self.assetid = item_dict.get('assetid', '') or item_dict.get('id', '')
@@ -446,17 +640,48 @@ class InventoryItem:
         self.hide_in_china = item_dict.get('hide_in_china', 0)
         self.pos = item_dict.get('pos', 0)
 
+    @staticmethod
+    def get_row(item_dict: dict) -> tuple:
+        # Компактная форма ассета без полей описания: (assetid, amount, contextid, hide_in_china, pos)
+        return (item_dict.get('assetid', '') or item_dict.get('id', ''), int(item_dict.get('amount', 0)), item_dict.get('contextid', 2),
+                item_dict.get('hide_in_china', 0), item_dict.get('pos', 0))
+
+    @classmethod
+    def create_from_row(cls, row: tuple, appid, classid, instanceid) -> InventoryItem:
+        item = cls.__new__(cls)
+        item.assetid, item.amount, item.contextid, item.hide_in_china, item.pos = row
+        item.appid, item.classid, item.instanceid = appid, classid, instanceid
+        return item
+
     def __repr__(self):
         return f'<classid: {self.classid}, instanceid: {self.instanceid}, amount: {self.amount}, pos: {self.pos}>'
 
     def __str__(self):
         return f'<classid: {self.classid}, instanceid: {self.instanceid}, amount: {self.amount}, pos: {self.pos}>'
 
+    def get_save_data(self) -> dict:
+        return {
+            'appid': self.appid,
+            'contextid': self.contextid,
+            'assetid': self.assetid,
+            'classid': self.classid,
+            'instanceid': self.instanceid,
+            'amount': str(self.amount),
+            'hide_in_china': self.hide_in_china,
+            'pos': self.pos,
+        }
+
 
 class InventoryItemRgDescriptions:
+    __slots__ = (
+        'appid', 'classid', 'instanceid', 'currency', 'background_color', 'icon_url', 'icon_url_large', 'tradable',
+        'name', 'name_color', 'type', 'market_name', 'market_hash_name', 'commodity', 'market_tradable_restriction',
+        'market_marketable_restriction', 'marketable', 'icon_drag_url', 'cache_expiration', 'callback_change',
+        '__items', '__items_index', '__asset_rows', '__amount', '__descriptions_json', '__tags_json', '__owner_descriptions_json', '__descriptions', '__tags', '__owner_descriptions',
+    )
+
     def __init__(self, rg_dict: dict = None):
         if not rg_dict: rg_dict = {}
-        self.data_json = rg_dict
         self.appid = rg_dict.get('appid', '')
         self.classid = rg_dict.get('classid', '')
         self.instanceid = rg_dict.get('instanceid', '')
@@ -464,7 +689,6 @@ class InventoryItemRgDescriptions:
         self.background_color = rg_dict.get('background_color', '')
         self.icon_url = rg_dict.get('icon_url', '')
         self.icon_url_large = rg_dict.get('icon_url_large', '')
-        self.descriptions = [ItemDescription(d) for d in rg_dict.get('descriptions', [])]
         self.tradable = rg_dict.get('tradable', 0)
         self.name = rg_dict.get('name', '')
         self.name_color = rg_dict.get('name_color', '')
@@ -475,14 +699,80 @@ class InventoryItemRgDescriptions:
         self.market_tradable_restriction = rg_dict.get('market_tradable_restriction', '')
         self.market_marketable_restriction = rg_dict.get('market_marketable_restriction', '')
         self.marketable = rg_dict.get('marketable', 0)
-        self.tags = [InventoryItemTag(t) for t in rg_dict.get('tags', [])]
-        self.items = [InventoryItem(i) for i in rg_dict.get('items', [])]
-        for item in self.items:
-            item.appid = self.appid
+        self.__items: list[InventoryItem] = []
+        self.__items_index: dict[str, InventoryItem] = {}
+        self.__asset_rows: list[tuple] = []
+        self.__amount: int = 0
+        if rg_dict.get('items'): self.extend_asset_rows([InventoryItem.get_row(asset) for asset in rg_dict['items']])
 
         self.icon_drag_url = rg_dict.get('icon_drag_url', '')
         self.cache_expiration = rg_dict.get('cache_expiration', '')
-        self.owner_descriptions = [ItemDescription(d) for d in rg_dict.get('owner_descriptions', [])]
+        self.callback_change: callable = None
+
+        # Описания и теги разбираются только при первом обращении
+        self.__descriptions_json: list = rg_dict.get('descriptions', []) or []
+        self.__tags_json: list = rg_dict.get('tags', []) or []
+        self.__owner_descriptions_json: list = rg_dict.get('owner_descriptions', []) or []
+        self.__descriptions: list[ItemDescription] | None = None
+        self.__tags: list[InventoryItemTag] | None = None
+        self.__owner_descriptions: list[ItemDescription] | None = None
+
+    @property
+    def items(self) -> list[InventoryItem]:
+        if self.__asset_rows: self.__load_assets()
+        return self.__items
+
+    @items.setter
+    def items(self, items: list[InventoryItem]):
+        self.__items = []
+        self.__items_index = {}
+        self.__asset_rows = []
+        self.__amount = 0
+        self.extend_items(items)
+
+    @property
+    def descriptions(self) -> list[ItemDescription]:
+        if self.__descriptions is None:
+            self.__descriptions = [ItemDescription(d) for d in self.__descriptions_json]
+        return self.__descriptions
+
+    @property
+    def tags(self) -> list[InventoryItemTag]:
+        if self.__tags is None:
+            self.__tags = [InventoryItemTag(t) for t in self.__tags_json]
+        return self.__tags
+
+    @property
+    def owner_descriptions(self) -> list[ItemDescription]:
+        if self.__owner_descriptions is None:
+            self.__owner_descriptions = [ItemDescription(d) for d in self.__owner_descriptions_json]
+        return self.__owner_descriptions
+
+    def get_save_data(self) -> dict:
+        return {
+            'appid': self.appid,
+            'classid': self.classid,
+            'instanceid': self.instanceid,
+            'currency': self.currency,
+            'background_color': self.background_color,
+            'icon_url': self.icon_url,
+            'icon_url_large': self.icon_url_large,
+            'descriptions': self.__descriptions_json,
+            'tradable': self.tradable,
+            'name': self.name,
+            'name_color': self.name_color,
+            'type': self.type,
+            'market_name': self.market_name,
+            'market_hash_name': self.market_hash_name,
+            'commodity': self.commodity,
+            'market_tradable_restriction': self.market_tradable_restriction,
+            'market_marketable_restriction': self.market_marketable_restriction,
+            'marketable': self.marketable,
+            'tags': self.__tags_json,
+            'icon_drag_url': self.icon_drag_url,
+            'cache_expiration': self.cache_expiration,
+            'owner_descriptions': self.__owner_descriptions_json,
+        }
 
     def __extract_date_from_owner_descriptions(self):
         if not self.owner_descriptions: return None
@@ -520,11 +810,10 @@ class InventoryItemRgDescriptions:
         return f'#{clear_color}'
 
     def get_amount(self):
-        amount = sum([int(i.amount) for i in self.items])
-        return amount if amount > 0 else 0
+        return self.__amount if self.__amount > 0 else 0
 
     def get_items_amount(self) -> int:
-        return len(self.items)
+        return len(self.__items) + len(self.__asset_rows)
 
     def get_market_url(self) -> str | None:
         if not self.market_hash_name: return
@@ -549,51 +838,102 @@ class InventoryItemRgDescriptions:
     def get_item_id(self) -> str:
         return f'{self.classid}_{self.instanceid}'
 
-    def get_amount_items(self, amount: int) -> InventoryItemRgDescriptions:
-        return_class = InventoryItemRgDescriptions(self.data_json)
-        return_class.items = copy.deepcopy(self.items)
-        for item in return_class.items:
-            if item.amount <= 0 or amount <= 0:
-                item.amount = 0
-                continue
-            if item.amount >= amount:
-                item.amount = amount
-                amount = 0
-            else:
-                amount -= item.amount
-        return return_class
+    def get_amount_items(self, amount: int) -> InventoryItemSelection:
+        return InventoryItemSelection.create(self, ((item, item.amount) for item in self.items), amount)
+
+    def get_item(self, assetid: str) -> InventoryItem | None:
+        if self.__asset_rows: self.__load_assets()
+        return self.__items_index.get(assetid)
+
+    def extend_items(self, items: list[InventoryItem]) -> None:
+        # Без проверки дубликатов и без callback_change: используется при разборе и слиянии страниц инвентаря
+        if self.__asset_rows: self.__load_assets()
+        self.__items.extend(items)
+        for item in items:
+            self.__items_index[item.assetid] = item
+            self.__amount += item.amount
+
+    def extend_asset_rows(self, rows: list[tuple]) -> None:
+        # Ассеты хранятся компактными строками InventoryItem.get_row, InventoryItem создаются при первом обращении к предметам
+        self.__asset_rows.extend(rows)
+        self.__amount += sum([row[1] for row in rows])
+
+    def extend_description(self, description: InventoryItemRgDescriptions) -> None:
+        # Слияние страниц инвентаря без создания InventoryItem для ещё не разобранных ассетов
+        if description.__items: self.extend_items(description.__items)
+        self.extend_asset_rows(description.__asset_rows)
+
+    def __load_assets(self):
+        rows, self.__asset_rows = self.__asset_rows, []
+        create_from_row, appid, classid, instanceid = InventoryItem.create_from_row, self.appid, self.classid, self.instanceid
+        items = [create_from_row(row, appid, classid, instanceid) for row in rows]
+        for item in items:
+            self.__items_index[item.assetid] = item
+        self.__items.extend(items)
+
+    def set_item_amount(self, item_class: 'InventoryItem', amount: int) -> None:
+        original_item = self.get_item(item_class.assetid)
+        if not original_item: return
+        self.__amount += amount - original_item.amount
+        original_item.amount = amount
+        if self.callback_change: self.callback_change(self)
+
+    def stack_items(self, stacks: list[tuple[str, str, int]]) -> None:
+        # stacks: (assetid источника, assetid цели, количество) — подтверждённые CombineItemStacks.
+        # Опустевшие ассеты удаляются одним проходом, общее количество не меняется
+        if self.__asset_rows: self.__load_assets()
+        changed = False
+        for fromitemid, destitemid, quantity in stacks:
+            fromitem, destitem = self.__items_index.get(fromitemid), self.__items_index.get(destitemid)
+            if not fromitem or not destitem or fromitem is destitem: continue
+            quantity = min(quantity, fromitem.amount)
+            fromitem.amount -= quantity
+            destitem.amount += quantity
+            changed = True
+        if not changed: return
+        self.__items = [item for item in self.__items if item.amount > 0]
+        self.__items_index = {item.assetid: item for item in self.__items}
+        if self.callback_change: self.callback_change(self)
 
     def add_items(self, inventory_item_class: 'InventoryItemRgDescriptions') -> None:
         if not inventory_item_class: return
         if inventory_item_class.instanceid != self.instanceid or inventory_item_class.classid != self.classid: return
         for item in inventory_item_class.items:
-            original_item = next((i for i in self.items if i.assetid == item.assetid), None)
-            if not original_item:
-                self.items.append(item)
-            else:
-                original_item.amount += item.amount
+            self.__add_item(item)
+        if self.callback_change: self.callback_change(self)
 
     def add_item(self, item_class: 'InventoryItem'):
         if not item_class: return
-        original_item = next((i for i in self.items if i.assetid == item_class.assetid), None)
-        if not original_item:
-            self.items.append(item_class)
-        else:
-            original_item.amount += item_class.amount
+        self.__add_item(item_class)
+        if self.callback_change: self.callback_change(self)
 
     def remove_items(self, inventory_item_class: 'InventoryItemRgDescriptions') -> None:
         if not inventory_item_class: return
         if inventory_item_class.instanceid != self.instanceid or inventory_item_class.classid != self.classid: return
         for item in inventory_item_class.items:
-            original_item = next((i for i in self.items if i.assetid == item.assetid), None)
-            if not original_item: continue
-            original_item.amount -= item.amount
+            self.__remove_item(item)
+        if self.callback_change: self.callback_change(self)
 
     def remove_item(self, item_class: 'InventoryItem'):
         if not item_class: return
-        original_item = next((i for i in self.items if i.assetid == item_class.assetid), None)
+        self.__remove_item(item_class)
+        if self.callback_change: self.callback_change(self)
+
+    def __add_item(self, item_class: 'InventoryItem'):
+        original_item = self.get_item(item_class.assetid)
+        if not original_item:
+            item_class = copy.copy(item_class)
+            self.__items.append(item_class)
+            self.__items_index[item_class.assetid] = item_class
+        else:
+            original_item.amount += item_class.amount
+        self.__amount += item_class.amount
+
+    def __remove_item(self, item_class: 'InventoryItem'):
+        original_item = self.get_item(item_class.assetid)
         if not original_item: return
         original_item.amount -= item_class.amount
+        self.__amount -= item_class.amount
 
     def __repr__(self):
         return f'<classid: {self.classid}, instanceid: {self.instanceid}, market_hash_name: {self.market_hash_name}, amount: {self.get_amount()}>'
@@ -602,10 +942,102 @@ class InventoryItemRgDescriptions:
         return f'<classid: {self.classid}, instanceid: {self.instanceid}, market_hash_name: {self.market_hash_name}, amount: {self.get_amount()}>'
 
 
+class InventoryItemSelection:
+    # Выбранная часть предметов описания: хранит только пары assetid -> количество, остальные поля берутся у parent
+    __slots__ = ('parent', 'callback_change', '__items', '__amount')
+
+    def __init__(self, parent: InventoryItemRgDescriptions):
+        self.parent = parent
+        self.callback_change: callable = None
+        self.__items: dict[str, tuple[InventoryItem, int]] = {}
+        self.__amount: int = 0
+
+    @classmethod
+    def create(cls, parent: InventoryItemRgDescriptions, items, amount: int) -> InventoryItemSelection:
+        selection = cls(parent)
+        for item, item_amount in items:
+            if amount <= 0: break
+            if item_amount <= 0: continue
+            item_amount = min(item_amount, amount)
+            amount -= item_amount
+            selection.__add(item, item_amount)
+        return selection
+
+    def __getattr__(self, name):
+        if name.startswith('_'): raise AttributeError(name)
+        return getattr(self.parent, name)
+
+    @property
+    def items(self) -> list[InventoryItem]:
+        items = []
+        for item, amount in self.__items.values():
+            item = copy.copy(item)
+            item.amount = amount
+            items.append(item)
+        return items
+
+    def get_amount(self):
+        return self.__amount if self.__amount > 0 else 0
+
+    def get_items_amount(self) -> int:
+        return len(self.__items)
+
+    def get_amount_items(self, amount: int) -> InventoryItemSelection:
+        return InventoryItemSelection.create(self.parent, self.__items.values(), amount)
+
+    def set_item_amount(self, item_class: 'InventoryItem', amount: int) -> None:
+        selected = self.__items.get(item_class.assetid)
+        if not selected: return
+        self.__items[item_class.assetid] = (selected[0], amount)
+        self.__amount += amount - selected[1]
+
+    def add_items(self, inventory_item_class: InventoryItemRgDescriptions | InventoryItemSelection) -> None:
+        if not inventory_item_class: return
+        if inventory_item_class.instanceid != self.instanceid or inventory_item_class.classid != self.classid: return
+        for item in inventory_item_class.items:
+            self.__add(item, item.amount)
+
+    def add_item(self, item_class: 'InventoryItem'):
+        if not item_class: return
+        self.__add(item_class, item_class.amount)
+
+    def remove_items(self, inventory_item_class: InventoryItemRgDescriptions | InventoryItemSelection) -> None:
+        if not inventory_item_class: return
+        if inventory_item_class.instanceid != self.instanceid or inventory_item_class.classid != self.classid: return
+        for item in inventory_item_class.items:
+            self.remove_item(item)
+
+    def remove_item(self, item_class: 'InventoryItem'):
+        if not item_class: return
+        selected = self.__items.get(item_class.assetid)
+        if not selected: return
+        self.__items[item_class.assetid] = (selected[0], selected[1] - item_class.amount)
+        self.__amount -= item_class.amount
+
+    def __add(self, item_class: 'InventoryItem', amount: int):
+        selected = self.__items.get(item_class.assetid)
+        if selected:
+            self.__items[item_class.assetid] = (selected[0], selected[1] + amount)
+        else:
+            self.__items[item_class.assetid] = (item_class, amount)
+        self.__amount += amount
+
+    def __repr__(self):
+        return f'<classid: {self.classid}, instanceid: {self.instanceid}, market_hash_name: {self.market_hash_name}, amount: {self.get_amount()}>'
+
+    def __str__(self):
+        return self.__repr__()
+
+
 class MarketAssetDescription:
+    __slots__ = (
+        'appid', 'classid', 'instanceid', 'name', 'name_color', 'market_name', 'market_hash_name', 'tradable', 'marketable',
+        'commodity', 'market_tradable_restriction', 'market_marketable_restriction', 'icon_url', 'icon_url_large',
+        'currency', 'type', 'background_color', '__descriptions_json', '__descriptions',
+    )
+
     def __init__(self, asset_description_dict: dict):
         if not asset_description_dict: asset_description_dict = {}
-        self.data_json = asset_description_dict
 
         self.appid = asset_description_dict.get('appid')
         self.classid = asset_description_dict.get('classid')
@@ -626,15 +1058,46 @@ class MarketAssetDescription:
         self.icon_url_large = asset_description_dict.get('icon_url_large')
 
         self.currency = asset_description_dict.get('currency')
-        self.descriptions = [ItemDescription(d) for d in asset_description_dict.get('descriptions', [])]
         self.type = asset_description_dict.get('type', "")
         self.background_color = asset_description_dict.get('background_color', "")
 
+        self.__descriptions_json: list = asset_description_dict.get('descriptions', []) or []
+        self.__descriptions: list[ItemDescription] | None = None
+
+    @property
+    def descriptions(self) -> list[ItemDescription]:
+        if self.__descriptions is None:
+            self.__descriptions = [ItemDescription(d) for d in self.__descriptions_json]
+        return self.__descriptions
+
+    def get_save_data(self) -> dict:
+        return {
+            'appid': self.appid,
+            'classid': self.classid,
+            'instanceid': self.instanceid,
+            'name': self.name,
+            'name_color': self.name_color,
+            'market_name': self.market_name,
+            'market_hash_name': self.market_hash_name,
+            'tradable': int(self.tradable),
+            'marketable': int(self.marketable),
+            'commodity': int(self.commodity),
+            'market_tradable_restriction': self.market_tradable_restriction,
+            'market_marketable_restriction': self.market_marketable_restriction,
+            'icon_url': self.icon_url,
+            'icon_url_large': self.icon_url_large,
+            'currency': self.currency,
+            'descriptions': self.__descriptions_json,
+            'type': self.type,
+            'background_color': self.background_color,
+        }
+
 
 class MarketListenItem:
+    __slots__ = ('name', 'hash_name', 'sell_listings', 'sell_price', 'sell_price_text', 'sale_price_text', 'asset_description', 'app_name', 'app_icon')
+
     def __init__(self, item_dict: dict = None):
         if not item_dict: item_dict = {}
-        self.data_json = item_dict
         self.name = item_dict.get('name', ' ')
         self.hash_name = item_dict.get('hash_name', '')
 
@@ -648,6 +1111,19 @@ class MarketListenItem:
         self.app_name = item_dict.get('app_name')
         self.app_icon = item_dict.get('app_icon')
 
+    def get_save_data(self) -> dict:
+        return {
+            'name': self.name,
+            'hash_name': self.hash_name,
+            'sell_listings': self.sell_listings,
+            'sell_price': self.sell_price,
+            'sell_price_text': self.sell_price_text,
+            'sale_price_text': self.sale_price_text,
+            'asset_description': self.asset_description.get_save_data(),
+            'app_name': self.app_name,
+            'app_icon': self.app_icon,
+        }
+
     def __repr__(self):
         return f'<{self.__class__.__name__}> name: {self.name}, price: {self.sell_price_text}, listings: {self.sell_price}'
 
@@ -802,16 +1278,31 @@ class MarketListingsManager:
         return next_page
 
     def add_next_page(self, next_page: MarketListingsManager):
-        if not next_page or not next_page.success: return
-
-        self.assets.update(next_page.assets)
-        self.listings.extend(next_page.listings)
-        self.listings_on_hold.extend(next_page.listings_on_hold)
-        self.listings_to_confirm.extend(next_page.listings_to_confirm)
-        self.buy_orders.extend(next_page.buy_orders)
+        return self.add_next_pages([next_page])
+
+    def add_next_pages(self, next_pages: list[MarketListingsManager]):
+        # Если во время загрузки появились новые лоты, страницы сдвигаются и лоты могут повториться
+        listing_ids = {listing.listingid for listing in self.listings}
+        for next_page in next_pages:
+            if not next_page or not next_page.success: continue
+
+            self.assets.update(next_page.assets)
+            for listing in next_page.listings:
+                if listing.listingid in listing_ids: continue
+                listing_ids.add(listing.listingid)
+                self.listings.append(listing)
+            self.listings_on_hold.extend(next_page.listings_on_hold)
+            self.listings_to_confirm.extend(next_page.listings_to_confirm)
+            self.buy_orders.extend(next_page.buy_orders)
 
         return self
 
+    def remove_listings(self, listing_ids: list[str]):
+        listing_ids = {str(listing_id) for listing_id in listing_ids}
+        listings = [listing for listing in self.listings if str(listing.listingid) not in listing_ids]
+        self.total_count = max(0, self.total_count - (len(self.listings) - len(listings)))
+        self.listings = listings
+
 
 class MarketListingsBuyOrderDescription:
     def __init__(self, data_json: dict = None):
@@ -1118,9 +1609,15 @@ class MarketListingsItem:
 
 
 class MarketListingsAsset:
+    __slots__ = (
+        'appid', 'app_icon', 'status', 'id', 'classid', 'instanceid', 'contextid', 'amount', 'original_amount', 'name',
+        'name_color', 'market_name', 'market_hash_name', 'icon_url', 'icon_url_large', 'background_color', 'commodity',
+        'tradable', 'marketable', 'currency', 'unowned_id', 'unowned_contextid', 'type', 'market_tradable_restriction',
+        'market_marketable_restriction', 'owner', '__descriptions_json', '__descriptions',
+    )
+
     def __init__(self, data_json: dict = None):
         if not data_json: data_json = {}
-        self.data_json = data_json
 
         self.appid = data_json.get('appid', 0)
         self.app_icon = data_json.get('app_icon', '')
@@ -1149,12 +1646,20 @@ class MarketListingsAsset:
         self.currency = data_json.get('currency', 0)
         self.unowned_id = data_json.get('unowned_id', '')
         self.unowned_contextid = data_json.get('unowned_contextid', '')
-        self.descriptions = [ItemDescription(item) for item in data_json.get('descriptions', [])]
         self.type = data_json.get('type', '')
         self.market_tradable_restriction = data_json.get('market_tradable_restriction', 0)
         self.market_marketable_restriction = data_json.get('market_marketable_restriction', 0)
         self.owner = data_json.get('owner', 0)
 
+        self.__descriptions_json: list = data_json.get('descriptions', []) or []
+        self.__descriptions: list[ItemDescription] | None = None
+
+    @property
+    def descriptions(self) -> list[ItemDescription]:
+        if self.__descriptions is None:
+            self.__descriptions = [ItemDescription(item) for item in self.__descriptions_json]
+        return self.__descriptions
+
     def __str__(self):
         return f"MarketListing: {self.market_hash_name} (ID: {self.id}, Amount: {self.amount})"
 
@@ -1190,12 +1695,22 @@ class MarketMyHistoryManager:
 
         return assets
 
+    @staticmethod
+    def __create_index(items: dict, key: str) -> dict:
+        # При повторяющихся id берётся первый, как раньше при линейном поиске
+        index = {}
+        for item in items.values():
+            index.setdefault(getattr(item, key), item)
+        return index
+
     def __parce_events(self, data_json: list) -> list[MarketMyHistoryParcedEvent]:
+        listings_index = self.__create_index(self.listings, 'listingid')
+        purchases_index = self.__create_index(self.purchases, 'purchaseid')
         events = []
         for event in data_json:
             event_class = MarketMyHistoryParcedEvent(event)
-            event_class.listing = next((item for item in self.listings.values() if item.listingid == event_class.listingid), None)
-            event_class.purchase = next((item for item in self.purchases.values() if item.purchaseid == event_class.purchaseid), None)
+            event_class.listing = listings_index.get(event_class.listingid, None)
+            event_class.purchase = purchases_index.get(event_class.purchaseid, None)
             if event_class.listing:
                 event_class.asset = self.assets.get(f"{event_class.listing.asset.appid}_{event_class.listing.asset.contextid}_{event_class.listing.asset.id}", None)
             events.append(event_class)
@@ -1209,15 +1724,20 @@ class MarketMyHistoryManager:
 
     def add_next_page(self, next_page: MarketMyHistoryManager):
         if not next_page or not next_page.success: return
+        return self.add_next_pages([next_page])
 
-        self.assets.update(next_page.assets)
-        self.events.extend(next_page.events)
-        self.purchases.update(next_page.purchases)
-        self.listings.update(next_page.listings)
+    def add_next_pages(self, next_pages: list[MarketMyHistoryManager]):
+        next_pages = [next_page for next_page in next_pages if next_page and next_page.success]
+        for next_page in next_pages:
+            self.assets.update(next_page.assets)
+            self.events.extend(next_page.events)
+            self.purchases.update(next_page.purchases)
+            self.listings.update(next_page.listings)
 
-        self.parced_events.extend(next_page.parced_events)
-
-        self.parced_events.sort(key=lambda x: x.time_event, reverse=True)
+        # Страницы сортируются по отдельности (Steam отдаёт их уже почти упорядоченными) и сливаются за один проход.
+        # Сортировка и heapq.merge устойчивы, поэтому порядок совпадает с сортировкой всего списка
+        runs = [sorted(page.parced_events, key=lambda x: x.time_event, reverse=True) for page in [self, *next_pages]]
+        self.parced_events = list(heapq.merge(*runs, key=lambda x: x.time_event, reverse=True))
 
         return self
 
@@ -1245,6 +1765,25 @@ class MarketMyHistoryParcedEvent:
         self.listing: MarketMyHistoryListings | None = None
         self.purchase: MarketMyHistoryPurchases | None = None
 
+    @classmethod
+    def create_from_save_data(cls, save_data: dict) -> MarketMyHistoryParcedEvent:
+        event = cls(save_data.get('event', {}))
+        if save_data.get('listing'): event.listing = MarketMyHistoryListings(save_data['listing'])
+        if save_data.get('purchase'): event.purchase = MarketMyHistoryPurchases(save_data['purchase'])
+        if save_data.get('asset'): event.asset = MarketMyHistoryAssets(save_data['asset'])
+        return event
+
+    def get_save_data(self) -> dict:
+        return {
+            'event': self.data_json,
+            'listing': self.listing.data_json if self.listing else None,
+            'purchase': self.purchase.data_json if self.purchase else None,
+            'asset': self.asset.data_json if self.asset else None,
+        }
+
+    def get_key(self) -> tuple[str, str, int, int]:
+        return self.listingid, self.purchaseid, self.time_event, self.event_type
+
     def __str__(self):
         return f"MarketMyHistoryParcedEvent: {self.datetime_event} (Type: {self.event_type}, ListingID: {self.listingid}, SteamID: {self.steamid_actor}, PurchaseID: {self.purchaseid})"
 
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import urllib.parse
+
+import aiohttp
+from yarl import URL
+
+from app.core import Account
+from app.database import sql_manager
+from .histogram_cache import HistogramCache, market_histogram_cache
+from .steam_api_utility import SteamAPIUtility, InventoryManager, InventoryItem, ItemOrdersHistogram, MarketListingsManager, MarketListingsListing
+from .steam_transport import SteamTransport, steam_transport
+
+
+class AsyncSteamAPIUtility:
+    def __init__(self, account: Account = None, max_concurrency: int = 8, transport: SteamTransport = None, histogram_cache: HistogramCache = None):
+        self.account = account
+        self.max_concurrency = max_concurrency
+        self.transport = transport or steam_transport
+        self.histogram_cache = histogram_cache or market_histogram_cache
+        self.session_id: str | None = None
+        self.__session: aiohttp.ClientSession | None = None
+        self.__semaphore: asyncio.Semaphore | None = None
+
+    async def __aenter__(self) -> AsyncSteamAPIUtility:
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def open(self):
+        if self.__session: return
+        # Куки и заголовки копируются из Account.session, чтобы запросы шли от той же авторизованной сессии
+        cookie_jar = aiohttp.CookieJar()
+        if self.account:
+            for cookie in self.account.session.cookies:
+                domain = cookie.domain.lstrip('.') or 'steamcommunity.com'
+                cookie_jar.update_cookies({cookie.name: cookie.value}, response_url=URL(f'https://{domain}{cookie.path or "/"}'))
+        headers = dict(self.account.session.headers) if self.account else {}
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        self.__session = aiohttp.ClientSession(cookie_jar=cookie_jar, headers=headers, connector=connector, timeout=aiohttp.ClientTimeout(total=self.transport.timeout))
+        self.__semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if not self.__session: return
+        await self.__session.close()
+        self.__session = None
+
+    async def __is_alive(self) -> bool:
+        # is_alive_session может сделать блокирующий запрос requests: выполняется вне event loop
+        if not self.account or not self.__session: return False
+        return bool(await asyncio.to_thread(self.account.is_alive_session))
+
+    async def __request(self, method: str, url: str, idempotent: bool = None, read: callable = None, **kwargs) -> tuple[int, str]:
+        if idempotent is None: idempotent = method == 'get'
+        bucket = self.transport.get_bucket(self.transport.get_endpoint(url))
+        retry_policy = self.transport.retry_policy
+
+        attempt = 0
+        async with self.__semaphore:
+            while True:
+                attempt += 1
+                await bucket.acquire_async()
+                try:
+                    async with self.__session.request(method, url, **kwargs) as response:
+                        text = await read(response) if read else await response.text()
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if not idempotent or attempt >= retry_policy.max_attempts: raise
+                    await asyncio.sleep(retry_policy.get_delay(attempt))
+                    continue
+
+                if not retry_policy.is_retry_status(response.status, idempotent): return response.status, text
+                if attempt >= retry_policy.max_attempts: return response.status, text
+                delay = retry_policy.get_delay(attempt, response)
+                if response.status == 429:
+                    bucket.pause(delay)
+                else:
+                    await asyncio.sleep(delay)
+
+    async def __request_json(self, method: str, url: str, **kwargs) -> dict | None:
+        try:
+            status, text = await self.__request(method, url, **kwargs)
+            if not 200 <= status < 400: return None
+            return json.loads(text)
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+
+    @staticmethod
+    async def __read_item_nameid(response: aiohttp.ClientResponse) -> int | None:
+        # Страница читается потоком до первого совпадения, остаток не скачивается
+        if not 200 <= response.status < 400: return None
+        buffer = b''
+        async for chunk in response.content.iter_chunked(16384):
+            buffer = buffer[-128:] + chunk
+            item_nameid = SteamAPIUtility.parse_item_nameid(buffer.decode('utf-8', errors='ignore'))
+            if item_nameid: return item_nameid
+        return None
+
+    async def __load_item_nameid(self, market_hash_name: str, appid: int) -> int | None:
+        url = f"https://steamcommunity.com/market/listings/{appid}/{urllib.parse.quote(market_hash_name)}"
+        try:
+            _, item_nameid = await self.__request('get', url, read=self.__read_item_nameid)
+            return item_nameid
+        except Exception as e:
+            print(f"Error fetching market item ID: {e}")
+            return None
+
+    async def fetch_session_id(self) -> str | None:
+        if self.session_id: return self.session_id
+        if not await self.__is_alive(): return None
+        try:
+            status, text = await self.__request('get', 'https://steamcommunity.com/market/')
+            if 200 <= status < 400:
+                self.session_id = SteamAPIUtility.parse_session_id(text)
+            return self.session_id
+        except Exception as e:
+            print(f"Error fetching session ID: {e}")
+            return None
+
+    async def get_inventory_items(self, steam_id: str | int = None, appid=3017120, start=0, context_id=2) -> InventoryManager | None:
+        if not await self.__is_alive(): return None
+        if not steam_id: steam_id = self.account.steam_id
+        is_my_inventory = str(self.account.steam_id) == str(steam_id)
+
+        inventory = None
+        while True:
+            if is_my_inventory:
+                url = f'https://steamcommunity.com/inventory/{steam_id}/{appid}/{context_id}?count=2000'
+                if start: url += f'&start_assetid={start}'
+                page_json = await self.__request_json('get', url)
+                next_start = page_json.get('last_assetid') if page_json and page_json.get('more_items') else None
+            else:
+                params = {'sessionid': self.account.session.cookies.get('sessionid', domain='steamcommunity.com'), 'partner': steam_id, 'appid': appid, 'contextid': context_id}
+                if start: params['start'] = start
+                headers = {'referer': "https://steamcommunity.com/tradeoffer/new"}
+                page_json = await self.__request_json('get', 'https://steamcommunity.com/tradeoffer/new/partnerinventory/', params=params, headers=headers)
+                next_start = page_json.get('more_start') if page_json and page_json.get('more') else None
+
+            if not page_json or not page_json.get('success', False): return inventory
+            inventory_page = InventoryManager(page_json, context_id=context_id)
+            if inventory is None:
+                inventory = inventory_page
+            else:
+                inventory.add_next_invent(inventory_page)
+            if not next_start: return inventory
+            start = next_start
+
+    async def fetch_item_nameid(self, market_hash_name: str, appid: int = 3017120) -> int | None:
+        if not market_hash_name or not appid: return None
+        saved_item_nameid = sql_manager.item_nameid_get(appid=appid, market_hash_name=market_hash_name)
+        if saved_item_nameid: return saved_item_nameid
+        if not await self.__is_alive(): return None
+
+        item_nameid = await self.__load_item_nameid(market_hash_name=market_hash_name, appid=appid)
+        if not item_nameid: return None
+
+        sql_manager.item_nameid_save(appid=appid, market_hash_name=market_hash_name, nameid=item_nameid)
+        return item_nameid
+
+    async def fetch_item_nameids(self, market_hash_names: list[str], appid: int = 3017120) -> dict[str, int]:
+        # Недостающие item_nameid грузятся параллельно и сохраняются одной транзакцией
+        missing = sql_manager.item_nameid_missing_get(appid=appid, market_hash_names=market_hash_names)
+        if missing and await self.__is_alive():
+            async def load(market_hash_name: str) -> tuple[str, int | None]:
+                return market_hash_name, await self.__load_item_nameid(market_hash_name=market_hash_name, appid=appid)
+
+            loaded = await asyncio.gather(*(load(market_hash_name) for market_hash_name in missing))
+            sql_manager.item_nameid_save_many(appid=appid, nameids={market_hash_name: item_nameid for market_hash_name, item_nameid in loaded if item_nameid})
+
+        item_nameids = {market_hash_name: sql_manager.item_nameid_get(appid=appid, market_hash_name=market_hash_name) for market_hash_name in market_hash_names}
+        return {market_hash_name: item_nameid for market_hash_name, item_nameid in item_nameids.items() if item_nameid}
+
+    async def fetch_market_itemordershistogram(self, market_hash_name: str, appid: int = 3017120) -> ItemOrdersHistogram | None:
+        if not await self.__is_alive(): return None
+        item_nameid = await self.fetch_item_nameid(market_hash_name=market_hash_name, appid=appid)
+        if not item_nameid: return None
+        await asyncio.to_thread(self.account.load_wallet_info)
+        country = self.account.wallet_country
+        currency = self.account.wallet_currency
+
+        async def load() -> ItemOrdersHistogram | None:
+            params = {'country': country, 'language': 'english', 'currency': currency, 'item_nameid': item_nameid}
+            url = f"https://steamcommunity.com/market/itemordershistogram?{urllib.parse.urlencode(params)}"
+            json_itemordershistogram = await self.__request_json('get', url)
+            if not json_itemordershistogram: return None
+            class_itemordershistogram = ItemOrdersHistogram(json_itemordershistogram)
+            return class_itemordershistogram if class_itemordershistogram.is_successful() else None
+
+        key = self.histogram_cache.make_key(appid=appid, item_nameid=item_nameid, currency=currency, country=country)
+        return await self.histogram_cache.get_or_load_async(key, load)
+
+    async def fetch_market_itemordershistograms(self, items: list[tuple[int | str, str]], on_result: callable = None) -> dict[tuple[int | str, str], ItemOrdersHistogram | None]:
+        # Гистограммы грузятся параллельно (в пределах max_concurrency и лимитов транспорта), on_result вызывается по мере готовности
+        async def fetch(appid, market_hash_name):
+            histogram = await self.fetch_market_itemordershistogram(market_hash_name=market_hash_name, appid=appid)
+            if on_result: on_result(appid, market_hash_name, histogram)
+            return (appid, market_hash_name), histogram
+
+        items = list(dict.fromkeys(items))
+        if items: await asyncio.to_thread(self.account.load_wallet_info)
+        for appid in dict.fromkeys(appid for appid, _ in items):
+            await self.fetch_item_nameids([market_hash_name for item_appid, market_hash_name in items if item_appid == appid], appid=appid)
+        results = await asyncio.gather(*(fetch(appid, market_hash_name) for appid, market_hash_name in items))
+        return dict(results)
+
+    async def sell_item(self, item: InventoryItem, amount: int | str = 1, price: int | str = 0) -> dict | None:
+        if not item or not amount or not price: return None
+        if not await self.__is_alive(): return None
+        sessionid = await self.fetch_session_id()
+        if not item.assetid or not sessionid: return None
+
+        params = {'sessionid': sessionid, 'appid': item.appid, 'contextid': item.contextid, 'assetid': item.assetid, 'amount': amount, 'price': price}
+        headers = {'Referer': f"https://steamcommunity.com/profiles/{self.account.steam_id}/inventory"}
+        return await self.__request_json('post', 'https://steamcommunity.com/market/sellitem/', data=params, headers=headers)
+
+    async def remove_my_listing(self, item: MarketListingsListing) -> bool:
+        if not item or not item.listingid: return False
+        if not await self.__is_alive(): return False
+        sessionid = await self.fetch_session_id()
+        if not sessionid: return False
+
+        url = f'https://steamcommunity.com/market/removelisting/{item.listingid}'
+        headers = {"Origin": "https://steamcommunity.com", "Referer": "https://steamcommunity.com/market/"}
+        try:
+            status, _ = await self.__request('post', url, data={'sessionid': sessionid}, headers=headers)
+            return 200 <= status < 400
+        except Exception as e:
+            print(f"Error removing listing {item.listingid}: {e}")
+            return False
+
+    async def combine_itemstacks(self, fromitem: InventoryItem, destitem: InventoryItem) -> dict | None:
+        if not fromitem or not destitem: return None
+        if fromitem.appid != destitem.appid or fromitem.assetid == destitem.assetid: return None
+        if not await self.__is_alive(): return None
+
+        data = {
+            'appid': fromitem.appid,
+            'fromitemid': fromitem.assetid,
+            'destitemid': destitem.assetid,
+            'quantity': fromitem.amount,
+            'steamid': self.account.steam_id,
+        }
+        return await self.post_web_api('https://api.steampowered.com/IInventoryService/CombineItemStacks/v1/', data=data)
+
+    async def post_web_api(self, url: str, data: dict) -> dict | None:
+        # При 401/403 токен сбрасывается и запрос повторяется один раз со свежим
+        for attempt in range(2):
+            access_token = await asyncio.to_thread(self.account.get_steam_web_token)
+            if not access_token: return None
+            try:
+                status, text = await self.__request('post', url, data={'access_token': access_token, **data})
+            except Exception as e:
+                print(f"Error fetching {url}: {e}")
+                return None
+            if status in (401, 403) and not attempt:
+                self.account.invalidate_steam_web_token(access_token)
+                continue
+            if not 200 <= status < 400: return None
+            try:
+                return json.loads(text)
+            except Exception:
+                return None
+        return None
+
+    async def fetch_my_listings(self, count: int = 100) -> MarketListingsManager | None:
+        if not await self.__is_alive(): return None
+
+        async def fetch_page(start: int) -> MarketListingsManager | None:
+            params = {'norender': 1, 'start': start, 'count': count}
+            page_json = await self.__request_json('get', 'https://steamcommunity.com/market/mylistings', params=params)
+            if not page_json or not page_json.get('success', False): return None
+            return MarketListingsManager(page_json)
+
+        listings = await fetch_page(0)
+        if not listings or listings.get_next_page_start() is None: return listings
+
+        page_size = listings.pagesize or count
+        next_pages = await asyncio.gather(*(fetch_page(start) for start in range(page_size, listings.total_count, page_size)))
+        return listings.add_next_pages(next_pages)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.__tokens = float(capacity)
+        self.__updated = time.monotonic()
+        self.__paused_until = 0.0
+        self.__lock = threading.Lock()
+
+    def __try_acquire(self) -> float:
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            if now >= self.__paused_until and self.__tokens >= 1:
+                self.__tokens -= 1
+                return 0
+            return max(self.__paused_until - now, (1 - self.__tokens) / self.rate)
+
+    def acquire(self):
+        while wait := self.__try_acquire():
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while wait := self.__try_acquire():
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        # После 429 все потоки этого эндпоинта ждут вместе, а не по очереди получают новые 429
+        with self.__lock:
+            self.__paused_until = max(self.__paused_until, time.monotonic() + seconds)
+            self.__tokens = 0
+
+    def get_interval(self) -> float:
+        return 1 / self.rate
+
+    def set_rate(self, rate: float, capacity: int = None):
+        # Накопленные токены пересчитываются по старой скорости, дальше действует новая
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            self.rate = rate
+            if capacity is not None:
+                self.capacity = capacity
+                self.__tokens = min(self.__tokens, capacity)
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 1.0, backoff_max: float = 30.0, retry_statuses: tuple = (429, 500, 502, 503, 504)):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = retry_statuses
+
+    def get_delay(self, attempt: int, response: requests.Response | None = None) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        delay = min(self.backoff_base * 2 ** (attempt - 1), self.backoff_max)
+        return delay + random.uniform(0, delay / 4)
+
+    def is_retry_status(self, status_code: int, idempotent: bool = True) -> bool:
+        if status_code == 429: return True
+        return idempotent and status_code in self.retry_statuses
+
+
+class SteamTransport:
+    default_rates = {
+        'market': (2.0, 10),
+        'market_removelisting': (4.0, 4),
+        'market_histogram': (10.0, 20),
+        'inventory': (0.5, 3),
+        'inventory_service': (20.0, 20),
+        'default': (5.0, 10),
+    }
+
+    def __init__(self, rates: dict[str, tuple[float, int]] = None, retry_policy: RetryPolicy = None, timeout: float = 10, pool_maxsize: int = 32):
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.buckets: dict[str, TokenBucket] = {
+            endpoint: TokenBucket(rate=rate, capacity=capacity)
+            for endpoint, (rate, capacity) in {**self.default_rates, **(rates or {})}.items()
+        }
+        self.__mounted_sessions = weakref.WeakSet()
+        self.__listeners = weakref.WeakKeyDictionary()
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def get_endpoint(url: str) -> str:
+        if 'IInventoryService' in url: return 'inventory_service'
+        if 'steamcommunity.com/inventory/' in url or '/partnerinventory/' in url: return 'inventory'
+        if 'steamcommunity.com/market/itemordershistogram' in url: return 'market_histogram'
+        if 'steamcommunity.com/market/removelisting/' in url: return 'market_removelisting'
+        if 'steamcommunity.com/market/' in url: return 'market'
+        return 'default'
+
+    def get_bucket(self, endpoint: str) -> TokenBucket:
+        return self.buckets.get(endpoint, self.buckets['default'])
+
+    def __mount_pool(self, session: requests.Session):
+        with self.__lock:
+            if session in self.__mounted_sessions: return
+            adapter = HTTPAdapter(pool_connections=len(self.buckets), pool_maxsize=self.pool_maxsize, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self.__mounted_sessions.add(session)
+
+    def set_response_listener(self, session: requests.Session, listener):
+        # listener.on_response(response) получает итоговый ответ каждого запроса по сессии. Ссылки слабые: транспорт не держит аккаунты
+        if session is None or listener is None: return
+        with self.__lock:
+            self.__listeners[session] = weakref.ref(listener)
+
+    def __notify(self, session: requests.Session, response: requests.Response) -> requests.Response:
+        listener_ref = self.__listeners.get(session)
+        listener = listener_ref() if listener_ref else None
+        if listener: listener.on_response(response)
+        return response
+
+    def request(self, session: requests.Session, method: str, url: str, endpoint: str = None, idempotent: bool = None, retry_policy: RetryPolicy = None, **kwargs) -> requests.Response:
+        # Повторы: 429 всегда (запрос не выполнен), 5xx и сетевые ошибки только для идемпотентных запросов.
+        # retry_policy заменяет общую политику для одного вызова, например когда темп задаёт вызывающий код
+        retry_policy = retry_policy or self.retry_policy
+        method = method.lower()
+        if idempotent is None: idempotent = method == 'get'
+        kwargs.setdefault('timeout', self.timeout)
+        bucket = self.get_bucket(endpoint or self.get_endpoint(url))
+        self.__mount_pool(session)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            bucket.acquire()
+            try:
+                response = getattr(session, method)(url=url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if not idempotent or attempt >= retry_policy.max_attempts: raise
+                time.sleep(retry_policy.get_delay(attempt))
+                continue
+
+            if not retry_policy.is_retry_status(response.status_code, idempotent): return self.__notify(session, response)
+            if attempt >= retry_policy.max_attempts: return self.__notify(session, response)
+            delay = retry_policy.get_delay(attempt, response)
+            if response.status_code == 429:
+                bucket.pause(delay)
+            else:
+                time.sleep(delay)
+
+    def get(self, session: requests.Session, url: str, **kwargs) -> requests.Response:
+        return self.request(session, 'get', url, **kwargs)
+
+    def post(self, session: requests.Session, url: str, **kwargs) -> requests.Response:
+        return self.request(session, 'post', url, **kwargs)
+
+
+steam_transport = SteamTransport()
@@ -4,7 +4,8 @@
 __version__ = "1.0.0"
 __author__ = "Kostya12rus"
 
-__all__ = ["steam_session_manager", "note_js_utility"]
+__all__ = ["steam_session_manager", "session_sidecar", "note_js_utility"]
 
 from .manager_session import steam_session_manager
+from .session_sidecar import session_sidecar
 from .update_or_install import note_js_utility
@@ -1,21 +1,18 @@
 import base64
 import io
-import os
-import pathlib
-import subprocess
-import threading
-import time
 
 import qrcode
 import requests
 
 from app.callback import callback_manager, EventName
 from app.core.manager_class import Account
+from .session_sidecar import SessionSidecar, SidecarRequest, session_sidecar
 
 
 class CreateSteamSession:
-    def __init__(self):
-        self.__path_js_dir = pathlib.Path(os.path.abspath(__file__)).parent
+    def __init__(self, sidecar: SessionSidecar = None, timeout: float = 120):
+        self.sidecar = sidecar or session_sidecar
+        self.timeout = timeout
         self.already_work = False
 
     @staticmethod
@@ -58,76 +55,49 @@ class CreateSteamSession:
 
         return img_base64
 
-    def create_qr_code(self, *args):
-        if self.already_work: return
-        self.already_work = True
+    def prewarm(self):
+        self.sidecar.prewarm()
 
-        script_path = self.__path_js_dir / 'session_qrcode.js'
-        if not script_path.is_file():
-            print(f"Скрипт {script_path} не найден.")
-            callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, f"Скрипт {script_path} не найден.")
-            self.already_work = False
-            return
+    def __apply_result(self, account: Account, result: dict) -> Account:
+        if result.get('account_name'): account.account_name = result['account_name']
+        if result.get('steam_id'): account.steam_id = result['steam_id']
+        if result.get('refresh_token'): account.refresh_token = result['refresh_token']
+        for cookie_line in result.get('cookies', []):
+            cookie = self.__parse_cookie_line(cookie_line)
+            if cookie: account.session.cookies.set_cookie(cookie)
+        return account
 
+    def __start_request(self, request_type: str, on_event: callable = None, **params) -> SidecarRequest | None:
         try:
-            process = subprocess.Popen(
-                ['node', str(script_path)],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            qr_code_generated = False
-            account = Account()
-
-            def read_stdout():
-                nonlocal qr_code_generated, account
-                for line in process.stdout:
-                    line = line.strip()
-                    if line:
-                        if line.startswith("http"):
-                            qr_url = line
-                            qr_code_image = self.__generate_qr_code(qr_url)
-                            callback_manager.trigger(EventName.ON_QR_CODE_READY, qr_code_image)
-                            qr_code_generated = True
-                        elif line.startswith("accountName"):
-                            account_name = line.split("=")[1].strip()
-                            account.account_name = account_name
-                        elif line.startswith("steamID"):
-                            steam_id = line.split("=")[1].strip()
-                            account.steam_id = steam_id
-                        elif line.startswith("refreshToken"):
-                            refresh_token = line.split("=")[1].strip()
-                            account.refresh_token = refresh_token
-                        elif 'Domain=' in line:
-                            cookie = self.__parse_cookie_line(line)
-                            account.session.cookies.set_cookie(cookie)
-
-            stdout_thread = threading.Thread(target=read_stdout, daemon=True)
-            stdout_thread.start()
-
-            timeout = 120
-            start_time = time.time()
+            return self.sidecar.request(request_type, on_event=on_event, **params)
+        except FileNotFoundError:
+            callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, "Node.js не установлен или не добавлен в PATH.")
+        except Exception as e:
+            callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, str(e))
+        return None
 
-            while True:
-                if process.poll() is not None: break
-                if qr_code_generated: pass
-                if time.time() - start_time > timeout:
-                    print("Таймаут ожидания QR-кода.")
-                    process.terminate()
-                    callback_manager.trigger(EventName.ON_QR_CODE_TIMEOUT)
-                    self.already_work = False
-                    return
-                time.sleep(0.5)
+    def __wait_request(self, request: SidecarRequest) -> dict | None:
+        # Ответ приходит событием из потока чтения sidecar; по таймауту попытка входа отменяется
+        result = request.wait(self.timeout)
+        if result is None: self.sidecar.cancel(request)
+        return result
 
-            if process.returncode == 0:
-                callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_IN, account)
+    def create_qr_code(self, *args):
+        if self.already_work: return
+        self.already_work = True
+        try:
+            def on_event(message: dict):
+                if message.get('event') == 'qr_url':
+                    callback_manager.trigger(EventName.ON_QR_CODE_READY, self.__generate_qr_code(message['url']))
+
+            request = self.__start_request('qr', on_event=on_event)
+            if not request: return
+            result = self.__wait_request(request)
+            if result and result.get('event') == 'authenticated':
+                callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_IN, self.__apply_result(Account(), result))
             else:
+                if result is None: print("Таймаут ожидания QR-кода.")
                 callback_manager.trigger(EventName.ON_QR_CODE_TIMEOUT)
-        except FileNotFoundError:
-            callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, "Node.js не установлен или не добавлен в PATH.")
         except Exception as e:
             callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, str(e))
         finally:
@@ -136,71 +106,25 @@ class CreateSteamSession:
     def create_login_password(self, login, password, guard_code):
         if self.already_work: return
         self.already_work = True
-
-        script_path = self.__path_js_dir / 'session_login_password.js'
-        if not script_path.is_file():
-            print(f"Скрипт {script_path} не найден.")
-            callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, f"Скрипт {script_path} не найден.")
-            self.already_work = False
-            return
-
         try:
-            process = subprocess.Popen(
-                ['node', str(script_path), f'{login}:{password}:{guard_code}'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            account = Account()
-            account.account_name = login
-            account.password = password
-
-            def read_stdout():
-                nonlocal account
-                for line in process.stdout:
-                    line = line.strip()
-                    if line:
-                        if line.startswith("accountName"):
-                            account_name = line.split("=")[1].strip()
-                            account.account_name = account_name
-                        elif line.startswith("steamID"):
-                            steam_id = line.split("=")[1].strip()
-                            account.steam_id = steam_id
-                        elif line.startswith("refreshToken"):
-                            refresh_token = line.split("=")[1].strip()
-                            account.refresh_token = refresh_token
-                        elif 'Domain=' in line:
-                            cookie = self.__parse_cookie_line(line)
-                            account.session.cookies.set_cookie(cookie)
-                        elif 'DeviceConfirmation' in line:
-                            callback_manager.trigger(EventName.ON_REQUEST_CONFIRMATION_DEVICE)
-                        elif 'EmailConfirmation' in line:
-                            callback_manager.trigger(EventName.ON_REQUEST_CONFIRMATION_EMAIL)
-
-            stdout_thread = threading.Thread(target=read_stdout, daemon=True)
-            stdout_thread.start()
-
-            timeout = 120
-            start_time = time.time()
-
-            while True:
-                if process.poll() is not None: break
-                if time.time() - start_time > timeout:
-                    process.terminate()
-                    callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, "Таймаут ожидания Входа в аккаунт.")
-                    self.already_work = False
-                    return
-                time.sleep(0.5)
-
-            if process.returncode == 0:
-                callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_IN, account)
+            def on_event(message: dict):
+                if message.get('event') == 'device_confirmation':
+                    callback_manager.trigger(EventName.ON_REQUEST_CONFIRMATION_DEVICE)
+                elif message.get('event') == 'email_confirmation':
+                    callback_manager.trigger(EventName.ON_REQUEST_CONFIRMATION_EMAIL)
+
+            request = self.__start_request('login', on_event=on_event, account_name=login, password=password, guard_code=guard_code)
+            if not request: return
+            result = self.__wait_request(request)
+            if result is None:
+                callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, "Таймаут ожидания Входа в аккаунт.")
+            elif result.get('event') == 'authenticated':
+                account = Account()
+                account.account_name = login
+                account.password = password
+                callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_IN, self.__apply_result(account, result))
             else:
                 callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, "Authentication failed.")
-        except FileNotFoundError:
-            callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, "Node.js не установлен или не добавлен в PATH.")
         except Exception as e:
             callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, str(e))
         finally:
@@ -214,65 +138,40 @@ class CreateSteamSession:
             return
 
         self.already_work = True
-
-        script_path = self.__path_js_dir / 'session_refresh_token.js'
-        if not script_path.is_file():
-            print(f"Скрипт {script_path} не найден.")
-            callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, f"Скрипт {script_path} не найден.")
-            self.already_work = False
-            return
-
         try:
-            process = subprocess.Popen(
-                ['node', str(script_path), f'{account.refresh_token}'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-
-            def read_stdout():
-                nonlocal account
-                for line in process.stdout:
-                    line = line.strip()
-                    if line:
-                        if line.startswith("steamID"):
-                            steam_id = line.split("=")[1].strip()
-                            account.steam_id = steam_id
-                        elif line.startswith("refreshToken"):
-                            refresh_token = line.split("=")[1].strip()
-                            account.refresh_token = refresh_token
-                        elif 'Domain=' in line:
-                            cookie = self.__parse_cookie_line(line)
-                            account.session.cookies.set_cookie(cookie)
-
-            stdout_thread = threading.Thread(target=read_stdout, daemon=True)
-            stdout_thread.start()
-
-            timeout = 120
-            start_time = time.time()
-
-            while True:
-                if process.poll() is not None: break
-                if time.time() - start_time > timeout:
-                    process.terminate()
-                    callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, "Таймаут ожидания Входа в аккаунт.")
-                    self.already_work = False
-                    return
-                time.sleep(0.5)
-
-            if process.returncode == 0:
-                callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_IN, account)
+            request = self.__start_request('refresh', refresh_token=account.refresh_token)
+            if not request: return
+            result = self.__wait_request(request)
+            if result is None:
+                callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, "Таймаут ожидания Входа в аккаунт.")
+            elif result.get('event') == 'authenticated':
+                callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_IN, self.__apply_result(account, result))
             else:
                 callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, "Authentication failed.")
-        except FileNotFoundError:
-            callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, "Node.js не установлен или не добавлен в PATH.")
         except Exception as e:
             callback_manager.trigger(EventName.ON_ACCOUNT_LOGGED_ERROR, str(e))
         finally:
             self.already_work = False
 
+    def refresh_accounts(self, accounts: list[Account]) -> list[Account]:
+        # Обновление cookies сразу для многих аккаунтов: все запросы отправляются в sidecar одновременно,
+        # колбэки входа не вызываются. Возвращает аккаунты, для которых обновление прошло успешно
+        accounts = [account for account in accounts if account and account.refresh_token]
+        if not accounts: return []
+        try:
+            sidecar_requests = [self.sidecar.request('refresh', refresh_token=account.refresh_token) for account in accounts]
+        except Exception as e:
+            print(f"Ошибка обновления аккаунтов: {e}")
+            return []
+
+        refreshed = []
+        for account, request in zip(accounts, sidecar_requests):
+            result = self.__wait_request(request)
+            if result and result.get('event') == 'authenticated':
+                refreshed.append(self.__apply_result(account, result))
+            else:
+                print(f"Не удалось обновить аккаунт {account.account_name}: {result}")
+        return refreshed
+
 
 steam_session_manager = CreateSteamSession()
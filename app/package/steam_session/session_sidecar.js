@@ -0,0 +1,108 @@
+const readline = require('readline');
+const { EAuthSessionGuardType, EAuthTokenPlatformType, LoginSession } = require('steam-session');
+
+// node session_sidecar.js
+// Долгоживущий процесс: запросы и ответы — JSON по одному на строку (stdin/stdout).
+// Запросы: {"id": 1, "type": "qr"}, {"id": 2, "type": "login", "account_name", "password", "guard_code"},
+//          {"id": 3, "type": "refresh", "refresh_token"}, {"id": 1, "type": "cancel"}
+// Ответы: {"id", "event": "qr_url" | "device_confirmation" | "email_confirmation" | "authenticated" | "timeout" | "error", ...}
+
+const sessions = new Map();
+
+function send(message) {
+    process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+function finish(id, message) {
+    const session = sessions.get(id);
+    sessions.delete(id);
+    if (session) session.removeAllListeners();
+    send({ id, ...message });
+}
+
+async function sendAuthenticated(id, session) {
+    try {
+        const cookies = await session.getWebCookies();
+        finish(id, {
+            event: 'authenticated',
+            account_name: session.accountName || null,
+            steam_id: session.steamID ? session.steamID.getSteamID64() : null,
+            refresh_token: session.refreshToken,
+            cookies,
+        });
+    } catch (ex) {
+        finish(id, { event: 'error', message: ex.message });
+    }
+}
+
+function watchSession(id, session) {
+    sessions.set(id, session);
+    session.on('authenticated', () => sendAuthenticated(id, session));
+    session.on('timeout', () => finish(id, { event: 'timeout' }));
+    session.on('error', (err) => finish(id, { event: 'error', message: err.message }));
+}
+
+async function startQr(id) {
+    const session = new LoginSession(EAuthTokenPlatformType.WebBrowser);
+    watchSession(id, session);
+    const startResult = await session.startWithQR();
+    send({ id, event: 'qr_url', url: startResult.qrChallengeUrl });
+}
+
+async function startLogin(id, request) {
+    const session = new LoginSession(EAuthTokenPlatformType.WebBrowser);
+    watchSession(id, session);
+    const startResult = await session.startWithCredentials({
+        accountName: request.account_name,
+        password: request.password,
+    });
+    if (!startResult.actionRequired) return;
+
+    const hasAction = (type) => startResult.validActions.some(action => action.type === type);
+    if (request.guard_code && hasAction(EAuthSessionGuardType.DeviceCode)) {
+        await session.submitSteamGuardCode(request.guard_code);
+    } else if (hasAction(EAuthSessionGuardType.DeviceConfirmation)) {
+        send({ id, event: 'device_confirmation' });
+    } else if (hasAction(EAuthSessionGuardType.EmailConfirmation)) {
+        send({ id, event: 'email_confirmation' });
+    } else {
+        throw new Error('Login action is required, but we don\'t know how to handle it');
+    }
+}
+
+async function startRefresh(id, request) {
+    const session = new LoginSession(EAuthTokenPlatformType.WebBrowser);
+    sessions.set(id, session);
+    session.refreshToken = request.refresh_token;
+    await sendAuthenticated(id, session);
+}
+
+function cancel(id) {
+    const session = sessions.get(id);
+    if (!session) return;
+    if (session.cancelLoginAttempt) session.cancelLoginAttempt();
+    finish(id, { event: 'error', message: 'Cancelled' });
+}
+
+const handlers = {
+    qr: startQr,
+    login: startLogin,
+    refresh: startRefresh,
+};
+
+readline.createInterface({ input: process.stdin }).on('line', (line) => {
+    let request;
+    try {
+        request = JSON.parse(line);
+    } catch (ex) {
+        send({ event: 'error', message: `Bad request: ${ex.message}` });
+        return;
+    }
+
+    if (request.type === 'cancel') return cancel(request.id);
+    const handler = handlers[request.type];
+    if (!handler) return send({ id: request.id, event: 'error', message: `Unknown request type: ${request.type}` });
+    handler(request.id, request).catch((ex) => finish(request.id, { event: 'error', message: ex.message }));
+}).on('close', () => process.exit(0));
+
+send({ event: 'ready' });
@@ -0,0 +1,149 @@
+import json
+import os
+import pathlib
+import subprocess
+import threading
+
+
+class SidecarRequest:
+    final_events = ('authenticated', 'timeout', 'error')
+
+    def __init__(self, request_id: int, request_type: str, on_event: callable = None):
+        self.request_id = request_id
+        self.request_type = request_type
+        self.on_event = on_event
+        self.result: dict | None = None
+        self.__done = threading.Event()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> id: {self.request_id}, type: {self.request_type}, result: {self.get_event()}'
+
+    def handle(self, message: dict):
+        if self.on_event: self.on_event(message)
+        if message.get('event') in self.final_events:
+            self.result = message
+            self.__done.set()
+
+    def wait(self, timeout: float = None) -> dict | None:
+        # Ждёт финальное событие без опроса процесса; None — таймаут
+        self.__done.wait(timeout)
+        return self.result
+
+    def is_done(self) -> bool:
+        return self.__done.is_set()
+
+    def get_event(self) -> str | None:
+        return self.result.get('event') if self.result else None
+
+
+class SessionSidecar:
+    def __init__(self, command: list[str] = None, start_timeout: float = 30):
+        # Один процесс Node.js на всё приложение: steam-session загружается один раз, запросы идут по JSON-строкам
+        script_path = pathlib.Path(os.path.abspath(__file__)).parent / 'session_sidecar.js'
+        self.command = command or ['node', str(script_path)]
+        self.start_timeout = start_timeout
+        self.__process: subprocess.Popen | None = None
+        self.__ready = threading.Event()
+        self.__requests: dict[int, SidecarRequest] = {}
+        self.__next_id = 0
+        self.__lock = threading.Lock()
+        self.__write_lock = threading.Lock()
+
+    def is_running(self) -> bool:
+        return self.__process is not None and self.__process.poll() is None
+
+    def start(self) -> bool:
+        with self.__lock:
+            if not self.is_running():
+                self.__ready.clear()
+                # У каждого процесса свой словарь запросов: при перезапуске старый поток чтения завершит только свои
+                self.__requests = {}
+                self.__process = subprocess.Popen(
+                    self.command,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    encoding='utf-8',
+                    bufsize=1,
+                    creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+                )
+                threading.Thread(target=self.__read_stdout, args=(self.__process, self.__requests), daemon=True).start()
+        return self.__ready.wait(self.start_timeout) and self.is_running()
+
+    def prewarm(self):
+        # Запуск в фоне, чтобы первый вход не ждал загрузку Node.js
+        def start():
+            try:
+                self.start()
+            except Exception as e:
+                print(f"Ошибка запуска session_sidecar: {e}")
+
+        threading.Thread(target=start, daemon=True).start()
+
+    def stop(self):
+        with self.__lock:
+            process, self.__process = self.__process, None
+        if not process: return
+        try:
+            process.stdin.close()
+            process.wait(timeout=5)
+        except Exception:
+            process.kill()
+
+    def request(self, request_type: str, on_event: callable = None, **params) -> SidecarRequest:
+        request = None
+        while not request:
+            if not self.start(): raise TimeoutError('session_sidecar не ответил при запуске')
+            with self.__lock:
+                # Процесс мог завершиться после start: тогда запускаем заново
+                if self.__process is None: continue
+                self.__next_id += 1
+                request = SidecarRequest(self.__next_id, request_type, on_event)
+                self.__requests[request.request_id] = request
+        self.__send({'id': request.request_id, 'type': request_type, **params})
+        return request
+
+    def cancel(self, request: SidecarRequest):
+        if request.is_done() or not self.is_running(): return
+        self.__send({'id': request.request_id, 'type': 'cancel'})
+
+    def __send(self, message: dict):
+        process = self.__process
+        if not process: raise BrokenPipeError('session_sidecar не запущен')
+        with self.__write_lock:
+            process.stdin.write(json.dumps(message) + '\n')
+            process.stdin.flush()
+
+    def __read_stdout(self, process: subprocess.Popen, requests: dict[int, SidecarRequest]):
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get('event') == 'ready':
+                self.__ready.set()
+                continue
+
+            with self.__lock:
+                request = requests.get(message.get('id'))
+                if request and message.get('event') in SidecarRequest.final_events:
+                    requests.pop(request.request_id, None)
+            if not request: continue
+            try:
+                request.handle(message)
+            except Exception as e:
+                print(f"Ошибка обработки события session_sidecar: {e}")
+
+        # Процесс завершился: ожидающие запросы получают ошибку, следующий request перезапустит процесс
+        with self.__lock:
+            pending = list(requests.values())
+            requests.clear()
+            if self.__process is process:
+                self.__process = None
+                self.__ready.set()
+        for request in pending:
+            request.handle({'id': request.request_id, 'event': 'error', 'message': 'session_sidecar stopped'})
+
+
+session_sidecar = SessionSidecar()
@@ -2,7 +2,7 @@ import flet as ft
 
 from app.callback import callback_manager, EventName
 from app.core import Account
-from app.package.steam_session import note_js_utility
+from app.package.steam_session import note_js_utility, steam_session_manager
 from app.ui.pages import page_manager, BasePage
 from app.ui.widgets import ThemeToggleButton, ColorMenuButton
 
@@ -24,6 +24,7 @@ class MainPageContent(ft.Row):
         self.expand = True
         self.spacing = 0
 
+        self._account: Account | None = None
         self._pages = self.get_pages_list()
         self.navigation_widget = ft.Column(expand=True, scroll=ft.ScrollMode.AUTO)
         self.navigation_widget.spacing = 0
@@ -73,6 +74,8 @@ class MainPageContent(ft.Row):
             self.page.open(ft.SnackBar(text_snack_bar))
 
     def on_callback_logout(self):
+        if self._account: self._account.stop_web_token_refresh()
+        self._account = None
         self.set_snack_bar("Logout success")
         set_page = next((page for page in self._pages if page.not_disabled or not page.disabled_is_logout), None)
         if set_page: self.set_page(set_page)
@@ -80,6 +83,9 @@ class MainPageContent(ft.Row):
         self.update()
 
     def on_callback_authenticated(self, account: Account):
+        # При переключении аккаунта фоновое обновление токена прошлого аккаунта останавливается
+        if self._account and self._account is not account: self._account.stop_web_token_refresh()
+        self._account = account
         self.set_snack_bar(f"Success auth {account.account_name}")
         set_page = next((page for page in self._pages if page.not_disabled or not page.disabled_is_login), None)
         if set_page: self.set_page(set_page)
@@ -147,5 +153,6 @@ class MainPage:
 
         if note_js_utility.start_install():
             self.page_content.set_snack_bar("NoteJS library success update or install")
+            steam_session_manager.prewarm()
         else:
             self.page_content.set_snack_bar("NoteJS library error update or install")
@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import re
 import time
@@ -7,7 +8,7 @@ import flet as ft
 from app.core import Account
 from app.database import config
 from app.logger import logger
-from app.package.data_collectors import SteamAPIUtility, InventoryManager, InventoryItemRgDescriptions, MarketListenItem, ItemOrdersHistogram
+from app.package.data_collectors import SteamAPIUtility, AsyncSteamAPIUtility, InventoryManager, InventoryItem, InventoryItemRgDescriptions, InventoryItemSelection, MarketListenItem, ItemOrdersHistogram, SellOrder, SellJobStats, SellJobEngine, inventory_snapshots, market_price_history
 from app.ui.pages import BasePage, Title
 from app.ui.widgets import AppIDSelector
 
@@ -113,6 +114,7 @@ class SellAllItemContent(ft.Container):
         self._histogram: ItemOrdersHistogram | None = None
         self._on_change_callback: callable = None
         self._parent_page: 'SellAllItemsDialog' = parent_page
+        self._sell_orders: dict[SellOrder, tuple['ItemRowContent', InventoryItem]] = {}
 
         self._price_sell_percent: float = 1.0
         self._is_minimum_auto_buy: bool = True
@@ -240,47 +242,51 @@ class SellAllItemContent(ft.Container):
 
         if self.page: self.update()
 
-    def start_sell(self, steam_api_utility: SteamAPIUtility):
-        if not steam_api_utility: return
+    def create_sell_orders(self, steam_id: str | int) -> list[SellOrder]:
         count_item_sell = self.get_count_sell()
-        if not count_item_sell: return
+        if not count_item_sell: return []
 
         price_sell = self.get_price_sell()
-        if not price_sell: return
+        if not price_sell: return []
         price_dont_sell = self._price_dont_sell
-        if price_sell <= price_dont_sell: return
+        if price_sell <= price_dont_sell: return []
 
         _price_get = self.get_price_get()
         price_get = int(float(_price_get if _price_get else 0) * 100)
-        if not price_get: return
+        if not price_get: return []
 
+        orders = []
         for item_content in self._items_content:
             item: InventoryItemRgDescriptions = item_content.item
             if not item.is_marketable(): continue
             if item.get_amount() <= 0: continue
 
             items_list = item.get_amount_items(count_item_sell)
-            selling_amount = items_list.get_amount()
-            count_item_sell -= selling_amount
+            count_item_sell -= items_list.get_amount()
 
             for select_item in items_list.items:
-                select_item_amount = select_item.amount
-                if select_item_amount <= 0: continue
-                status = steam_api_utility.sell_item(select_item, amount=select_item_amount, price=price_get)
-
+                if select_item.amount <= 0: continue
+                order = SellOrder.create(steam_id, select_item, amount=select_item.amount, price=price_get, name=item.name)
+                self._sell_orders[order] = (item_content, select_item)
+                orders.append(order)
                 logger.info(f"Sell initiated: name='{item.name}', "
-                            f"amount={select_item_amount}, "
+                            f"amount={select_item.amount}, "
                             f"price_sell={self._price_prefix}{price_sell}{self._price_suffix} | шт., "
                             f"net_price={self._price_prefix}{_price_get}{self._price_suffix} | шт., "
                             f"steam_price={price_get} | шт., "
                             f"assetid={select_item.assetid}")
-                # if not status or not status.get('success', False): select_item.amount = 0
-                logger.info(f"Sell finished: {status=}")
-
-                item.remove_item(select_item)
-                self.set_sell_amount(amount=self.get_count_sell() - select_item_amount)
-
-            item_content.update_widget()
+        return orders
+
+    def finish_sell_order(self, order: SellOrder) -> bool:
+        item_content, select_item = self._sell_orders.pop(order, (None, None))
+        if not item_content: return False
+        logger.info(f"Sell finished: {order}, result={order.result}")
+        # UNCERTAIN мог быть выставлен: убираем из инвентаря, чтобы не выставить повторно
+        if order.is_done() or order.is_uncertain():
+            item_content.item.remove_item(select_item)
+            self.set_sell_amount(amount=self.get_count_sell() - order.amount)
+        item_content.update_widget()
+        return True
 
     def __on_change_sell_price(self, *args):
         value = parce_value(self.price_sell_input.value)
@@ -591,9 +597,16 @@ class SellAllItemsDialog(ft.AlertDialog):
         self._button_start_sell.icon_color = ft.colors.GREEN
         self._button_start_sell.on_click = self._on_click_start_sell
 
+        self._button_resume_sell = create_button_widget()
+        self._button_resume_sell.text = 'Resume Unfinished'
+        self._button_resume_sell.visible = False
+        self._button_resume_sell.icon = ft.icons.RESTORE
+        self._button_resume_sell.icon_color = ft.colors.AMBER
+        self._button_resume_sell.on_click = self._on_click_resume_sell
+
         self.actions_alignment = ft.MainAxisAlignment.CENTER,
         self.actions = [
-            ft.Row(expand=True, controls=[self._button_start_sell])
+            ft.Row(expand=True, controls=[self._button_resume_sell, self._button_start_sell])
         ]
         # endregion
 
@@ -626,6 +639,11 @@ class SellAllItemsDialog(ft.AlertDialog):
 
         self.title_name_text.value = f'Sell {self._get_sum_amount()} Items'
 
+        # Заказы прошлых запусков продолжаются только по явному нажатию, после сверки с лотами на рынке
+        unfinished_count = len(SellJobEngine(steam_api_utility).get_unfinished_orders())
+        self._button_resume_sell.text = f'Resume {unfinished_count} Unfinished'
+        self._button_resume_sell.visible = bool(unfinished_count)
+
         if self.page: self.update()
 
     def _get_sum_amount(self):
@@ -636,15 +654,23 @@ class SellAllItemsDialog(ft.AlertDialog):
             self._button_start_sell.disabled = True
             if self._button_start_sell.page: self._button_start_sell.update()
 
+            item_controls: dict[tuple, list[SellAllItemContent]] = {}
             for item_control in self._items_column.controls:
                 item_control: SellAllItemContent
-                if not self.open: continue
-                item_amount = item_control.get_sum_amount()
-                if not item_amount: continue
-                appid = item_control.get_appid()
-                market_hash_name = item_control.get_market_hash_name()
-                histogram = self._steam_api_utility.fetch_market_itemordershistogram(appid=appid, market_hash_name=market_hash_name)
-                item_control.init_histogram(histogram)
+                if not item_control.get_sum_amount(): continue
+                key = (item_control.get_appid(), item_control.get_market_hash_name())
+                item_controls.setdefault(key, []).append(item_control)
+
+            def on_result(appid, market_hash_name, histogram):
+                if not self.open: return
+                for _item_control in item_controls.get((appid, market_hash_name), []):
+                    _item_control.init_histogram(histogram)
+
+            async def load_histograms():
+                async with AsyncSteamAPIUtility(self._steam_api_utility.account) as async_steam_api_utility:
+                    await async_steam_api_utility.fetch_market_itemordershistograms(list(item_controls), on_result=on_result)
+
+            if item_controls: asyncio.run(load_histograms())
         finally:
             self._button_start_sell.disabled = False
             if self._button_start_sell.page: self._button_start_sell.update()
@@ -657,9 +683,39 @@ class SellAllItemsDialog(ft.AlertDialog):
         if self.page: self.page.update()
 
         try:
+            engine = SellJobEngine(self._steam_api_utility)
+            steam_id = engine.get_steam_id()
+            orders = []
             for item_control in self._items_column.controls:
                 item_control: SellAllItemContent
-                item_control.start_sell(self._steam_api_utility)
+                orders += engine.enqueue(item_control.create_sell_orders(steam_id))
+
+            def on_progress(order: SellOrder, stats: SellJobStats):
+                for _item_control in self._items_column.controls:
+                    if _item_control.finish_sell_order(order): break
+                self.title_name_text.value = f'Sold {stats.done}/{stats.total}, failed {stats.failed}, uncertain {stats.uncertain} ({stats.get_throughput():.1f}/s)'
+                if self.title_name_text.page: self.title_name_text.update()
+
+            stats = engine.run(orders, on_progress=on_progress, should_stop=lambda: not self.open)
+            logger.info(f"Sell job finished: {stats}")
+        finally:
+            self.disabled = False
+            if self.page: self.page.update()
+
+    def _on_click_resume_sell(self, *args):
+        if self.disabled: return
+        self.disabled = True
+        if self.page: self.page.update()
+
+        try:
+            def on_progress(order: SellOrder, stats: SellJobStats):
+                logger.info(f"Sell finished: {order}, result={order.result}")
+                self.title_name_text.value = f'Resumed {stats.done}/{stats.total}, failed {stats.failed}, uncertain {stats.uncertain}'
+                if self.title_name_text.page: self.title_name_text.update()
+
+            stats = SellJobEngine(self._steam_api_utility).resume(on_progress=on_progress, should_stop=lambda: not self.open)
+            logger.info(f"Resumed sell job finished: {stats}")
+            self._button_resume_sell.visible = False
         finally:
             self.disabled = False
             if self.page: self.page.update()
@@ -955,34 +1011,41 @@ class SellItemDialog(ft.AlertDialog):
         _price_sell = f'{round(self._price_sell, 2):.2f}'
         _price_get = f'{round(self._price_get, 2):.2f}'
 
+        engine = SellJobEngine(self._steam_api_utility)
+        steam_id = engine.get_steam_id()
+        orders: dict[SellOrder, tuple[InventoryItemSelection, InventoryItem]] = {}
+        selections: list[tuple['ItemRowContent', InventoryItemSelection]] = []
         for item_content in self._items_content:
-            if not self.open: break
             if count_item_sell <= 0: break
             item: InventoryItemRgDescriptions = item_content.item
             if not item or not item.is_marketable(): continue
 
             items_list = item.get_amount_items(count_item_sell)
-            selling_amount = items_list.get_amount()
-            count_item_sell -= selling_amount
+            count_item_sell -= items_list.get_amount()
+            selections.append((item_content, items_list))
 
             for select_item in items_list.items:
                 if select_item.amount <= 0: continue
-                if not self.open:
-                    select_item.amount = 0
-                    continue
                 logger.info(f"Sell initiated: name='{item.name}', "
                             f"amount={select_item.amount}, "
                             f"price_sell={_price_prefix}{_price_sell}{_price_suffix}, "
                             f"net_price={_price_prefix}{_price_get}{_price_suffix}, "
                             f"steam_price={price_get} | шт., "
                             f"assetid={select_item.assetid}")
-                status = self._steam_api_utility.sell_item(select_item, amount=select_item.amount, price=price_get)
-                if not status or not status.get('success', False): select_item.amount = 0
-                logger.info(f"Sell finished: {status=}")
-                self._add_log(status)
-            succell_amount = items_list.get_amount()
-            count_item_sell += selling_amount - succell_amount
-            item.remove_items(items_list)
+                order = SellOrder.create(steam_id, select_item, amount=select_item.amount, price=price_get, name=item.name)
+                orders[order] = (items_list, select_item)
+
+        def on_progress(order: SellOrder, stats: SellJobStats):
+            items_list, select_item = orders[order]
+            if not order.is_done() and not order.is_uncertain(): items_list.set_item_amount(select_item, 0)
+            logger.info(f"Sell finished: {order}, result={order.result}")
+            self._add_log(f'{order.status.value}: {order.result}')
+
+        stats = engine.submit(list(orders), on_progress=on_progress, should_stop=lambda: not self.open)
+        self._add_log(f'Sold {stats.done}/{stats.total}, failed {stats.failed}, uncertain {stats.uncertain} ({stats.get_throughput():.1f}/s)')
+        count_item_sell = int(self._count_sell) - stats.done_amount
+        for item_content, items_list in selections:
+            item_content.item.remove_items(items_list)
             item_content.update_widget()
 
         self._set_sell_count(count=count_item_sell)
@@ -1604,40 +1667,59 @@ class InventoryPageContent(ft.Column):
             self._items_column.controls = []
             if self._items_column.page: self._items_column.update()
 
-            if not app_id: return
-            self.__last_inventory = self._steam_api_utility.get_inventory_items(appid=app_id)
+            if not app_id or not self._account: return
+            steam_id = self._account.steam_id
+            self.__last_inventory = None
+            app_inventory: dict[str, ItemRowContent] = {}
 
-            inventory = self.__last_inventory.inventory if self.__last_inventory else []
+            snapshot = inventory_snapshots.get_snapshot(steam_id=steam_id, appid=app_id)
+            if snapshot:
+                self.__last_inventory = snapshot.to_inventory()
+                self.__update_items_content(app_inventory, self.__last_inventory.inventory)
 
-            market_listing = self._steam_api_utility.get_market_listings(appid=app_id) if self.check_box_load_market.value else []
-            market_listing_kv = {str(item.asset_description.classid): item for item in market_listing}
+            if not inventory_snapshots.is_fresh(steam_id=steam_id, appid=app_id):
+                def on_page(inventory: InventoryManager, inventory_page: InventoryManager):
+                    self.__last_inventory = inventory
+                    self.__update_items_content(app_inventory, inventory_page.inventory)
 
-            self.botton_row.disabled = len(inventory) <= 0
-            if self.botton_row.page: self.botton_row.update()
+                inventory, diff = inventory_snapshots.refresh(self._steam_api_utility, steam_id=steam_id, appid=app_id, on_page=None if snapshot else on_page)
+                if snapshot and inventory and inventory.is_complete() and (diff is None or not diff.is_empty()):
+                    if diff: logger.info(f"Inventory {app_id} changed since last snapshot: {diff}")
+                    self.__last_inventory = inventory
+                    app_inventory = {}
+                    self.__update_items_content(app_inventory, inventory.inventory)
 
-            # app_inventory = self.__items_content.get(str(app_id), {})
-            app_inventory = {}
+            inventory = self.__last_inventory.inventory if self.__last_inventory else []
 
-            inventory_kv = {item.get_item_id(): item for item in inventory}
-            for item_id, item in inventory_kv.items():
-                if item_id in app_inventory:
-                    app_inventory[item_id].update_item_data(item)
-                else:
-                    item_content = ItemRowContent(item)
-                    item_content.sell_button.on_click = lambda e, _item_content=item_content: self._on_click_sell_item(item_content=_item_content)
-                    app_inventory[item_id] = item_content
+            self.botton_row.disabled = len(inventory) <= 0
+            if self.botton_row.page: self.botton_row.update()
 
-                market_listing_item = market_listing_kv.get(str(item.classid), None)
+            market_listing = market_price_history.fetch_market_listings(self._steam_api_utility, appid=app_id, max_age=datetime.timedelta(minutes=10)) if self.check_box_load_market.value else []
+            market_listing_kv = {str(item.asset_description.classid): item for item in market_listing}
+            for item_content in app_inventory.values():
+                market_listing_item = market_listing_kv.get(str(item_content.item.classid), None)
                 if market_listing_item:
-                    app_inventory[item_id].update_market_listen(market_listing_item)
+                    item_content.update_market_listen(market_listing_item)
 
-            # self.__items_content[str(app_id)] = app_inventory
-            self._items_column.controls = [item_content for item_content in app_inventory.values()]
             self.__sort_items()
             if self._items_column.page: self._items_column.update()
         finally:
             self.app_id_selector.update_button()
 
+    def __update_items_content(self, app_inventory: dict[str, 'ItemRowContent'], page_inventory: list[InventoryItemRgDescriptions]):
+        for item in page_inventory:
+            item_id = item.get_item_id()
+            if item_id in app_inventory:
+                app_inventory[item_id].update_widget()
+                continue
+            item_content = ItemRowContent(item)
+            item_content.sell_button.on_click = lambda e, _item_content=item_content: self._on_click_sell_item(item_content=_item_content)
+            app_inventory[item_id] = item_content
+
+        self._items_column.controls = [item_content for item_content in app_inventory.values()]
+        self.__sort_items()
+        if self._items_column.page: self._items_column.update()
+
     def _on_click_sort(self, e: ft.ControlEvent):
         button: ft.FilledTonalButton = e.control
         if not button: return
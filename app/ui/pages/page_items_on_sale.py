@@ -1,5 +1,4 @@
 import threading
-import time
 
 import flet as ft
 
@@ -14,6 +13,10 @@ from app.package.data_collectors import (
     MarketListingsItem,
     MarketMyHistoryManager,
     MarketMyHistoryParcedEvent,
+    ListingCancelEngine,
+    ListingCancelReport,
+    MyListingsCache,
+    market_history_archive,
     load_steam_mini_profile_info
 )
 from app.ui.pages import BasePage, Title
@@ -332,6 +335,10 @@ class ItemRowContent(ft.Container):
 
 
 class ItemsOnSalePageContent(ft.Column):
+    # Сколько событий истории загружается из Steam по клику синхронно и сколько догружается за одну порцию backfill
+    history_sync_max_events = 1000
+    history_backfill_chunk = 1000
+
     def __init__(self):
         # region ft.Column params
         super().__init__()
@@ -342,6 +349,7 @@ class ItemsOnSalePageContent(ft.Column):
         # region Class params
         self._account: Account | None = None
         self._steam_api_utility = SteamAPIUtility(self._account)
+        self._my_listings = MyListingsCache(self._steam_api_utility)
         self._is_init = False
         self._is_work = False
         self._on_update_is_work = False
@@ -461,7 +469,8 @@ class ItemsOnSalePageContent(ft.Column):
             self._update_button.disabled = True
             if self._update_button.page: self._update_button.update()
 
-            market_my_listings = self._steam_api_utility.fetch_my_listings()
+            market_my_listings = self._my_listings.get_listings()
+            if not market_my_listings: return
             self._items_column.controls = [ItemRowContent(item) for item in market_my_listings.listings]
             for item_content in self._items_column.controls:
                 item_content: ItemRowContent
@@ -491,7 +500,9 @@ class ItemsOnSalePageContent(ft.Column):
             logger.info(f'Start cansel Sell: {item_content.item_class.name} {item_content.amount_class.get_total()} {item_content.price_class.get_total()}')
             status = self._steam_api_utility.remove_my_listing(item_content.item)
             logger.info(f'Finish cansel Sell: {item_content.item_class.name} {status=}')
-            if status: return
+            if status:
+                self._my_listings.remove([item_content.item])
+                return
 
         item_content.cansel_button.disabled = False
         item_content.cansel_button.icon_color = ft.colors.GREEN
@@ -500,11 +511,35 @@ class ItemsOnSalePageContent(ft.Column):
     def _on_click_start_cansel_all_button(self, *args):
         self._bottom_button_disable(is_disabled=True)
 
+        items_content: dict[MarketListingsListing, ItemRowContent] = {}
         for item_content in self._items_column.controls:
             item_content: ItemRowContent
-            if not self._is_work: continue
-            self._on_click_start_cansel_button(item_content=item_content)
-            time.sleep(0.3)
+            if item_content.already_cansel: continue
+            item_content.already_cansel = True
+            item_content.cansel_button.disabled = True
+            item_content.cansel_button.icon_color = ft.colors.RED
+            items_content[item_content.item] = item_content
+        if self._items_column.page: self._items_column.update()
+
+        def on_progress(listing: MarketListingsListing, is_cancelled: bool, report: ListingCancelReport):
+            item_content = items_content[listing]
+            logger.info(f'Finish cansel Sell: {item_content.item_class.name} {is_cancelled=}')
+            self._start_cansel_all_button.text = f'Cansel All {report.get_finished()}/{report.total}'
+            if self._start_cansel_all_button.page: self._start_cansel_all_button.update()
+
+        engine = ListingCancelEngine(self._steam_api_utility)
+        report = engine.run(list(items_content), on_progress=on_progress, should_stop=lambda: not self._is_work)
+        logger.info(f'Cansel all finished: {report}')
+        self._my_listings.remove(report.cancelled)
+
+        for listing in report.failed + report.skipped:
+            item_content = items_content[listing]
+            item_content.already_cansel = False
+            item_content.cansel_button.disabled = False
+            item_content.cansel_button.icon_color = ft.colors.GREEN
+        self._start_cansel_all_button.text = 'Cansel All'
+        if self._items_column.page: self._items_column.update()
+        self._bottom_button_disable(is_disabled=not (report.failed or report.skipped))
 
         if not self._is_work:
             self._on_update_is_work = True
@@ -513,16 +548,30 @@ class ItemsOnSalePageContent(ft.Column):
         print(f"_on_click_start_load_price_button: {args}")
 
     def _on_click_start_show_history(self, *args):
-        history = self._steam_api_utility.fetch_market_myhistory()
-        if not history or not history.success: return
+        # Из Steam догружаются только новые события, сама история читается из локального архива
+        if not self._account: return
+        steam_id = self._account.steam_id
+        market_history_archive.sync(self._steam_api_utility, max_events=self.history_sync_max_events)
+        history = market_history_archive.get_history(steam_id, limit=500)
+        if not history.parced_events: return
 
         dialog = HistoryItemsDialog()
         dialog.init(history)
         if self.page: self.page.open(dialog)
 
+        # Старые события догружаются порциями, пока открыт диалог. Курсор хранится в базе, следующее открытие продолжит с него
+        start = market_history_archive.get_backfill_start(steam_id)
+        while dialog.open and start is not None:
+            market_history_archive.backfill(self._steam_api_utility, max_events=self.history_backfill_chunk)
+            next_start = market_history_archive.get_backfill_start(steam_id)
+            if next_start == start: break
+            start = next_start
+        logger.info(f'Market history archived: {market_history_archive.get_count(steam_id)}, backfill start: {start}')
+
     def on_update_account(self, account: Account = None):
         self._account = account
         self._steam_api_utility.account = account
+        self._my_listings.clear()
 
         self._items_column.controls = []
         if self._items_column.page: self._items_column.update()
@@ -1,7 +1,7 @@
 import flet as ft
 
 from app.core import Account
-from app.package.data_collectors import SteamAPIUtility, MarketListenItem
+from app.package.data_collectors import SteamAPIUtility, MarketListenItem, market_price_history
 from app.ui.pages import BasePage, Title
 from app.ui.widgets import AppIDSelector
 
@@ -251,12 +251,19 @@ class MarketPageContent(ft.Column):
             if self._items_column.page: self._items_column.update()
 
             if not app_id: return
-            market_items: list[MarketListenItem] = self._steam_api_utility.get_market_listings(appid=app_id)
-            real_market_items = [item for item in market_items if not item.is_empty() and not item.is_bug_item() and item.is_for_current_game(app_id)]
+            self.__items_content = []
+
+            def on_page(market_items: list[MarketListenItem]):
+                real_market_items = [item for item in market_items if not item.is_empty() and not item.is_bug_item() and item.is_for_current_game(app_id)]
+                self.__items_content.extend(ItemRowContent(item) for item in real_market_items)
+                self.__sort_items()
+                if self._items_column.page: self._items_column.update()
 
-            self.__items_content = [ItemRowContent(item) for item in real_market_items]
+            market_items: list[MarketListenItem] = market_price_history.fetch_market_listings(self._steam_api_utility, appid=app_id, on_page=on_page)
+            real_market_items = [item for item in market_items if not item.is_empty() and not item.is_bug_item() and item.is_for_current_game(app_id)]
+            items_content = {id(item_content.item): item_content for item_content in self.__items_content}
+            self.__items_content = [items_content[id(item)] for item in real_market_items]
 
-            self._items_column.controls = self.__items_content
             self.__sort_items()
             if self._items_column.page: self._items_column.update()
         finally:
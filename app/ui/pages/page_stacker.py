@@ -1,12 +1,11 @@
 import datetime
 import threading
-import time
 
 import flet as ft
 
 from app.core import Account
 from app.logger import logger
-from app.package.data_collectors import SteamAPIUtility, InventoryManager, InventoryItemRgDescriptions
+from app.package.data_collectors import SteamAPIUtility, InventoryManager, InventoryItemRgDescriptions, StackMove, StackReport, StackEngine, inventory_snapshots
 from app.ui.pages import BasePage, Title
 from app.ui.widgets import AppIDSelector
 
@@ -127,6 +126,7 @@ class StackerPageContent(ft.Column):
         self.__last_inventory: InventoryManager | None = None
         self.__last_update_inventory = datetime.datetime.now()
         self._steam_api_utility = SteamAPIUtility(self._account)
+        self._stack_engine = StackEngine(self._steam_api_utility)
         self._lock_stack = threading.Lock()
         self._is_work = False
         self._on_update_is_work = False
@@ -212,7 +212,7 @@ class StackerPageContent(ft.Column):
             progress_column,
         ]
 
-        self._is_update_after_stack = ft.Checkbox(label='Update after Stack', value=True, splash_radius=0)
+        self._is_update_after_stack = ft.Checkbox(label='Update after Stack', value=False, splash_radius=0)
 
         self._start_stacking_all_button = ft.FilledTonalButton()
         self._start_stacking_all_button.text = 'Stack All'
@@ -260,73 +260,88 @@ class StackerPageContent(ft.Column):
             self._items_column.controls = []
             if self._items_column.page: self._items_column.update()
 
-            if not app_id: return
-            self.__last_inventory = self._steam_api_utility.get_inventory_items(appid=app_id)
-            inventory = self.__last_inventory.inventory if self.__last_inventory else []
+            if not app_id or not self._account: return
+            steam_id = self._account.steam_id
+            snapshot = inventory_snapshots.get_snapshot(steam_id=steam_id, appid=app_id)
+            if snapshot:
+                self.__show_inventory(snapshot.to_inventory())
+            if inventory_snapshots.is_fresh(steam_id=steam_id, appid=app_id): return
+
+            inventory, diff = inventory_snapshots.refresh(self._steam_api_utility, steam_id=steam_id, appid=app_id)
+            if not snapshot:
+                self.__show_inventory(inventory)
+            elif inventory and inventory.is_complete() and (diff is None or not diff.is_empty()):
+                if diff: logger.info(f"Inventory {app_id} changed since last snapshot: {diff}")
+                self.__show_inventory(inventory)
+        finally:
+            self._app_id_selector.update_button()
 
-            is_stackable = any(item.get_items_amount() > 1 for item in inventory)
-            self._botton_row.disabled = not is_stackable
-            self._start_stacking_all_button.text = f'Stack {sum(item.get_items_amount() - 1 for item in inventory)} items'
-            self._start_stacking_all_button.icon_color = ft.colors.GREEN if is_stackable else ft.colors.RED
-            if self._botton_row.page: self._botton_row.update()
+    def __show_inventory(self, inventory_manager: InventoryManager | None):
+        self.__last_inventory = inventory_manager
+        inventory = self.__last_inventory.inventory if self.__last_inventory else []
 
-            self._items_column.controls = [ItemRowContent(item) for item in inventory]
-            for item_content in self._items_column.controls:
-                item_content: ItemRowContent
-                item_content.stack_button.on_click = lambda e, _item_content=item_content: self._on_click_start_stacking_item(item_content=_item_content)
+        is_stackable = any(item.get_items_amount() > 1 for item in inventory)
+        self._botton_row.disabled = not is_stackable
+        self._start_stacking_all_button.text = f'Stack {sum(item.get_items_amount() - 1 for item in inventory)} items'
+        self._start_stacking_all_button.icon_color = ft.colors.GREEN if is_stackable else ft.colors.RED
+        if self._botton_row.page: self._botton_row.update()
 
-            self._items_column.controls.sort(key=lambda x: x.get_sort_value())
-            if self._items_column.page: self._items_column.update()
-        finally:
-            self._app_id_selector.update_button()
+        self._items_column.controls = [ItemRowContent(item) for item in inventory]
+        for item_content in self._items_column.controls:
+            item_content: ItemRowContent
+            item_content.stack_button.on_click = lambda e, _item_content=item_content: self._on_click_start_stacking_item(item_content=_item_content)
 
-    def _stack_item(self, item_content: ItemRowContent, start_index: int, total_count: int):
-        item_content.stack_button.disabled = True
-        item_content.stack_button.icon_color = ft.colors.RED
-        if item_content.stack_button.page: item_content.stack_button.update()
+        self._items_column.controls.sort(key=lambda x: x.get_sort_value())
+        if self._items_column.page: self._items_column.update()
 
-        total_item_count = item_content.get_count_items()
-        time_wait = 0.05
+    def _stack_items(self, items_content: list[ItemRowContent]):
+        items_content = [item_content for item_content in items_content if not item_content.already_stacked and item_content.is_stackable()]
+        for item_content in items_content:
+            item_content.already_stacked = True
+            item_content.stack_button.disabled = True
+            item_content.stack_button.icon_color = ft.colors.RED
+            if item_content.stack_button.page: item_content.stack_button.update()
+
+        plans = self._stack_engine.create_plans([item_content.item for item_content in items_content])
+        if not plans: return None
+
+        moves_count = {id(plan.description): len(plan.moves) for plan in plans}
+        moves_finished = {}
+        time_wait = self._steam_api_utility.transport.get_bucket('inventory_service').get_interval()
+
+        def on_progress(move: StackMove, report: StackReport):
+            # Прогресс считается по полученным ответам Steam
+            key = id(move.description)
+            moves_finished[key] = moves_finished.get(key, 0) + 1
+            self._now_item_image.src = move.description.get_icon_url(width=29, height=29)
+            self._now_item_text.value = move.description.name
+            self._now_item_text.color = move.description.get_color()
+            self._now_item_progress.value = moves_finished[key] / moves_count[key]
+            self._total_progress.value = report.get_finished() / report.total
+            time_left = report.get_time_left()
+            self._time_left_text.value = f"~{time_left:.1f} sec." if time_left is not None else ''
+            if self._stacking_progress_row.page: self._stacking_progress_row.update()
+            if not move.is_done(): logger.warning(f"Stack failed '{move.description.name}': {move}")
 
         with self._lock_stack:
+            total_moves = sum(moves_count.values())
             self._stacking_progress_row.visible = True
-            self._now_item_image.src = item_content.item.get_icon_url(width=29, height=29)
-            self._now_item_text.value = item_content.item.name
-            self._now_item_text.color = item_content.item.get_color()
-            self._total_progress.value = start_index / total_count
+            self._now_item_image.src = plans[0].description.get_icon_url(width=29, height=29)
+            self._now_item_text.value = plans[0].description.name
+            self._now_item_text.color = plans[0].description.get_color()
             self._now_item_progress.value = 0
-            self._time_left_text.value = f"~{(total_count - start_index) * time_wait} sec."
+            self._total_progress.value = 0
+            self._time_left_text.value = f"~{total_moves * time_wait:.1f} sec."
             if self._stacking_progress_row.page: self._stacking_progress_row.update()
-            if item_content.already_stacked: return
-            item_content.already_stacked = True
-            if total_item_count <= 1: return
-
-            logger.info(f"Start Stacking '{item_content.item.name}' {total_item_count} items")
-
-            item_get_stack = item_content.item.items[0] if len(item_content.item.items) > 0 else None
-            if not item_get_stack: return
-            for num, item in enumerate(item_content.item.items, start=1):
-                if not self._is_work:
-                    logger.info(f"Stop Stacking (User close page) '{item_content.item.name}'")
-                    return
-                now_index = start_index + num
-                self._now_item_progress.value = num / total_item_count
-                self._total_progress.value = now_index / total_count
-                time_left = (total_count - now_index) * time_wait
-                self._time_left_text.value = f"~{time_left:.1f} sec."
-                if self._stacking_progress_row.page: self._stacking_progress_row.update()
-                if item_get_stack.assetid == item.assetid: continue
-
-                threading.Thread(
-                    target=self._steam_api_utility.combine_itemstacks,
-                    kwargs={'fromitem': item, 'destitem': item_get_stack},
-                    daemon=True
-                ).start()
-
-                time.sleep(time_wait)
-            logger.info(f"Finish Stacking '{item_content.item.name}'")
+
+            logger.info(f"Start Stacking {len(plans)} items, {total_moves} moves")
+            report = self._stack_engine.run(plans, on_progress=on_progress, should_stop=lambda: not self._is_work)
+            if report.skipped: logger.info(f"Stop Stacking (User close page), skipped {len(report.skipped)} moves")
+            logger.info(f"Finish Stacking: {report}")
+            return report
 
     def _on_click_start_stacking_all(self, e):
+        report = None
         try:
             self._botton_row.disabled = True
             self._start_stacking_all_button.icon_color = ft.colors.RED
@@ -335,57 +350,35 @@ class StackerPageContent(ft.Column):
             logger.info("Start Stacking All Items")
 
             items_content: list[ItemRowContent | ft.Control] = self._items_column.controls.copy()
-
-            for item_content in items_content:
-                item_content.stack_button.disabled = True
-                item_content.stack_button.icon_color = ft.colors.RED
-                if item_content.stack_button.page: item_content.stack_button.update()
-
-            start_index = 0
-            total_item_count = sum(ic.get_count_items() for ic in items_content if not ic.already_stacked)
-            for item_content in items_content:
-                if not self._is_work:
-                    logger.info("Stop Stacking All Items (User close page)")
-                    break
-                if item_content.already_stacked: continue
-                self._stack_item(item_content, start_index, total_item_count)
-                item_count_items = item_content.get_count_items()
-                start_index += item_count_items
+            report = self._stack_items(items_content)
         finally:
             logger.info("Finish Stacking All Items")
-            if self._is_update_after_stack.value:
-                self._stacking_progress_row.visible = True
-                self._now_item_image.src = ' '
-                self._now_item_text.value = 'Update after Stack'
-                self._now_item_text.color = ft.colors.BLUE
-                self._total_progress.value = None
-                self._now_item_progress.value = None
-                self._time_left_text.value = f"~5 sec."
-                if self._stacking_progress_row.page: self._stacking_progress_row.update()
-                time_sleep = 0.1
-                count_update = int(5 / time_sleep)
-                for i in range(count_update):
-                    time_left = (count_update - i) * time_sleep
-                    self._time_left_text.value = f"~{time_left:.1f} sec."
-                    if self._stacking_progress_row.page: self._stacking_progress_row.update()
-                    time.sleep(time_sleep)
-
             self._stacking_progress_row.visible = False
             if self._stacking_progress_row.page: self._stacking_progress_row.update()
-
-        if self._is_update_after_stack.value:
-            logger.info("Update after Stack")
-            self._on_select_app_id(self._app_id_selector.get_config_value())
+        self._update_after_stack(report)
 
     def _on_click_start_stacking_item(self, item_content: ItemRowContent):
         if not item_content or not item_content.is_stackable(): return
+        report = None
         try:
-            start_index = 0
-            total_item_count = item_content.get_count_items()
-            self._stack_item(item_content, start_index, total_item_count)
+            report = self._stack_items([item_content])
         finally:
             self._stacking_progress_row.visible = False
             if self._stacking_progress_row.page: self._stacking_progress_row.update()
+        self._update_after_stack(report)
+
+    def _update_after_stack(self, report: StackReport | None):
+        # Подтверждённые переносы уже применены к инвентарю в памяти, загрузка нужна только при неизвестном исходе запросов
+        if not report or not self._account: return
+        app_id = self._app_id_selector.get_config_value()
+        if self._is_update_after_stack.value or report.is_uncertain():
+            logger.info(f"Update after Stack (uncertain: {len(report.get_uncertain())})")
+            inventory_snapshots.invalidate(steam_id=self._account.steam_id, appid=app_id)
+            self._on_select_app_id(app_id)
+            return
+        if not report.done: return
+        inventory_snapshots.update(steam_id=self._account.steam_id, appid=app_id, inventory=self.__last_inventory)
+        self.__show_inventory(self.__last_inventory)
 
     def on_update_account(self, account: Account = None):
         self._account = account
@@ -4,7 +4,8 @@ import flet as ft
 
 from app.core import Account
 from app.package.data_collectors import get_steam_profile_info, get_steam_id_from_url
-from app.package.data_collectors.steam_api_utility import SteamAPIUtility, InventoryItemRgDescriptions, InventoryManager
+from app.package.data_collectors.inventory_snapshot import inventory_snapshots
+from app.package.data_collectors.steam_api_utility import SteamAPIUtility, InventoryItemRgDescriptions, InventoryItemSelection, InventoryManager
 from app.ui.pages import BasePage, Title
 from app.ui.widgets import AppIDSelector
 
@@ -506,6 +507,17 @@ class UserInventoryContent(ft.Column):
         self.items_column.controls.sort(key=lambda x: (x.item.get_amount()), reverse=True)
         if self.items_column.page: self.items_column.update()
 
+    def append_items(self, items: list[InventoryItemRgDescriptions]):
+        items_content: dict[str, ItemRowContent] = {x.item.get_item_id(): x for x in self.items_column.controls}
+        for item in items:
+            item_content = items_content.get(item.get_item_id(), None)
+            if item_content:
+                item_content.count_item_input.suffix_text = f"|{item_content.item.get_amount()}"
+                continue
+            self.items_column.controls.append(ItemRowContent(item).set_callback_select_item(self.on_callback_select_item))
+        self.items_column.controls.sort(key=lambda x: (x.item.get_amount()), reverse=True)
+        if self.page: self.update()
+
     def __appid_input_on_app_id_select(self, app_id=None):
         if not app_id: return
         try:
@@ -514,15 +526,31 @@ class UserInventoryContent(ft.Column):
             if not self.account or not self.account.is_alive_session(): return
             appid_input = str(app_id).strip()
 
-            if appid_input not in self.items:
-                class_steam_api = SteamAPIUtility(account=self.account)
-                items = class_steam_api.get_inventory_items(steam_id=self.user_steam_id, appid=appid_input)
-                if items and items.success:
-                    self.items[appid_input] = items
-            else:
+            if appid_input in self.items:
                 items = self.items[appid_input]
+                self.user_count_item.value = f'Count Items: {items.get_amount_items()}'
+                self.set_items(items.get_tradable_inventory())
+                return
+
+            self.set_items([])
+            steam_id = self.user_steam_id or self.account.steam_id
+            snapshot = inventory_snapshots.get_snapshot(steam_id=steam_id, appid=appid_input)
+            if snapshot:
+                items = snapshot.to_inventory()
+                self.items[appid_input] = items
+                self.user_count_item.value = f'Count Items: {items.get_amount_items()}'
+                self.set_items(items.get_tradable_inventory())
+            if inventory_snapshots.is_fresh(steam_id=steam_id, appid=appid_input): return
 
-            if items and items.success:
+            def on_page(inventory: InventoryManager, inventory_page: InventoryManager):
+                self.items[appid_input] = inventory
+                self.user_count_item.value = f'Count Items: {inventory.get_amount_items()}'
+                self.append_items(inventory_page.get_tradable_inventory())
+
+            class_steam_api = SteamAPIUtility(account=self.account)
+            items, diff = inventory_snapshots.refresh(class_steam_api, steam_id=steam_id, appid=appid_input, on_page=None if snapshot else on_page)
+            if snapshot and items and items.is_complete() and (diff is None or not diff.is_empty()):
+                self.items[appid_input] = items
                 self.user_count_item.value = f'Count Items: {items.get_amount_items()}'
                 self.set_items(items.get_tradable_inventory())
         finally:
@@ -586,7 +614,7 @@ class UserInventoryContent(ft.Column):
             if count_per_item > 0:
                 custom_count = min(custom_count, count_per_item)
 
-            select_items: InventoryItemRgDescriptions = item.item.get_amount_items(custom_count)
+            select_items: InventoryItemSelection = item.item.get_amount_items(custom_count)
             item.item.remove_items(select_items)
             item.count_item_input.suffix_text = f"|{item.item.get_amount()}"
 
@@ -610,7 +638,7 @@ class UserInventoryContent(ft.Column):
             if not item.is_can_trade_item(): continue
             if not item.item.tradable: continue
 
-            select_items: InventoryItemRgDescriptions = item.item.get_amount_items(item.item.get_amount())
+            select_items: InventoryItemSelection = item.item.get_amount_items(item.item.get_amount())
             item.item.remove_items(select_items)
             item.count_item_input.suffix_text = f"|{item.item.get_amount()}"
 
@@ -831,8 +859,19 @@ class TradePageContent(ft.Column):
 
         print(f'{status_create_trade=}')
         if status_create_trade:
+            self.__invalidate_trade_inventories(trade_items)
             self.trade_items_row.clear_items()
 
+    def __invalidate_trade_inventories(self, trade_items: dict):
+        # Предметы из отправленного обмена удерживаются Steam: инвентари обеих сторон перечитываются при следующем открытии
+        for side, inventory_row in (('me', self.user_inventory_row), ('them', self.partner_inventory_row)):
+            steam_id = inventory_row.user_steam_id
+            if not steam_id: continue
+            keys = {(str(asset['appid']), str(asset['contextid'])) for asset in trade_items[side]['assets']}
+            for appid, contextid in keys:
+                inventory_snapshots.invalidate(steam_id=steam_id, appid=appid, context_id=contextid)
+                inventory_row.items.pop(appid, None)
+
     def on_callback_select_item(self, steam_id: str | int, item: InventoryItemRgDescriptions):
         self.trade_items_row.add_item(steam_id, item)
 
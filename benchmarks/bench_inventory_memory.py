@@ -0,0 +1,51 @@
+"""
+Замер памяти, которую удерживает разобранный InventoryManager на синтетическом инвентаре.
+
+Входной JSON удаляется после разбора, поэтому в результат попадает только то, что держит сама модель.
+В том же запуске измеряется модель-ориентир, которая хранит словари ответа как есть: если InventoryManager
+снова начнёт удерживать входные словари, его цифра приблизится к ориентиру.
+Запуск: python -m benchmarks.bench_inventory_memory
+"""
+import gc
+import tracemalloc
+
+from app.package.data_collectors import InventoryManager
+from benchmarks.synthetic import make_inventory_json
+
+
+class DictRetainingInventory:
+    """Модель-ориентир: описания и ассеты хранятся исходными словарями, сгруппированными по (classid, instanceid)."""
+
+    def __init__(self, inventory_json: dict):
+        self.descriptions = {(desc['classid'], desc['instanceid']): desc for desc in inventory_json.get('descriptions', [])}
+        self.assets: dict[tuple[str, str], list[dict]] = {}
+        for asset in inventory_json.get('assets', []):
+            self.assets.setdefault((asset['classid'], asset['instanceid']), []).append(asset)
+
+    def get_amount_items(self, only_tradable: bool = False) -> int:
+        return sum(int(asset.get('amount', 0)) for assets in self.assets.values() for asset in assets)
+
+
+def bench_inventory_memory(model=InventoryManager, assets_count: int = 50_000, descriptions_count: int = 2_000) -> tuple[int, int]:
+    gc.collect()
+    tracemalloc.start()
+    inventory_json = make_inventory_json(assets_count=assets_count, descriptions_count=descriptions_count)
+    json_size, _ = tracemalloc.get_traced_memory()
+
+    inventory = model(inventory_json)
+    del inventory_json
+    gc.collect()
+    retained_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert inventory.get_amount_items(only_tradable=False) > 0
+    return json_size, retained_size
+
+
+if __name__ == '__main__':
+    for assets, descriptions in [(50_000, 2_000), (50_000, 20_000)]:
+        json_size, retained_size = bench_inventory_memory(assets_count=assets, descriptions_count=descriptions)
+        _, baseline_size = bench_inventory_memory(model=DictRetainingInventory, assets_count=assets, descriptions_count=descriptions)
+        print(f"inventory memory: assets={assets}, descriptions={descriptions}: "
+              f"json={json_size / 2 ** 20:.1f} MiB, retained after parse={retained_size / 2 ** 20:.1f} MiB, "
+              f"dict-retaining baseline={baseline_size / 2 ** 20:.1f} MiB ({retained_size / baseline_size:.0%} of baseline)")
@@ -0,0 +1,35 @@
+"""
+Замер скорости InventoryManager.parse_inventory на синтетическом инвентаре.
+
+Запуск: python -m benchmarks.bench_inventory_parse
+"""
+import time
+
+from app.package.data_collectors import InventoryManager
+from benchmarks.synthetic import make_inventory_json
+
+
+def bench_parse_inventory(assets_count: int = 50_000, descriptions_count: int = 2_000, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        inventory_json = make_inventory_json(assets_count=assets_count, descriptions_count=descriptions_count)
+        start = time.perf_counter()
+        inventory = InventoryManager(inventory_json)
+        best = min(best, time.perf_counter() - start)
+        assert sum(item.get_items_amount() for item in inventory.inventory) == assets_count
+    return best
+
+
+def bench_load_items(assets_count: int = 50_000, descriptions_count: int = 2_000) -> float:
+    # InventoryItem создаются при первом обращении к items: замер отложенной части разбора
+    inventory = InventoryManager(make_inventory_json(assets_count=assets_count, descriptions_count=descriptions_count))
+    start = time.perf_counter()
+    assert sum(len(item.items) for item in inventory.inventory) == assets_count
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    for assets, descriptions in [(10_000, 500), (50_000, 2_000), (50_000, 20_000)]:
+        elapsed = bench_parse_inventory(assets_count=assets, descriptions_count=descriptions)
+        print(f"parse_inventory: assets={assets}, descriptions={descriptions}: {elapsed * 1000:.1f} ms")
+        print(f"first items access: assets={assets}, descriptions={descriptions}: {bench_load_items(assets, descriptions) * 1000:.1f} ms")
@@ -0,0 +1,94 @@
+"""
+Сравнение полного скачивания страницы /market/listings/ с потоковым чтением до item_nameid.
+
+Страницы отдаёт локальный HTTP-сервер с ограничением скорости, чтобы задержка зависела от объёма.
+По умолчанию используются синтетические страницы, записанные страницы можно передать каталогом:
+python -m benchmarks.bench_item_nameid_stream [каталог с *.html]
+"""
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+from app.package.data_collectors import SteamAPIUtility
+from benchmarks.synthetic import make_listing_page_html
+
+
+def serve_pages(pages: dict[str, bytes], bytes_per_second: int) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            page = pages[self.path.lstrip('/')]
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(page)))
+            self.end_headers()
+            chunk_size = 16384
+            try:
+                for start in range(0, len(page), chunk_size):
+                    self.wfile.write(page[start:start + chunk_size])
+                    time.sleep(chunk_size / bytes_per_second)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def read_full(session: requests.Session, url: str) -> tuple[int | None, int]:
+    response = session.get(url)
+    return SteamAPIUtility.parse_item_nameid(response.text), len(response.content)
+
+
+def read_stream(session: requests.Session, url: str) -> tuple[int | None, int]:
+    read_bytes = 0
+
+    def iter_chunks(response: requests.Response):
+        nonlocal read_bytes
+        for chunk in response.iter_content(chunk_size=16384):
+            read_bytes += len(chunk)
+            yield chunk
+
+    response = session.get(url, stream=True)
+    try:
+        return SteamAPIUtility.parse_item_nameid_stream(iter_chunks(response)), read_bytes
+    finally:
+        response.close()
+
+
+def bench_item_nameid_stream(pages: dict[str, bytes], bytes_per_second: int = 4 * 2 ** 20, repeat: int = 3) -> dict[str, tuple[float, int]]:
+    server = serve_pages(pages, bytes_per_second)
+    results = {}
+    try:
+        for name, reader in [('full', read_full), ('stream', read_stream)]:
+            session = requests.Session()
+            best, total_bytes = float('inf'), 0
+            for _ in range(repeat):
+                start, total_bytes = time.perf_counter(), 0
+                for page_name in pages:
+                    item_nameid, read_bytes = reader(session, f'http://127.0.0.1:{server.server_port}/{page_name}')
+                    assert item_nameid, page_name
+                    total_bytes += read_bytes
+                best = min(best, time.perf_counter() - start)
+            results[name] = best, total_bytes
+    finally:
+        server.shutdown()
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        pages = {path.name: path.read_bytes() for path in Path(sys.argv[1]).glob('*.html')}
+    else:
+        pages = {f'page_{num}.html': make_listing_page_html(item_nameid=1000 + num) for num in range(10)}
+    results = bench_item_nameid_stream(pages)
+    for name, (elapsed, total_bytes) in results.items():
+        print(f"item_nameid {name}: pages={len(pages)}, read={total_bytes / 2 ** 10:.0f} KiB, {elapsed * 1000:.0f} ms")
@@ -0,0 +1,37 @@
+"""
+Замер разбора и слияния страниц истории рынка MarketMyHistoryManager на синтетической истории.
+
+Для сравнения "до/после" скрипт запускается на нужной ревизии: python -m benchmarks.bench_market_history
+"""
+import time
+
+from app.package.data_collectors import MarketMyHistoryManager
+from benchmarks.synthetic import make_market_history_pages
+
+
+def bench_market_history(events_count: int = 50_000, page_size: int = 500, repeat: int = 3) -> tuple[float, float]:
+    pages_json = make_market_history_pages(events_count=events_count, page_size=page_size)
+    best_parse, best_merge = float('inf'), float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = [MarketMyHistoryManager(page_json) for page_json in pages_json]
+        parsed = time.perf_counter()
+        history = pages[0]
+        if hasattr(history, 'add_next_pages'):
+            history.add_next_pages(pages[1:])
+        else:
+            # Ревизии до add_next_pages сливали страницы по одной
+            for page in pages[1:]:
+                history.add_next_page(page)
+        merged = time.perf_counter()
+        best_parse, best_merge = min(best_parse, parsed - start), min(best_merge, merged - parsed)
+
+        assert len(history.parced_events) == events_count
+        assert all(event.listing and event.purchase and event.asset for event in history.parced_events)
+    return best_parse, best_merge
+
+
+if __name__ == '__main__':
+    for events in [5_000, 50_000]:
+        parse, merge = bench_market_history(events_count=events, repeat=1 if events > 10_000 else 3)
+        print(f"market history: events={events}, pages={events // 500}: parse={parse * 1000:.0f} ms, merge pages={merge * 1000:.0f} ms")
@@ -0,0 +1,74 @@
+def make_inventory_json(assets_count: int = 50_000, descriptions_count: int = 2_000, appid: int = 3017120, start_assetid: int = 1) -> dict:
+    """Создаёт ответ /inventory/ с заданным количеством ассетов и описаний."""
+    descriptions = [
+        {
+            'appid': appid,
+            'classid': str(1000 + num),
+            'instanceid': '0',
+            'currency': 0,
+            'background_color': '',
+            'icon_url': f'icon_{num}',
+            'descriptions': [{'type': 'html', 'value': f'Description {num}'}],
+            'tradable': num % 3 != 0,
+            'name': f'Item {num}',
+            'name_color': 'D2D2D2',
+            'type': 'Common',
+            'market_name': f'Item {num}',
+            'market_hash_name': f'Item {num}',
+            'commodity': 1,
+            'marketable': num % 4 != 0,
+            'tags': [{'category': 'Type', 'internal_name': 'common', 'localized_category_name': 'Type', 'localized_tag_name': 'Common'}],
+        }
+        for num in range(descriptions_count)
+    ]
+    assets = [
+        {
+            'appid': appid,
+            'contextid': '2',
+            'assetid': str(start_assetid + num),
+            'classid': str(1000 + num % descriptions_count),
+            'instanceid': '0',
+            'amount': str(1 + num % 5),
+        }
+        for num in range(assets_count)
+    ]
+    return {
+        'assets': assets,
+        'descriptions': descriptions,
+        'total_inventory_count': assets_count,
+        'success': 1,
+        'rwgrsn': -2,
+    }
+
+
+def make_listing_page_html(item_nameid: int = 176543210, head_size: int = 60_000, tail_size: int = 400_000) -> bytes:
+    """Создаёт страницу /market/listings/ с вызовом Market_LoadOrderSpread после head_size байт разметки."""
+    head = '<html><head>' + ''.join(f'<link rel="stylesheet" href="https://community.akamai.steamstatic.com/css/{num}.css">' for num in range(head_size // 80)) + '</head><body>'
+    script = f'<script type="text/javascript">$J(function() {{ Market_LoadOrderSpread( {item_nameid} ); }});</script>'
+    listings = ''.join(f'<div class="market_listing_row" id="listing_{num}"><span class="market_listing_price">$0.{num % 100:02d}</span></div>' for num in range(tail_size // 110))
+    return (head + script + listings + '</body></html>').encode()
+
+
+def make_market_history_pages(events_count: int = 50_000, page_size: int = 500, appid: int = 3017120) -> list[dict]:
+    """Создаёт страницы ответа /market/myhistory/render/ (события от новых к старым), на каждое событие свой лот и покупка."""
+    pages = []
+    for start in range(0, events_count, page_size):
+        events, listings, purchases, assets = [], {}, {}, {}
+        for num in range(start, min(start + page_size, events_count)):
+            listingid, purchaseid, assetid = str(10 ** 9 + num), str(2 * 10 ** 9 + num), str(3 * 10 ** 9 + num)
+            asset = {'appid': appid, 'contextid': '2', 'id': assetid, 'amount': '1', 'market_hash_name': f'Item {num % 2000}'}
+            events.append({'listingid': listingid, 'purchaseid': purchaseid, 'event_type': 3, 'time_event': 1_700_000_000 - num // 2, 'steamid_actor': '76561198000000000'})
+            listings[listingid] = {'listingid': listingid, 'price': 100 + num % 50, 'asset': asset}
+            purchases[f'{listingid}_{purchaseid}'] = {'listingid': listingid, 'purchaseid': purchaseid, 'paid_amount': 100, 'asset': asset}
+            assets[assetid] = asset
+        pages.append({
+            'success': True,
+            'pagesize': page_size,
+            'total_count': events_count,
+            'start': start,
+            'assets': {str(appid): {'2': assets}},
+            'events': events,
+            'purchases': purchases,
+            'listings': listings,
+        })
+    return pages
@@ -1,8 +1,11 @@
+import base64
+import datetime
+import json
 from unittest.mock import Mock, patch
 
 import pytest
 
-from app.core.manager_class.account_class import Account, AccountTable
+from app.core.manager_class.account_class import Account, AccountTable, SteamWebToken
 from app.database.sqlite_manager import sql_manager
 
 
@@ -12,20 +15,42 @@ def account():
     return Account()
 
 
+def make_probe_response(logged_in: bool, steam_id: str = '76561198000000000') -> Mock:
+    return Mock(ok=True, json=Mock(return_value={'logged_in': logged_in, 'steamid': steam_id}))
+
+
 def test_is_alive_session_true(account):
     """Тест проверки живой сессии при наличии валидного аккаунта."""
-    with patch.object(account.session, 'get', return_value=Mock(ok=True, text="AccountName")):
-        account.account_name = "AccountName"
+    with patch.object(account.session, 'get', return_value=make_probe_response(True)):
+        account.steam_id = "76561198000000000"
         assert account.is_alive_session() is True
 
 
 def test_is_alive_session_false(account):
     """Тест проверки мертвой сессии при отсутствии валидного аккаунта."""
-    with patch.object(account.session, 'get', return_value=Mock(ok=True, text="InvalidName")):
-        account.account_name = "AccountName"
+    with patch.object(account.session, 'get', return_value=make_probe_response(False)):
+        account.steam_id = "76561198000000000"
         assert account.is_alive_session() is False
 
 
+def test_is_alive_session_cached_until_suspect_response(account):
+    """Тест кеширования живой сессии и перепроверки после ответа с признаками разлогина."""
+    account.steam_id = "76561198000000000"
+    with patch.object(account.session, 'get', return_value=make_probe_response(True)) as get_mock:
+        for _ in range(5):
+            assert account.is_alive_session() is True
+        assert get_mock.call_count == 1
+
+        account.on_response(Mock(url='https://steamcommunity.com/market/mylistings', status_code=200))
+        account.on_response(Mock(url='https://api.steampowered.com/IInventoryService/CombineItemStacks/v1/', status_code=401))
+        assert account.is_alive_session() is True and get_mock.call_count == 1
+
+        account.on_response(Mock(url='https://steamcommunity.com/login/home/?goto=market', status_code=200))
+        get_mock.return_value = make_probe_response(True, steam_id='76561198000000001')
+        assert account.is_alive_session(is_callback=False) is False
+        assert get_mock.call_count == 2
+
+
 def test_get_steam_web_token(account):
     """Тест получения Steam Web Token."""
     account.is_alive_session = Mock(return_value=True)
@@ -80,3 +105,75 @@ def test_load_all(account):
     accounts = Account.load_all()
     assert "test_account" in accounts
     assert accounts["test_account"].account_name == "test_account"
+
+
+def make_jwt(expires_at: datetime.datetime) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': int(expires_at.timestamp())}).encode()).decode().rstrip('=')
+    return f'eyJhbGciOiJFZERTQSJ9.{payload}.signature'
+
+
+def test_web_token_expiry_from_jwt():
+    """Тест чтения срока жизни токена из JWT."""
+    expires_at = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(hours=2)
+    web_token = SteamWebToken(make_jwt(expires_at))
+    assert web_token.expires_at == expires_at
+    assert web_token.is_valid(margin=datetime.timedelta(hours=1))
+    assert not web_token.is_valid(margin=datetime.timedelta(hours=3))
+    assert SteamWebToken('not_a_jwt').expires_at is None
+
+
+def test_web_token_persisted_and_refreshed(account):
+    """Тест использования сохранённого токена без загрузки профиля и повторной загрузки после истечения."""
+    token = make_jwt(datetime.datetime.now() + datetime.timedelta(hours=2))
+    account.set_save_data({'account_name': None, 'web_token': SteamWebToken(token).get_save_data()})
+    account.is_alive_session = Mock(return_value=True)
+    with patch.object(account.session, 'get') as get_mock:
+        assert account.get_steam_web_token() == token
+        get_mock.assert_not_called()
+
+    expired_token = make_jwt(datetime.datetime.now() - datetime.timedelta(minutes=5))
+    account.set_save_data({'web_token': SteamWebToken(expired_token).get_save_data()})
+    with patch.object(account.session, 'get', return_value=Mock(text=f'loyalty_webapi_token = "{token}"')) as get_mock:
+        assert account.get_steam_web_token() == token
+        assert account.get_save_data()['web_token']['token'] == token
+        get_mock.assert_called_once()
+
+
+def test_web_token_invalidate(account):
+    """Тест сброса токена после ошибки авторизации: устаревший токен не сбрасывает уже обновлённый."""
+    account.is_alive_session = Mock(return_value=True)
+    with patch.object(account.session, 'get', side_effect=[Mock(text='loyalty_webapi_token = "first"'), Mock(text='loyalty_webapi_token = "second"')]):
+        assert account.get_steam_web_token() == 'first'
+        account.invalidate_steam_web_token('first')
+        assert account.get_steam_web_token() == 'second'
+        account.invalidate_steam_web_token('first')
+        assert account.get_steam_web_token() == 'second'
+
+
+def test_web_token_refresh_backs_off_and_stops_on_dead_session(account):
+    """Тест повтора обновления токена с растущей задержкой и остановки таймера при мёртвой сессии и выходе."""
+    account.steam_id = '76561198000000000'
+    token = make_jwt(datetime.datetime.now() + datetime.timedelta(hours=2))
+    account.set_save_data({'account_name': None, 'web_token': SteamWebToken(token).get_save_data()})
+    logged_in = True
+
+    def get(url, **kwargs):
+        if 'clientjstoken' in url: return make_probe_response(logged_in)
+        return Mock(text='no token')
+
+    with patch.object(account.session, 'get', side_effect=get):
+        delays = []
+        for _ in range(7):
+            assert account.get_steam_web_token(force_refresh=True) == token
+            delays.append(account._Account__web_token_timer.interval)
+        assert delays == [60, 120, 240, 480, 960, 1800, 1800]
+
+        logged_in = False
+        account._Account__last_check_time = datetime.datetime.min
+        assert account.get_steam_web_token(force_refresh=True) == token
+        assert account._Account__web_token_timer is None
+
+    account.get_steam_web_token()
+    assert account._Account__web_token_timer is not None
+    account.stop_web_token_refresh()
+    assert account._Account__web_token_timer is None
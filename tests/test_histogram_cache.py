@@ -0,0 +1,109 @@
+import asyncio
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.package.data_collectors.histogram_cache import HistogramCache
+from app.package.data_collectors.steam_api_utility import SteamAPIUtility
+from app.package.data_collectors.steam_transport import SteamTransport, RetryPolicy
+
+
+@pytest.fixture
+def clock():
+    """Фикстура с подменой времени в модуле кэша."""
+    fake_clock = Mock()
+    fake_clock.monotonic.return_value = 0.0
+    with patch('app.package.data_collectors.histogram_cache.time', fake_clock):
+        yield fake_clock
+
+
+def test_ttl_and_counters(clock):
+    """Тест истечения записи по TTL и счётчиков попаданий/промахов."""
+    cache = HistogramCache(ttl=10)
+    key = cache.make_key(appid=730, item_nameid=1, currency=37, country='KZ')
+    loader = Mock(side_effect=['first', 'second'])
+
+    assert cache.get_or_load(key, loader) == 'first'
+    clock.monotonic.return_value = 9.0
+    assert cache.get_or_load(key, loader) == 'first'
+    clock.monotonic.return_value = 10.5
+    assert cache.get_or_load(key, loader) == 'second'
+
+    assert loader.call_count == 2
+    assert cache.get_stats() == {'hits': 1, 'misses': 2, 'coalesced': 0, 'size': 1}
+
+
+def test_empty_result_not_cached():
+    """Тест того, что неудачный ответ не попадает в кэш."""
+    cache = HistogramCache(ttl=10)
+    loader = Mock(side_effect=[None, 'value'])
+
+    assert cache.get_or_load(('730', '1', '37', 'KZ'), loader) is None
+    assert cache.get_or_load(('730', '1', '37', 'KZ'), loader) == 'value'
+    assert cache.misses == 2
+
+
+def test_single_flight_threads():
+    """Тест схлопывания одновременных запросов одного ключа в один."""
+    cache = HistogramCache(ttl=10)
+    started, release = threading.Event(), threading.Event()
+    loader_calls = []
+
+    def loader():
+        loader_calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.get_or_load('key', loader)))
+    owner.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(cache.get_or_load('key', loader))) for _ in range(5)]
+    for waiter in waiters: waiter.start()
+    while cache.coalesced < 5: pass
+    release.set()
+    for thread in [owner, *waiters]: thread.join(5)
+
+    assert results == ['value'] * 6
+    assert len(loader_calls) == 1
+    assert (cache.misses, cache.coalesced) == (1, 5)
+
+
+def test_single_flight_async_error():
+    """Тест: ошибка запроса передаётся всем ожидающим и не кэшируется."""
+    cache = HistogramCache(ttl=10)
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise ConnectionError('timeout')
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load_async('key', loader) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert (cache.misses, cache.coalesced, cache.get_stats()['size']) == (1, 2, 0)
+
+
+def test_steam_api_histogram_uses_cache():
+    """Тест повторного запроса гистограммы из кэша SteamAPIUtility."""
+    account = Mock()
+    account.is_alive_session.return_value = True
+    account.wallet_country, account.wallet_currency = 'KZ', 37
+    account.session.get.return_value = Mock(ok=True, status_code=200, headers={}, json=Mock(return_value={'success': 1, 'highest_buy_order': '5'}))
+    transport = SteamTransport(rates={name: (1000.0, 1000) for name in SteamTransport.default_rates}, retry_policy=RetryPolicy(max_attempts=1))
+    cache = HistogramCache(ttl=10)
+    first_api = SteamAPIUtility(account, transport=transport, histogram_cache=cache)
+    second_api = SteamAPIUtility(account, transport=transport, histogram_cache=cache)
+
+    with patch('app.package.data_collectors.steam_api_utility.sql_manager') as sql_manager:
+        sql_manager.item_nameid_get.return_value = 42
+        first = first_api.fetch_market_itemordershistogram(market_hash_name='Item', appid=730)
+        second = second_api.fetch_market_itemordershistogram(market_hash_name='Item', appid=730)
+
+    assert first is second
+    assert first.highest_buy_order == '5'
+    assert account.session.get.call_count == 1
+    assert 'item_nameid=42' in account.session.get.call_args.kwargs['url']
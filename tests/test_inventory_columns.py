@@ -0,0 +1,87 @@
+import pytest
+
+from app.package.data_collectors import inventory_columns
+from app.package.data_collectors.steam_api_utility import InventoryManager
+from tests.test_inventory_manager import make_description, make_asset
+
+pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def inventory_json():
+    """Фикстура с инвентарём из описаний с разными флагами и количеством."""
+    return {
+        'success': 1,
+        'descriptions': [
+            make_description('1', tradable=1, marketable=1),
+            make_description('2', tradable=0, marketable=1),
+            make_description('3', tradable=1, marketable=0),
+            make_description('4', tradable=1, marketable=1),
+        ],
+        'assets': [
+            make_asset('10', '1', amount='3'),
+            make_asset('11', '2', amount='7'),
+            make_asset('12', '1', amount='2'),
+            make_asset('13', '3', amount='1'),
+            make_asset('14', '4', amount='5'),
+        ],
+    }
+
+
+def get_results(inventory: InventoryManager) -> tuple:
+    return (
+        [i.get_item_id() for i in inventory.get_tradable_inventory()],
+        [i.get_item_id() for i in inventory.get_marketable_inventory()],
+        inventory.get_amount_items(only_tradable=True),
+        inventory.get_amount_items(only_tradable=False),
+        inventory.get_amount_by_item_id(),
+        [i.get_item_id() for i in inventory.get_top_items(2)],
+        [i.get_item_id() for i in inventory.get_top_items(10, only_tradable=True)],
+    )
+
+
+def test_columns_match_python(inventory_json, monkeypatch):
+    """Тест совпадения векторных запросов с обходом объектов."""
+    columns_results = get_results(InventoryManager(inventory_json))
+    monkeypatch.setattr(inventory_columns, 'np', None)
+    assert get_results(InventoryManager(inventory_json)) == columns_results
+    assert columns_results[2:6] == (11, 18, {'1_0': 5, '2_0': 7, '3_0': 1, '4_0': 5}, ['2_0', '1_0'])
+
+
+def test_columns_invalidated_on_change(inventory_json):
+    """Тест пересчёта колонок после изменения предметов и догрузки страницы."""
+    inventory = InventoryManager(inventory_json)
+    assert inventory.get_amount_items(only_tradable=False) == 18
+
+    item = inventory.inventory[0]
+    item.remove_items(item.get_amount_items(4))
+    assert inventory.get_amount_items(only_tradable=False) == 14
+
+    inventory.add_next_invent(InventoryManager({'success': 1, 'descriptions': [make_description('5', tradable=1)], 'assets': [make_asset('20', '5', amount='6')]}))
+    assert inventory.get_amount_items(only_tradable=True) == 13
+    inventory.inventory[-1].remove_items(inventory.inventory[-1].get_amount_items(1))
+    assert inventory.get_amount_items(only_tradable=True) == 12
+    assert [i.get_item_id() for i in inventory.get_top_items(1)] == ['2_0']
+
+
+def test_columns_updated_in_place_on_move(inventory_json, monkeypatch):
+    """Тест: перенос предметов обновляет количество в колонках без их пересборки."""
+    from app.package.data_collectors import steam_api_utility
+    built = []
+
+    class CountingColumns(inventory_columns.InventoryColumns):
+        def __init__(self, inventory):
+            built.append(len(inventory))
+            super().__init__(inventory)
+
+    monkeypatch.setattr(steam_api_utility, 'InventoryColumns', CountingColumns)
+    inventory = InventoryManager(inventory_json)
+    item = inventory.inventory[0]
+    for _ in range(10):
+        selection = item.get_amount_items(2)
+        item.remove_items(selection)
+        assert inventory.get_amount_items(only_tradable=False) == 16
+        item.add_items(selection)
+        assert inventory.get_amount_by_item_id()['1_0'] == 5
+
+    assert built == [4]
@@ -0,0 +1,201 @@
+import copy
+
+import pytest
+
+from app.package.data_collectors.steam_api_utility import InventoryManager, InventoryItemRgDescriptions, InventoryItemSelection
+
+
+def make_description(classid: str, instanceid: str = '0', **kwargs) -> dict:
+    return {'appid': 730, 'classid': classid, 'instanceid': instanceid, 'name': f'Item {classid}', 'market_hash_name': f'Item {classid}', **kwargs}
+
+
+def make_asset(assetid: str, classid: str, instanceid: str = '0', amount: str = '1') -> dict:
+    return {'appid': 730, 'contextid': '2', 'assetid': assetid, 'classid': classid, 'instanceid': instanceid, 'amount': amount}
+
+
+@pytest.fixture
+def inventory_json():
+    """Фикстура с ответом /inventory/ из нескольких описаний и ассетов."""
+    return {
+        'success': 1,
+        'descriptions': [
+            make_description('1', tradable=1, marketable=1),
+            make_description('2', tradable=0, marketable=1),
+            make_description('1'),
+            make_description('1', instanceid='5', tradable=1),
+        ],
+        'assets': [
+            make_asset('10', '1', amount='3'),
+            make_asset('11', '2'),
+            make_asset('12', '1', amount='2'),
+            make_asset('13', '1', instanceid='5'),
+            make_asset('14', '99'),
+        ],
+    }
+
+
+def test_parse_inventory_groups_assets(inventory_json):
+    """Тест группировки ассетов по (classid, instanceid)."""
+    inventory = InventoryManager(inventory_json)
+
+    assert all(isinstance(item, InventoryItemRgDescriptions) for item in inventory.inventory)
+    items = {item.get_item_id(): item for item in inventory.inventory}
+    assert list(items) == ['1_0', '2_0', '1_5']
+    assert [i.assetid for i in items['1_0'].items] == ['10', '12']
+    assert items['1_0'].get_amount() == 5
+    assert [i.assetid for i in items['2_0'].items] == ['11']
+    assert [i.assetid for i in items['1_5'].items] == ['13']
+
+
+def test_parse_inventory_keeps_first_description(inventory_json):
+    """Тест того, что при дубликатах описаний используется первое."""
+    inventory = InventoryManager(inventory_json)
+    item = next(item for item in inventory.inventory if item.get_item_id() == '1_0')
+    assert item.is_tradable() is True
+
+
+def test_parse_inventory_amounts(inventory_json):
+    """Тест подсчёта предметов в инвентаре."""
+    inventory = InventoryManager(inventory_json)
+    assert inventory.get_amount_items(only_tradable=False) == 7
+    assert inventory.get_amount_items(only_tradable=True) == 6
+    assert len(inventory.get_marketable_inventory()) == 2
+
+
+def test_parse_inventory_legacy_format():
+    """Тест разбора старого формата rgInventory/rgDescriptions."""
+    inventory = InventoryManager({
+        'success': True,
+        'rgInventory': {'10': {'id': '10', 'classid': '1', 'instanceid': '0', 'amount': '4'}},
+        'rgDescriptions': {'1_0': make_description('1')},
+    })
+    assert len(inventory.inventory) == 1
+    assert inventory.inventory[0].items[0].assetid == '10'
+    assert inventory.inventory[0].get_amount() == 4
+
+
+def test_add_next_invent_merges_page(inventory_json):
+    """Тест слияния следующей страницы инвентаря без пересоздания описаний."""
+    inventory = InventoryManager(inventory_json)
+    first_items = {item.get_item_id(): item for item in inventory.inventory}
+
+    next_page = InventoryManager({
+        'success': 1,
+        'descriptions': [make_description('1'), make_description('3')],
+        'assets': [make_asset('20', '1', amount='4'), make_asset('21', '3'), make_asset('22', '2')],
+    })
+    inventory.add_next_invent(next_page)
+
+    items = {item.get_item_id(): item for item in inventory.inventory}
+    assert list(items) == ['1_0', '2_0', '1_5', '3_0']
+    assert items['1_0'] is first_items['1_0']
+    assert items['2_0'] is first_items['2_0']
+    assert [i.assetid for i in items['1_0'].items] == ['10', '12', '20']
+    assert items['1_0'].get_amount() == 9
+    assert [i.assetid for i in items['2_0'].items] == ['11', '22']
+    assert [i.assetid for i in items['3_0'].items] == ['21']
+    assert len(inventory.assets) == 8
+
+
+def test_parse_inventory_defers_inventory_items(inventory_json):
+    """Тест отложенного создания InventoryItem: количество известно сразу, предметы создаются при обращении."""
+    inventory = InventoryManager(inventory_json)
+    item = inventory.inventory[0]
+    next_page = InventoryManager({'success': 1, 'descriptions': [make_description('1')], 'assets': [make_asset('20', '1', amount='4')]})
+    inventory.add_next_invent(next_page)
+
+    assert (item.get_amount(), item.get_items_amount()) == (9, 3)
+    assert item.get_item('12').amount == 2 and item.get_item('12').appid == 730
+    assert [(i.assetid, i.amount) for i in item.items] == [('10', 3), ('12', 2), ('20', 4)]
+    item.remove_item(copy.copy(item.get_item('20')))
+    assert item.get_amount() == 5
+
+    orphan = InventoryManager({'success': 1, 'descriptions': [], 'assets': [make_asset('30', '7', amount='2')]})
+    assert orphan.assets == [{**make_asset('30', '7', amount='2'), 'hide_in_china': 0, 'pos': 0}]
+
+
+def test_add_next_invent_attaches_orphan_assets():
+    """Тест привязки ассетов, описание которых пришло на другой странице."""
+    inventory = InventoryManager({'success': 1, 'descriptions': [], 'assets': [make_asset('10', '7')]})
+    inventory.add_next_invent(InventoryManager({'success': 1, 'descriptions': [make_description('7')], 'assets': [make_asset('11', '7')]}))
+
+    assert len(inventory.inventory) == 1
+    assert sorted(i.assetid for i in inventory.inventory[0].items) == ['10', '11']
+    assert all(i.appid == 730 for i in inventory.inventory[0].items)
+
+
+def test_add_next_invent_matches_full_parse(inventory_json):
+    """Тест совпадения результата слияния страниц с разбором всего инвентаря разом."""
+    next_json = {
+        'success': 1,
+        'descriptions': [make_description('1'), make_description('3')],
+        'assets': [make_asset('20', '1', amount='4'), make_asset('21', '3')],
+    }
+    full = InventoryManager(copy.deepcopy({
+        'success': 1,
+        'descriptions': inventory_json['descriptions'] + next_json['descriptions'],
+        'assets': inventory_json['assets'] + next_json['assets'],
+    }))
+
+    merged = InventoryManager(inventory_json)
+    merged.add_next_invent(InventoryManager(next_json))
+
+    def summary(manager: InventoryManager):
+        return {item.get_item_id(): sorted((i.assetid, i.amount) for i in item.items) for item in manager.inventory}
+
+    assert summary(merged) == summary(full)
+
+
+def test_inventory_item_lazy_descriptions_and_save_data():
+    """Тест ленивого разбора описаний/тегов и восстановления исходных данных."""
+    description = make_description('1', tags=[{'category': 'Type', 'internal_name': 'coin', 'category_name': 'Type', 'name': 'Coin'}], descriptions=[{'type': 'html', 'value': 'text'}])
+    inventory = InventoryManager({'success': 1, 'descriptions': [description], 'assets': [make_asset('10', '1', amount='2')]})
+    item = inventory.inventory[0]
+    assert not hasattr(item, '__dict__')
+    assert item.tags[0].internal_name == 'coin'
+    assert item.tags is item.tags
+    assert item.descriptions[0].value == 'text'
+    assert inventory.descriptions[0]['tags'] == description['tags']
+    assert inventory.assets == [{**make_asset('10', '1', amount='2'), 'hide_in_china': 0, 'pos': 0}]
+
+
+def test_add_remove_items_keeps_index_and_amount():
+    """Тест индекса ассетов и текущего количества при переносе предметов."""
+    source = InventoryItemRgDescriptions({**make_description('1'), 'items': [make_asset(str(i), '1') for i in range(5000)]})
+    target = InventoryItemRgDescriptions(make_description('1'))
+    assert source.get_amount() == 5000
+
+    selection = source.get_amount_items(3000)
+    source.remove_items(selection)
+    target.add_items(selection)
+    target.add_items(source.get_amount_items(1))
+    assert source.get_amount() == 2000
+    assert target.get_amount() == 3001
+    assert len([i for i in target.items if i.amount > 0]) == 3001
+
+    selection = target.get_amount_items(2)
+    selection.set_item_amount(selection.items[0], 0)
+    assert selection.get_amount() == 1
+    target.remove_items(selection)
+    assert target.get_amount() == 3000
+    assert selection.items[0].amount == 0
+
+
+def test_get_amount_items_selection():
+    """Тест выборки части предметов без копирования описания."""
+    item = InventoryItemRgDescriptions({**make_description('1', tradable=1, tags=[{'name': 'Coin'}]), 'items': [make_asset('10', '1', amount='3'), make_asset('11', '1', amount='0'), make_asset('12', '1', amount='4')]})
+    selection = item.get_amount_items(5)
+    assert isinstance(selection, InventoryItemSelection)
+    assert selection.get_amount() == 5
+    assert [(i.assetid, i.amount) for i in selection.items] == [('10', 3), ('12', 2)]
+    assert selection.name == item.name and selection.is_tradable() and selection.tags is item.tags
+
+    item.remove_items(selection)
+    assert item.get_amount() == 2
+    assert [(i.assetid, i.amount) for i in selection.items] == [('10', 3), ('12', 2)]
+    assert selection.get_amount_items(4).get_amount() == 4
+
+    selection.add_items(item.get_amount_items(1))
+    assert selection.get_amount() == 6
+    item.add_items(selection)
+    assert item.get_amount() == 8
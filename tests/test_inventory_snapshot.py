@@ -0,0 +1,120 @@
+from unittest.mock import Mock
+
+import pytest
+
+from app.package.data_collectors.inventory_snapshot import InventoryDiff, InventorySnapshot, InventorySnapshotManager
+from app.package.data_collectors.steam_api_utility import InventoryManager
+
+
+def make_page(assets: list[tuple[str, str]], more_items: bool = False) -> InventoryManager:
+    return InventoryManager({
+        'success': 1,
+        'more_items': int(more_items),
+        'descriptions': [{'appid': 730, 'classid': '1', 'instanceid': '0', 'name': 'Item'}],
+        'assets': [{'appid': 730, 'contextid': '2', 'assetid': assetid, 'classid': '1', 'instanceid': '0', 'amount': amount} for assetid, amount in assets],
+    })
+
+
+@pytest.fixture
+def saved_snapshots(monkeypatch):
+    """Фикстура, подменяющая хранение снимков в базе данных словарём."""
+    storage: dict[str, InventorySnapshot] = {}
+
+    def save(self: InventorySnapshot):
+        storage[self.get_key()] = self
+
+    def load(steam_id, appid, context_id=2):
+        snapshot = storage.get(InventorySnapshot.make_key(steam_id, appid, context_id), None)
+        if snapshot: snapshot.is_loaded_from_disk = True
+        return snapshot
+
+    monkeypatch.setattr(InventorySnapshot, 'save', save)
+    monkeypatch.setattr(InventorySnapshot, 'load', staticmethod(load))
+    return storage
+
+
+def test_inventory_diff():
+    """Тест вычисления добавленных, удалённых и изменённых ассетов."""
+    diff = InventoryDiff(
+        [{'assetid': '1', 'amount': '1'}, {'assetid': '2', 'amount': '5'}, {'assetid': '3', 'amount': '1'}],
+        [{'assetid': '2', 'amount': '7'}, {'assetid': '3', 'amount': '1'}, {'assetid': '4', 'amount': '1'}],
+    )
+    assert [a['assetid'] for a in diff.added] == ['4']
+    assert [a['assetid'] for a in diff.removed] == ['1']
+    assert [(old['amount'], new['amount']) for old, new in diff.changed] == [('5', '7')]
+    assert not diff.is_empty()
+
+
+def test_refresh_fetches_once_while_fresh(saved_snapshots):
+    """Тест того, что свежий снимок не загружается повторно для другой страницы."""
+    steam_api = Mock()
+    steam_api.iter_inventory_pages.side_effect = lambda **kwargs: iter([make_page([('1', '2')])])
+    manager = InventorySnapshotManager()
+
+    first, first_diff = manager.refresh(steam_api, steam_id='1', appid=730)
+    second, second_diff = manager.refresh(steam_api, steam_id='1', appid=730)
+
+    assert steam_api.iter_inventory_pages.call_count == 1
+    assert first.get_amount_items(only_tradable=False) == second.get_amount_items(only_tradable=False) == 2
+    assert first is not second
+    assert second_diff is None
+    assert manager.is_fresh(steam_id='1', appid=730)
+
+
+def test_refresh_computes_diff_against_saved_snapshot(saved_snapshots):
+    """Тест сравнения свежего инвентаря со снимком, сохранённым на диске."""
+    InventorySnapshot.create_from_inventory('1', 730, 2, make_page([('1', '1'), ('2', '3')])).save()
+    steam_api = Mock()
+    steam_api.iter_inventory_pages.return_value = iter([make_page([('2', '4'), ('5', '1')])])
+    manager = InventorySnapshotManager()
+
+    snapshot = manager.get_snapshot(steam_id='1', appid=730)
+    assert snapshot.to_inventory().get_amount_items(only_tradable=False) == 4
+    assert not manager.is_fresh(steam_id='1', appid=730)
+
+    inventory, diff = manager.refresh(steam_api, steam_id='1', appid=730)
+    assert inventory.get_amount_items(only_tradable=False) == 5
+    assert [a['assetid'] for a in diff.added] == ['5']
+    assert [a['assetid'] for a in diff.removed] == ['1']
+    assert len(diff.changed) == 1
+    assert 'items' not in saved_snapshots['1_730_2'].descriptions[0]
+
+
+def test_refresh_does_not_save_partial_inventory(saved_snapshots):
+    """Тест того, что неполная загрузка не перезаписывает снимок."""
+    steam_api = Mock()
+    steam_api.iter_inventory_pages.return_value = iter([make_page([('1', '1')], more_items=True)])
+    manager = InventorySnapshotManager()
+
+    inventory, diff = manager.refresh(steam_api, steam_id='1', appid=730)
+
+    assert inventory.get_amount_items(only_tradable=False) == 1
+    assert diff is None
+    assert not saved_snapshots
+    assert not manager.is_fresh(steam_id='1', appid=730)
+
+
+def test_invalidate(saved_snapshots):
+    """Тест сброса свежести снимка."""
+    steam_api = Mock()
+    steam_api.iter_inventory_pages.side_effect = lambda **kwargs: iter([make_page([('1', '1')])])
+    manager = InventorySnapshotManager()
+    manager.refresh(steam_api, steam_id='1', appid=730)
+    manager.invalidate(steam_id='1', appid=730)
+    manager.refresh(steam_api, steam_id='1', appid=730)
+    assert steam_api.iter_inventory_pages.call_count == 2
+
+
+def test_update_stores_local_inventory(saved_snapshots):
+    """Тест сохранения локально изменённого инвентаря как свежего снимка без загрузки."""
+    steam_api = Mock()
+    inventory = make_page([('1', '2'), ('2', '3')])
+    inventory.inventory[0].stack_items([('1', '2', 2)])
+    manager = InventorySnapshotManager()
+
+    manager.update(steam_id='1', appid=730, inventory=inventory)
+    result, diff = manager.refresh(steam_api, steam_id='1', appid=730)
+
+    steam_api.iter_inventory_pages.assert_not_called()
+    assert [(asset['assetid'], asset['amount']) for asset in saved_snapshots['1_730_2'].assets] == [('2', '5')]
+    assert result.inventory[0].get_amount() == 5 and diff is None
@@ -0,0 +1,73 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.database.sqlite_manager import SqliteDatabaseManager
+from app.package.data_collectors.steam_api_utility import SteamAPIUtility
+from app.package.data_collectors.steam_transport import SteamTransport, RetryPolicy
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """Фикстура менеджера базы данных во временном файле."""
+    return SqliteDatabaseManager(db_name=str(tmp_path / 'nameid.db'))
+
+
+def test_item_nameid_map_preload_and_sync(db_manager):
+    """Тест загрузки item_nameid в память при старте и синхронизации при сохранении."""
+    db_manager.item_nameid_save(appid=730, market_hash_name='A', nameid=1)
+    db_manager.item_nameid_save_many(appid=730, nameids={'B': 2, 'C': '3', 'D': None})
+
+    assert db_manager.item_nameid_get(appid=730, market_hash_name='C') == 3
+    assert db_manager.item_nameid_missing_get(appid=730, market_hash_names=['A', 'B', 'D', 'E', 'D']) == ['D', 'E']
+
+    reloaded = SqliteDatabaseManager(db_name=db_manager.db_name)
+    with patch('app.database.sqlite_manager.sqlite3.connect') as connect:
+        assert [reloaded.item_nameid_get(appid=730, market_hash_name=name) for name in 'ABCD'] == [1, 2, 3, None]
+        assert reloaded.item_nameid_get(appid=570, market_hash_name='A') is None
+    connect.assert_not_called()
+
+    reloaded.item_nameid_del(appid=730, market_hash_name='A')
+    assert reloaded.item_nameid_get(appid=730, market_hash_name='A') is None
+
+
+def test_resolve_item_nameids_loads_only_missing(db_manager):
+    """Тест массовой загрузки только недостающих item_nameid."""
+    account = Mock()
+    account.is_alive_session.return_value = True
+
+    def get(url, **kwargs):
+        name = url.rsplit('/', 1)[1]
+        nameid = {'B': 2, 'C': 3}.get(name)
+        html = f'<script>Market_LoadOrderSpread( {nameid} );</script>' if nameid else '<html></html>'
+        return Mock(ok=True, status_code=200, headers={}, iter_content=Mock(return_value=iter([html.encode()])))
+
+    account.session.get.side_effect = get
+    transport = SteamTransport(rates={name: (1000.0, 1000) for name in SteamTransport.default_rates}, retry_policy=RetryPolicy(max_attempts=1))
+    steam_api = SteamAPIUtility(account, transport=transport)
+    db_manager.item_nameid_save(appid=730, market_hash_name='A', nameid=1)
+
+    with patch('app.package.data_collectors.steam_api_utility.sql_manager', db_manager):
+        item_nameids = steam_api.resolve_item_nameids(['A', 'B', 'C', 'X'], appid=730)
+
+    assert item_nameids == {'A': 1, 'B': 2, 'C': 3}
+    assert sorted(call.kwargs['url'].rsplit('/', 1)[1] for call in account.session.get.call_args_list) == ['B', 'C', 'X']
+    assert SqliteDatabaseManager(db_name=db_manager.db_name).item_nameid_get(appid=730, market_hash_name='C') == 3
+
+
+def test_parse_item_nameid_stream_stops_early():
+    """Тест потокового поиска item_nameid: совпадение на границе блоков и остановка чтения."""
+    html = ('<head>' + 'x' * 20_000 + '</head><script>Market_LoadOrderSpread( 176543210 );</script>' + 'y' * 200_000).encode()
+    split_at = html.index(b'OrderSpread')
+    chunks = [html[:split_at], html[split_at:split_at + 16384], html[split_at + 16384:]]
+    read_chunks = []
+
+    def iter_chunks():
+        for chunk in chunks:
+            read_chunks.append(chunk)
+            yield chunk
+
+    assert SteamAPIUtility.parse_item_nameid_stream(iter_chunks()) == 176543210
+    assert len(read_chunks) == 2
+    assert SteamAPIUtility.parse_item_nameid_stream([b'ItemActivityTicker.Start( 42 );']) == 42
+    assert SteamAPIUtility.parse_item_nameid_stream([b'<html>', b'</html>']) is None
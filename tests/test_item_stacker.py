@@ -0,0 +1,99 @@
+import threading
+from unittest.mock import Mock
+
+from app.package.data_collectors.item_stacker import StackEngine, StackPlan
+from app.package.data_collectors.steam_api_utility import InventoryItemRgDescriptions
+from app.package.data_collectors.steam_transport import RetryPolicy
+
+
+def make_description(amounts: list[int], classid: str = '1') -> InventoryItemRgDescriptions:
+    items = [{'appid': 730, 'contextid': '2', 'assetid': f'{classid}{num}', 'classid': classid, 'amount': str(amount)} for num, amount in enumerate(amounts)]
+    return InventoryItemRgDescriptions({'appid': 730, 'classid': classid, 'name': f'Item {classid}', 'items': items})
+
+
+def make_response(status_code: int = 200, eresult: str | None = '1') -> Mock:
+    return Mock(status_code=status_code, headers={'x-eresult': eresult} if eresult else {})
+
+
+def make_steam_api(combine: callable) -> Mock:
+    steam_api = Mock()
+    steam_api.transport.retry_policy = RetryPolicy(backoff_base=0.001, backoff_max=0.001)
+    steam_api.combine_itemstacks.side_effect = combine
+    return steam_api
+
+
+def test_plan_uses_largest_stack_as_destination():
+    """Тест плана: все стаки переносятся в самый большой."""
+    plan = StackPlan.create(make_description([1, 5, 2, 7, 1]))
+
+    assert plan.destitem.assetid == '13'
+    assert [move.fromitem.assetid for move in plan.moves] == ['10', '11', '12', '14']
+    assert plan.get_quantity() == 9
+    assert StackPlan.create(make_description([3])) is None
+
+
+def test_engine_confirms_responses_and_bounds_concurrency():
+    """Тест выполнения плана: повтор 429, отказ по x-eresult и не больше max_workers запросов одновременно."""
+    in_flight, max_in_flight, lock = 0, 0, threading.Lock()
+    attempts: dict[str, int] = {}
+
+    def combine(fromitem, destitem):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            attempts[fromitem.assetid] = attempts.get(fromitem.assetid, 0) + 1
+            attempt = attempts[fromitem.assetid]
+        threading.Event().wait(0.005)
+        with lock:
+            in_flight -= 1
+        if fromitem.assetid == '13': return make_response(eresult='8')
+        if fromitem.assetid == '15' and attempt == 1: return make_response(status_code=429)
+        if fromitem.assetid == '27' and attempt == 1: return None
+        return make_response()
+
+    steam_api = make_steam_api(combine)
+    engine = StackEngine(steam_api, max_workers=3)
+    plans = engine.create_plans([make_description([1] * 10, classid='1'), make_description([2] * 10, classid='2')])
+    progress = []
+
+    report = engine.run(plans, on_progress=lambda move, _report: progress.append((move.fromitem.assetid, move.is_done(), _report.get_finished())))
+
+    assert (report.total, len(report.done), len(report.failed)) == (18, 17, 1)
+    assert report.failed[0].fromitem.assetid == '13' and report.failed[0].eresult == 8
+    assert (attempts['13'], attempts['15'], attempts['27']) == (1, 2, 2)
+    assert [finished for _, _, finished in progress] == list(range(1, 19))
+    assert 1 < max_in_flight <= 3
+
+
+def test_engine_stops_and_skips_remaining():
+    """Тест остановки: оставшиеся переносы пропускаются без запросов."""
+    steam_api = make_steam_api(lambda fromitem, destitem: make_response())
+    engine = StackEngine(steam_api, max_workers=1)
+    plans = engine.create_plans([make_description([1] * 6)])
+
+    report = engine.run(plans, should_stop=lambda: steam_api.combine_itemstacks.call_count >= 2)
+
+    assert (len(report.done), len(report.skipped)) == (2, 3)
+    assert steam_api.combine_itemstacks.call_count == 2
+
+
+def test_engine_applies_confirmed_moves_to_inventory():
+    """Тест применения подтверждённых переносов к инвентарю в памяти и пометки неизвестного исхода."""
+    def combine(fromitem, destitem):
+        if fromitem.assetid == '11': return make_response(eresult='8')
+        if fromitem.assetid == '12': return make_response(status_code=502)
+        if fromitem.assetid == '14': return make_response(eresult=None)
+        return make_response()
+
+    description = make_description([1, 2, 1, 5, 3])
+    steam_api = make_steam_api(combine)
+    engine = StackEngine(steam_api, max_workers=2)
+
+    report = engine.run(engine.create_plans([description]))
+
+    assert [(item.assetid, item.amount) for item in description.items] == [('11', 2), ('12', 1), ('13', 6), ('14', 3)]
+    assert description.get_amount() == 12
+    assert description.get_item('10') is None and description.get_item('13').amount == 6
+    assert sorted(move.fromitem.assetid for move in report.get_uncertain()) == ['12', '14']
+    assert steam_api.combine_itemstacks.call_count == 6
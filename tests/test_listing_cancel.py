@@ -0,0 +1,79 @@
+import threading
+from unittest.mock import Mock
+
+from app.package.data_collectors.listing_cancel import AdaptiveConcurrency, ListingCancelEngine
+from app.package.data_collectors.steam_api_utility import MarketListingsListing, MarketListingsManager
+from app.package.data_collectors.steam_transport import RetryPolicy, SteamTransport
+
+
+def make_steam_api(remove_status: callable, active_ids: list[str] = None) -> Mock:
+    steam_api = Mock()
+    steam_api.transport = SteamTransport(retry_policy=RetryPolicy(backoff_base=0.001, backoff_max=0.001))
+    steam_api.remove_my_listing_status.side_effect = remove_status
+    steam_api.fetch_my_listings.return_value = MarketListingsManager({
+        'success': 1,
+        'listings': [{'listingid': listingid} for listingid in active_ids or []],
+    })
+    return steam_api
+
+
+def test_adaptive_concurrency_aimd():
+    """Тест уменьшения лимита при перегрузке и роста после серии успехов."""
+    concurrency = AdaptiveConcurrency(initial=4, minimum=1, maximum=6)
+    concurrency.acquire()
+    concurrency.release(is_overloaded=True)
+    assert concurrency.limit == 2
+    for _ in range(2):
+        concurrency.acquire()
+        concurrency.release()
+    assert concurrency.limit == 3
+    for _ in range(20):
+        concurrency.acquire()
+        concurrency.release()
+    assert concurrency.limit == 6
+
+
+def test_cancel_retries_transient_and_reconciles():
+    """Тест повтора 429/5xx, отказа без повтора на 4xx и сверки со свежим списком лотов."""
+    listings = [MarketListingsListing({'listingid': str(num)}) for num in range(20)]
+    attempts: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def remove_status(listing, retry_policy=None):
+        assert retry_policy.max_attempts == 1
+        with lock:
+            attempts[listing.listingid] = attempts.get(listing.listingid, 0) + 1
+            attempt = attempts[listing.listingid]
+        if listing.listingid == '5': return 400
+        if listing.listingid in ('1', '2') and attempt == 1: return 429
+        if listing.listingid == '3' and attempt == 1: return 502
+        return 200
+
+    # '7' ответил 200, но всё ещё висит на рынке
+    steam_api = make_steam_api(remove_status, active_ids=['5', '7'])
+    progress = []
+    engine = ListingCancelEngine(steam_api, max_concurrency=4, initial_concurrency=4)
+
+    report = engine.run(listings, on_progress=lambda listing, is_cancelled, _report: progress.append((listing.listingid, is_cancelled)))
+
+    assert len(progress) == 20 and ('5', False) in progress
+    assert (attempts['1'], attempts['2'], attempts['3'], attempts['5']) == (2, 2, 2, 1)
+    assert report.is_reconciled
+    assert sorted(listing.listingid for listing in report.still_active) == ['5', '7']
+    assert sorted(listing.listingid for listing in report.failed) == ['5', '7']
+    assert len(report.cancelled) == 18
+    assert steam_api.remove_my_listing_status.call_count == 23
+    bucket = steam_api.transport.get_bucket('market_removelisting')
+    assert (bucket.rate, bucket.capacity) == (engine.concurrency.limit * 2.0, engine.concurrency.limit)
+
+
+def test_cancel_stops_and_skips_remaining():
+    """Тест остановки: оставшиеся лоты пропускаются без запросов."""
+    listings = [MarketListingsListing({'listingid': str(num)}) for num in range(10)]
+    steam_api = make_steam_api(lambda listing, retry_policy=None: 200)
+    engine = ListingCancelEngine(steam_api, max_concurrency=1, initial_concurrency=1)
+
+    report = engine.run(listings, should_stop=lambda: steam_api.remove_my_listing_status.call_count >= 3, reconcile=False)
+
+    assert (len(report.cancelled), len(report.skipped), report.is_reconciled) == (3, 7, False)
+    assert [listing.listingid for listing in report.skipped] == [str(num) for num in range(3, 10)]
@@ -0,0 +1,28 @@
+from app.package.data_collectors.steam_api_utility import MarketMyHistoryManager
+from benchmarks.synthetic import make_market_history_pages
+
+
+def test_events_joined_with_listings_and_purchases():
+    """Тест связывания событий с лотами, покупками и ассетами по индексам."""
+    page = MarketMyHistoryManager(make_market_history_pages(events_count=20, page_size=20)[0])
+
+    event = page.parced_events[7]
+    assert event.listing.listingid == event.listingid
+    assert event.purchase.purchaseid == event.purchaseid
+    assert event.asset.id == event.listing.asset.id
+
+
+def test_add_next_pages_merges_like_full_sort():
+    """Тест слияния страниц: результат совпадает с устойчивой сортировкой всех событий."""
+    pages_json = make_market_history_pages(events_count=90, page_size=30)
+    # Перемешиваем время, чтобы страницы пересекались и внутри страницы были одинаковые значения
+    for page_num, page_json in enumerate(pages_json):
+        for num, event in enumerate(page_json['events']):
+            event['time_event'] = (num * 7 + page_num * 3) % 40
+
+    expected = sorted((event for page_json in pages_json for event in page_json['events']), key=lambda x: x['time_event'], reverse=True)
+    history = MarketMyHistoryManager(pages_json[0])
+    history.add_next_pages([MarketMyHistoryManager(page_json) for page_json in pages_json[1:]] + [None])
+
+    assert [event.listingid for event in history.parced_events] == [event['listingid'] for event in expected]
+    assert len(history.listings) == len(history.purchases) == 90
@@ -0,0 +1,126 @@
+from unittest.mock import Mock
+
+import pytest
+
+from app.database.sqlite_manager import SqliteDatabaseManager
+from app.package.data_collectors.market_history_archive import MarketHistoryArchive
+from app.package.data_collectors.steam_api_utility import MarketMyHistoryManager
+from benchmarks.synthetic import make_market_history_pages
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """Фикстура архива истории во временной базе."""
+    return MarketHistoryArchive(db_manager=SqliteDatabaseManager(db_name=str(tmp_path / 'history.db')))
+
+
+class FakeMarketHistory:
+    """Имитация /market/myhistory/render/: новые события появляются в начале списка."""
+
+    def __init__(self, events_count: int):
+        self.full_page = make_market_history_pages(events_count=events_count, page_size=events_count)[0]
+        for num, purchase in enumerate(self.full_page['purchases'].values()):
+            purchase['received_amount'] = 80 + num % 3
+        self.visible = 0
+        self.requested_starts = []
+        self.fail_starts = set()
+
+    def show(self, count: int):
+        # События в full_page идут от новых к старым, показываются count самых старых
+        self.visible = count
+
+    def fetch_page(self, start: int = 0, count: int = 500) -> MarketMyHistoryManager:
+        self.requested_starts.append(start)
+        if start in self.fail_starts: return None
+        events = self.full_page['events'][len(self.full_page['events']) - self.visible:]
+        page_json = dict(self.full_page, events=events[start:start + count], start=start, pagesize=count, total_count=len(events))
+        return MarketMyHistoryManager(page_json)
+
+
+def make_steam_api(server: FakeMarketHistory) -> Mock:
+    steam_api = Mock()
+    steam_api.account.steam_id = '76561198000000000'
+    steam_api.fetch_market_myhistory_page.side_effect = server.fetch_page
+    return steam_api
+
+
+def test_sync_fetches_only_new_pages(archive):
+    """Тест догрузки: при повторной синхронизации запрашиваются только страницы с новыми событиями."""
+    server = FakeMarketHistory(events_count=100)
+    server.show(70)
+    steam_api = make_steam_api(server)
+
+    assert archive.sync(steam_api, page_size=20) == 70
+    assert server.requested_starts == [0, 20, 40, 60]
+
+    server.show(95)
+    server.requested_starts.clear()
+    assert archive.sync(steam_api, page_size=20) == 25
+    assert server.requested_starts == [0, 20]
+
+    server.requested_starts.clear()
+    assert archive.sync(steam_api, page_size=20) == 0
+    assert server.requested_starts == [0]
+    assert archive.get_count('76561198000000000') == 95
+
+
+def test_sync_stops_at_known_page_and_backfill_loads_older(archive):
+    """Тест: sync не листает всю историю из-за расхождения с total_count, старые события догружает backfill."""
+    server = FakeMarketHistory(events_count=60)
+    server.show(60)
+    steam_api = make_steam_api(server)
+
+    assert archive.sync(steam_api, page_size=20, max_events=20) == 20
+    server.requested_starts.clear()
+    assert archive.sync(steam_api, page_size=20) == 0
+    assert server.requested_starts == [0]
+
+    assert archive.backfill(steam_api, page_size=20) == 40
+    assert server.requested_starts == [0, 20, 40]
+    assert archive.get_count('76561198000000000') == 60
+
+
+def test_backfill_continues_from_saved_cursor(archive):
+    """Тест: оборванная догрузка продолжается с сохранённого курсора, новые события сдвигают курсор."""
+    server = FakeMarketHistory(events_count=100)
+    server.show(60)
+    steam_api = make_steam_api(server)
+    assert archive.sync(steam_api, page_size=20, max_events=20) == 20
+    assert archive.get_backfill_start('76561198000000000') == 20
+
+    server.fail_starts = {40}
+    assert archive.backfill(steam_api, page_size=20) == 20
+    assert archive.get_backfill_start('76561198000000000') == 40
+
+    server.show(70)
+    server.fail_starts.clear()
+    assert archive.sync(steam_api, page_size=20) == 10
+    assert archive.get_backfill_start('76561198000000000') == 50
+
+    server.requested_starts.clear()
+    assert archive.backfill(steam_api, page_size=20) == 20
+    assert server.requested_starts == [50]
+    assert archive.get_backfill_start('76561198000000000') is None
+    assert archive.get_count('76561198000000000') == 70
+
+    server.requested_starts.clear()
+    assert archive.backfill(steam_api, page_size=20) == 0
+    assert server.requested_starts == []
+
+
+def test_archived_history_and_totals(archive):
+    """Тест чтения истории из архива и подсчёта выручки по предметам."""
+    server = FakeMarketHistory(events_count=30)
+    server.show(30)
+    archive.sync(make_steam_api(server), page_size=10)
+
+    history = archive.get_history('76561198000000000', limit=5, offset=2)
+    expected = server.fetch_page(start=2, count=5).parced_events
+    assert [event.get_key() for event in history.parced_events] == [event.get_key() for event in expected]
+    assert history.parced_events[0].get_price() == expected[0].get_price()
+    assert history.parced_events[0].get_item_name() == expected[0].get_item_name()
+
+    totals = archive.get_totals('76561198000000000')
+    assert len(totals) == 30
+    assert sum(item.sold_amount for item in totals) == 30
+    assert sum(item.get_profit() for item in totals) == sum(80 + num % 3 for num in range(30))
@@ -0,0 +1,79 @@
+import datetime
+from unittest.mock import Mock
+
+import pytest
+
+from app.database.sqlite_manager import SqliteDatabaseManager
+from app.package.data_collectors.market_price_history import MarketPriceHistory
+from app.package.data_collectors.steam_api_utility import MarketListenItem
+
+
+def make_item(hash_name: str, sell_price: int, sell_listings: int = 10) -> MarketListenItem:
+    return MarketListenItem({
+        'name': hash_name,
+        'hash_name': hash_name,
+        'sell_price': sell_price,
+        'sell_listings': sell_listings,
+        'sell_price_text': f'${sell_price / 100:.2f}',
+        'asset_description': {'appid': 730, 'classid': f'class_{hash_name}', 'market_hash_name': hash_name, 'tradable': 1},
+    })
+
+
+@pytest.fixture
+def price_history(tmp_path):
+    """Фикстура истории цен на временной базе данных."""
+    return MarketPriceHistory(db_manager=SqliteDatabaseManager(db_name=str(tmp_path / 'prices.db')))
+
+
+def test_record_and_history(price_history):
+    """Тест записи снимков и выборки истории предмета по времени."""
+    now = datetime.datetime.now().replace(microsecond=0)
+    price_history.record(730, [make_item('A', 100), make_item('B', 50)], time=now - datetime.timedelta(days=3))
+    price_history.record(730, [make_item('A', 120), make_item('B', 40)], time=now - datetime.timedelta(hours=12))
+    price_history.record(730, [make_item('A', 90)], time=now)
+
+    history = price_history.get_history(730, 'A')
+    assert [point.sell_price for point in history] == [100, 120, 90]
+    assert history[-1].time == now
+    assert [point.sell_price for point in price_history.get_history(730, 'A', days=1)] == [120, 90]
+    assert price_history.get_history(570, 'A') == []
+
+
+def test_latest_stats_and_deltas(price_history):
+    """Тест последних цен, статистики и изменения цены за период."""
+    now = datetime.datetime.now().replace(microsecond=0)
+    price_history.record(730, [make_item('A', 100), make_item('B', 50)], time=now - datetime.timedelta(days=3))
+    price_history.record(730, [make_item('A', 120), make_item('B', 40)], time=now - datetime.timedelta(hours=12))
+    price_history.record(730, [make_item('A', 90)], time=now)
+
+    latest = price_history.get_latest(730)
+    assert latest['A'].sell_price == 90
+    assert latest['B'].sell_price == 40
+
+    stats = price_history.get_stats(730, days=7)
+    assert (stats['A'].min_price, stats['A'].max_price, stats['A'].count) == (90, 120, 3)
+    assert stats['A'].avg_price == pytest.approx(310 / 3)
+    assert price_history.get_stats(730, days=1, hash_name='B')['B'].count == 1
+
+    assert price_history.get_deltas(730, days=7) == {'A': -10, 'B': -10}
+    assert price_history.get_deltas(730, days=1) == {'A': -30, 'B': 0}
+
+
+def test_fetch_market_listings_uses_cache(price_history):
+    """Тест: свежий снимок берётся из базы, устаревший загружается заново."""
+    steam_api = Mock()
+    steam_api.get_market_listings.return_value = [make_item('A', 100), MarketListenItem()]
+
+    items = price_history.fetch_market_listings(steam_api, 730, max_age=datetime.timedelta(minutes=10))
+    assert [item.hash_name for item in items] == ['A', '']
+    assert steam_api.get_market_listings.call_count == 1
+
+    cached = price_history.fetch_market_listings(steam_api, 730, max_age=datetime.timedelta(minutes=10))
+    assert steam_api.get_market_listings.call_count == 1
+    assert [item.hash_name for item in cached] == ['A']
+    assert cached[0].sell_price == 100
+    assert cached[0].asset_description.classid == 'class_A'
+    assert cached[0].asset_description.tradable
+
+    price_history.fetch_market_listings(steam_api, 730)
+    assert steam_api.get_market_listings.call_count == 2
@@ -0,0 +1,83 @@
+import datetime
+from unittest.mock import Mock
+
+import pytest
+
+from app.package.data_collectors.my_listings_cache import MyListingsCache
+from app.package.data_collectors.steam_api_utility import SteamAPIUtility, MarketListingsManager
+
+
+class FakeMarket:
+    def __init__(self, count: int):
+        # Как и в Steam, новые лоты идут первыми
+        self.listing_ids = [str(num) for num in range(count, 0, -1)]
+        self.requested_starts: list[int] = []
+
+    def get_page(self, start: int, count: int) -> MarketListingsManager:
+        self.requested_starts.append(start)
+        return MarketListingsManager({
+            'success': 1,
+            'start': start,
+            'pagesize': count,
+            'total_count': len(self.listing_ids),
+            'listings': [{'listingid': listing_id} for listing_id in self.listing_ids[start:start + count]],
+        })
+
+
+@pytest.fixture
+def market():
+    """Фикстура рынка с 250 лотами."""
+    return FakeMarket(250)
+
+
+@pytest.fixture
+def cache(market):
+    """Фикстура кэша лотов поверх заглушки SteamAPIUtility."""
+    steam_api = Mock()
+    steam_api.fetch_my_listings_page.side_effect = lambda start, count: market.get_page(start, count)
+    steam_api.fetch_my_listings.side_effect = lambda count, max_workers: SteamAPIUtility.fetch_my_listings(steam_api, count=count, max_workers=max_workers)
+    return MyListingsCache(steam_api, page_size=100)
+
+
+def get_ids(cache: MyListingsCache) -> list[str]:
+    return [listing.listingid for listing in cache.listings.listings]
+
+
+def test_incremental_refresh_loads_only_new_pages(cache, market):
+    """Тест догрузки только новых лотов без полной перезагрузки."""
+    cache.get_listings()
+    assert get_ids(cache) == market.listing_ids
+    assert sorted(market.requested_starts) == [0, 100, 200]
+
+    market.requested_starts.clear()
+    market.listing_ids = ['252', '251'] + market.listing_ids
+    cache.get_listings()
+
+    assert not cache.is_last_refresh_full
+    assert market.requested_starts == [0]
+    assert get_ids(cache) == market.listing_ids
+    assert cache.listings.total_count == 252
+
+
+def test_removed_listing_triggers_reload_unless_known(cache, market):
+    """Тест: лоты, снятые через приложение, не требуют перезагрузки, снятые на сайте — требуют."""
+    cache.get_listings()
+    cancelled = [listing for listing in cache.listings.listings if listing.listingid in ('10', '20')]
+    market.listing_ids = [listing_id for listing_id in market.listing_ids if listing_id not in ('10', '20')]
+    cache.remove(cancelled)
+    cache.get_listings()
+    assert not cache.is_last_refresh_full
+    assert get_ids(cache) == market.listing_ids
+
+    market.listing_ids.remove('30')
+    cache.get_listings()
+    assert cache.is_last_refresh_full
+    assert get_ids(cache) == market.listing_ids
+
+
+def test_expired_cache_reloads(cache, market):
+    """Тест полной перезагрузки устаревшего кэша."""
+    cache.get_listings()
+    cache.time_update -= datetime.timedelta(hours=1)
+    cache.get_listings()
+    assert cache.is_last_refresh_full
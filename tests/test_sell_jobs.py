@@ -0,0 +1,145 @@
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from app.database.sqlite_manager import SqliteDatabaseManager
+from app.package.data_collectors.sell_jobs import SellJobEngine, SellOrder, SellOrderStatus
+from app.package.data_collectors.steam_api_utility import InventoryItem, MarketListingsManager
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """Фикстура менеджера базы данных во временном файле."""
+    return SqliteDatabaseManager(db_name=str(tmp_path / 'sell.db'))
+
+
+@pytest.fixture
+def steam_api():
+    """Фикстура SteamAPIUtility-заглушки с аккаунтом."""
+    steam_api = Mock()
+    steam_api.account.steam_id = '76561198000000000'
+    return steam_api
+
+
+def make_orders(count: int, steam_id: str = '76561198000000000') -> list[SellOrder]:
+    return [
+        SellOrder.create(steam_id, InventoryItem({'appid': 730, 'contextid': '2', 'assetid': str(num), 'amount': '3'}), amount=2, price=100 + num, name=f'Item {num}')
+        for num in range(count)
+    ]
+
+
+def test_submit_runs_orders_and_journals_results(db_manager, steam_api):
+    """Тест выполнения заказов пулом потоков и записи результатов в журнал."""
+    in_flight, max_in_flight, lock = 0, 0, threading.Lock()
+
+    def sell_item(item, amount, price):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        threading.Event().wait(0.01)
+        with lock:
+            in_flight -= 1
+        return {'success': item.assetid != '3', 'message': 'refused'}
+
+    steam_api.sell_item.side_effect = sell_item
+    progress = []
+    snapshots = Mock()
+    engine = SellJobEngine(steam_api, max_workers=3, db_manager=db_manager, snapshots=snapshots)
+
+    stats = engine.submit(make_orders(10), on_progress=lambda order, _stats: progress.append((order.assetid, order.status)))
+
+    assert (stats.total, stats.done, stats.failed, stats.done_amount) == (10, 9, 1, 18)
+    assert stats.get_throughput() > 0
+    assert len(progress) == 10 and ('3', SellOrderStatus.FAILED) in progress
+    assert 1 < max_in_flight <= 3
+    assert steam_api.sell_item.call_count == 10
+    snapshots.invalidate.assert_called_once_with(steam_id='76561198000000000', appid='730', context_id='2')
+
+    rows = db_manager.sell_job_get(steam_id='76561198000000000', statuses=['done', 'failed'])
+    assert len(rows) == 10
+    failed = next(row for row in rows if row['status'] == 'failed')
+    assert (failed['assetid'], failed['amount'], failed['price'], failed['attempts']) == ('3', 2, 103, 1)
+    assert 'refused' in failed['result']
+
+
+def test_empty_response_is_not_retried(db_manager, steam_api):
+    """Тест: продажа без ответа не повторяется и помечается как UNCERTAIN."""
+    steam_api.sell_item.side_effect = [None, ConnectionError('timeout'), {'success': True}]
+    engine = SellJobEngine(steam_api, max_workers=1, db_manager=db_manager)
+
+    stats = engine.submit(make_orders(3))
+
+    assert (stats.done, stats.failed, stats.uncertain) == (1, 0, 2)
+    assert steam_api.sell_item.call_count == 3
+    rows = db_manager.sell_job_get(steam_id='76561198000000000', statuses=['done', 'uncertain'])
+    assert [(row['status'], row['attempts'], row['result']) for row in rows] == [('uncertain', 1, 'no response'), ('uncertain', 1, 'timeout'), ('done', 1, '{"success": true}')]
+
+
+def test_resume_reconciles_unknown_orders_with_listings(db_manager, steam_api, monkeypatch):
+    """Тест продолжения после перезапуска: RUNNING и UNCERTAIN сверяются с лотами, повторно выставляются только PENDING."""
+    engine = SellJobEngine(steam_api, db_manager=db_manager)
+    orders = engine.enqueue(make_orders(5))
+    db_manager.sell_job_update(job_ids=[orders[0].order_id], data={'status': 'done'})
+    db_manager.sell_job_update(job_ids=[orders[1].order_id], data={'status': 'running'})
+    db_manager.sell_job_update(job_ids=[orders[2].order_id], data={'status': 'uncertain'})
+    db_manager.sell_job_update(job_ids=[orders[3].order_id], data={'status': 'running'})
+    assert engine.get_unfinished_orders() == []
+
+    # Заказ 1 выставлен с тем же assetid, заказ 2 — частичный стак с новым assetid
+    steam_api.fetch_my_listings.return_value = MarketListingsManager({'success': 1, 'listings': [
+        {'listingid': '100', 'original_amount_listed': 2, 'original_price_per_unit': 101, 'asset': {'appid': 730, 'id': '1', 'name': 'Item 1'}},
+        {'listingid': '200', 'original_amount_listed': 2, 'original_price_per_unit': 102, 'asset': {'appid': 730, 'id': '999', 'name': 'Item 2'}},
+    ]})
+    steam_api.sell_item.return_value = {'success': True}
+    monkeypatch.setattr(SellJobEngine, 'time_started', SellJobEngine.time_started + 10)
+    snapshots = Mock()
+    restarted_engine = SellJobEngine(steam_api, db_manager=SqliteDatabaseManager(db_name=db_manager.db_name), snapshots=snapshots)
+    stats = restarted_engine.resume()
+
+    assert stats.total == 1 and stats.done == 1
+    assert [call.args[0].assetid for call in steam_api.sell_item.call_args_list] == ['4']
+    rows = {row['assetid']: (row['status'], row['result']) for row in db_manager.sell_job_get(steam_id='76561198000000000', statuses=['done', 'failed'])}
+    assert rows['1'] == ('done', '{"listingid": "100"}') and rows['2'] == ('done', '{"listingid": "200"}')
+    assert rows['3'] == ('failed', 'not found in listings')
+    assert restarted_engine.get_unfinished_orders() == []
+    snapshots.invalidate.assert_called_with(steam_id='76561198000000000', appid='730', context_id='2')
+
+
+def test_resume_keeps_unknown_orders_without_listings(db_manager, steam_api, monkeypatch):
+    """Тест: без списка лотов заказы с неизвестным исходом не отправляются и остаются незавершёнными."""
+    engine = SellJobEngine(steam_api, db_manager=db_manager)
+    orders = engine.enqueue(make_orders(1))
+    db_manager.sell_job_update(job_ids=[orders[0].order_id], data={'status': 'uncertain'})
+    monkeypatch.setattr(SellJobEngine, 'time_started', SellJobEngine.time_started + 10)
+    steam_api.fetch_my_listings.return_value = None
+
+    stats = engine.resume()
+
+    assert stats.total == 0 and steam_api.sell_item.call_count == 0
+    assert [order.status for order in engine.get_unfinished_orders()] == [SellOrderStatus.UNCERTAIN]
+
+
+def test_should_stop_cancels_remaining(db_manager, steam_api):
+    """Тест отмены оставшихся заказов при закрытии диалога."""
+    steam_api.sell_item.return_value = {'success': True}
+    engine = SellJobEngine(steam_api, max_workers=1, db_manager=db_manager)
+
+    stats = engine.submit(make_orders(5), should_stop=lambda: steam_api.sell_item.call_count >= 2)
+
+    assert (stats.done, stats.cancelled) == (2, 3)
+    assert engine.get_unfinished_orders() == []
+    assert len(db_manager.sell_job_get(steam_id='76561198000000000', statuses=['cancelled'])) == 3
+
+
+def test_failed_orders_keep_snapshot(db_manager, steam_api):
+    """Тест: если ни один предмет не выставлен, снимок инвентаря не сбрасывается."""
+    steam_api.sell_item.return_value = {'success': False}
+    snapshots = Mock()
+    engine = SellJobEngine(steam_api, max_workers=1, db_manager=db_manager, snapshots=snapshots)
+
+    stats = engine.submit(make_orders(2))
+
+    assert stats.failed == 2
+    snapshots.invalidate.assert_not_called()
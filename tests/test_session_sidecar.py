@@ -0,0 +1,85 @@
+import sys
+import textwrap
+
+import pytest
+
+from app.core import Account
+from app.package.steam_session.manager_session import CreateSteamSession
+from app.package.steam_session.session_sidecar import SessionSidecar
+
+FAKE_SIDECAR = textwrap.dedent('''
+    import json
+    import sys
+
+    def send(message):
+        sys.stdout.write(json.dumps(message) + '\\n')
+        sys.stdout.flush()
+
+    send({'event': 'ready'})
+    for line in sys.stdin:
+        request = json.loads(line)
+        request_id = request['id']
+        if request['type'] == 'qr':
+            send({'id': request_id, 'event': 'qr_url', 'url': 'https://s.team/q/1/2'})
+            send({'id': request_id, 'event': 'authenticated', 'account_name': 'qr_user', 'steam_id': '1', 'refresh_token': 'rt', 'cookies': []})
+        elif request['type'] == 'refresh':
+            if request['refresh_token'] == 'bad':
+                send({'id': request_id, 'event': 'error', 'message': 'Invalid token'})
+                continue
+            cookie = f'steamLoginSecure={request["refresh_token"]}; Path=/; Secure; Domain=steamcommunity.com'
+            send({'id': request_id, 'event': 'authenticated', 'steam_id': request['refresh_token'][-1], 'refresh_token': request['refresh_token'], 'cookies': [cookie]})
+        elif request['type'] == 'cancel':
+            send({'id': request_id, 'event': 'error', 'message': 'Cancelled'})
+        elif request['type'] == 'exit':
+            sys.exit(1)
+''')
+
+
+@pytest.fixture
+def sidecar(tmp_path):
+    """Фикстура sidecar на Python-заглушке с тем же протоколом JSON-строк."""
+    script_path = tmp_path / 'fake_sidecar.py'
+    script_path.write_text(FAKE_SIDECAR)
+    sidecar = SessionSidecar(command=[sys.executable, str(script_path)], start_timeout=10)
+    yield sidecar
+    sidecar.stop()
+
+
+def test_requests_share_one_process_and_get_events(sidecar):
+    """Тест промежуточных и финальных событий нескольких запросов в одном процессе."""
+    events = []
+    qr_request = sidecar.request('qr', on_event=lambda message: events.append(message['event']))
+    refresh_request = sidecar.request('refresh', refresh_token='token_7')
+
+    assert qr_request.wait(5)['account_name'] == 'qr_user'
+    assert events == ['qr_url', 'authenticated']
+    assert refresh_request.wait(5)['steam_id'] == '7'
+    assert sidecar.is_running()
+
+
+def test_cancel_and_restart_after_exit(sidecar):
+    """Тест отмены зависшего запроса и перезапуска процесса после его падения."""
+    hanging = sidecar.request('login', account_name='user', password='pass')
+    assert hanging.wait(0.2) is None
+    sidecar.cancel(hanging)
+    assert hanging.wait(5)['message'] == 'Cancelled'
+
+    pending = sidecar.request('hang')
+    sidecar.request('exit')
+    assert pending.wait(5)['message'] == 'session_sidecar stopped'
+    assert sidecar.request('refresh', refresh_token='token_3').wait(5)['event'] == 'authenticated'
+
+
+def test_refresh_accounts_in_bulk(sidecar):
+    """Тест одновременного обновления cookies нескольких аккаунтов."""
+    manager = CreateSteamSession(sidecar=sidecar, timeout=5)
+    accounts = []
+    for refresh_token in ['token_1', 'bad', 'token_2']:
+        account = Account()
+        account.refresh_token = refresh_token
+        accounts.append(account)
+
+    refreshed = manager.refresh_accounts(accounts)
+
+    assert [account.steam_id for account in refreshed] == ['1', '2']
+    assert refreshed[0].session.cookies.get('steamLoginSecure', domain='steamcommunity.com') == 'token_1'
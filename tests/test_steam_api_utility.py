@@ -0,0 +1,153 @@
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from app.package.data_collectors.steam_api_utility import SteamAPIUtility
+from app.package.data_collectors.steam_transport import SteamTransport, RetryPolicy
+
+
+def make_inventory_page(assetids: list[str], last_assetid: str = None) -> dict:
+    page = {
+        'success': 1,
+        'descriptions': [{'appid': 730, 'classid': '1', 'instanceid': '0', 'name': 'Item'}],
+        'assets': [{'appid': 730, 'contextid': '2', 'assetid': assetid, 'classid': '1', 'instanceid': '0', 'amount': '1'} for assetid in assetids],
+    }
+    if last_assetid:
+        page.update({'more_items': 1, 'last_assetid': last_assetid})
+    return page
+
+
+def make_response(json_data: dict = None, status_code: int = 200) -> Mock:
+    response = Mock(ok=200 <= status_code < 400, status_code=status_code, headers={})
+    response.json.return_value = json_data
+    return response
+
+
+@pytest.fixture
+def steam_api():
+    """Фикстура SteamAPIUtility с аккаунтом-заглушкой."""
+    account = Mock()
+    account.steam_id = '76561198000000000'
+    account.is_alive_session.return_value = True
+    transport = SteamTransport(rates={name: (1000.0, 1000) for name in SteamTransport.default_rates}, retry_policy=RetryPolicy(max_attempts=1))
+    return SteamAPIUtility(account, transport=transport)
+
+
+def test_iter_inventory_pages_follows_last_assetid(steam_api):
+    """Тест постраничной загрузки инвентаря по last_assetid."""
+    steam_api.account.session.get.side_effect = [
+        make_response(make_inventory_page(['1', '2'], last_assetid='2')),
+        make_response(make_inventory_page(['3'])),
+    ]
+
+    pages = list(steam_api.iter_inventory_pages(appid=730))
+
+    assert [len(page.assets) for page in pages] == [2, 1]
+    urls = [call.kwargs['url'] for call in steam_api.account.session.get.call_args_list]
+    assert 'start_assetid' not in urls[0]
+    assert urls[1].endswith('&start_assetid=2')
+
+
+def test_iter_inventory_pages_relies_on_transport_retries(steam_api):
+    """Тест повтора страницы только силами transport: 429, 5xx и сетевая ошибка не умножают попытки."""
+    steam_api.transport = SteamTransport(rates={name: (1000.0, 1000) for name in SteamTransport.default_rates}, retry_policy=RetryPolicy(max_attempts=3, backoff_base=0.001))
+    steam_api.account.session.get.side_effect = [
+        make_response(make_inventory_page(['1'], last_assetid='1')),
+        requests.ConnectionError('timeout'),
+        make_response(status_code=429),
+        make_response(make_inventory_page(['2'])),
+    ]
+
+    inventory = steam_api.get_inventory_items(appid=730)
+
+    assert [i.assetid for i in inventory.inventory[0].items] == ['1', '2']
+    assert inventory.is_complete()
+    urls = [call.kwargs['url'] for call in steam_api.account.session.get.call_args_list]
+    assert all(url.endswith('&start_assetid=1') for url in urls[1:])
+
+
+def test_iter_inventory_pages_marks_partial_inventory(steam_api):
+    """Тест пометки неполного инвентаря, когда страница не загрузилась после повторов transport."""
+    steam_api.account.session.get.side_effect = [
+        make_response(make_inventory_page(['1'], last_assetid='1')),
+        make_response(status_code=502),
+    ]
+
+    inventory = steam_api.get_inventory_items(appid=730)
+
+    assert inventory.get_amount_items(only_tradable=False) == 1
+    assert not inventory.is_complete()
+    assert steam_api.account.session.get.call_count == 2
+
+
+def test_iter_inventory_pages_stops_on_private_inventory(steam_api):
+    """Тест остановки без повторов при закрытом инвентаре."""
+    steam_api.account.session.get.return_value = make_response(status_code=403)
+    assert steam_api.get_inventory_items(appid=730) is None
+    assert steam_api.account.session.get.call_count == 1
+
+
+def make_search_page(start: int, total_count: int = 450, success: int = 1) -> dict:
+    results = [{'name': f'Item {start + i}', 'hash_name': f'Item {start + i}', 'asset_description': {'appid': 730, 'market_hash_name': f'Item {start + i}'}} for i in range(2)]
+    return {'success': success, 'start': start, 'total_count': total_count, 'results': results}
+
+
+def test_get_market_listings_parallel_pages_in_order(steam_api):
+    """Тест параллельной загрузки страниц поиска с сохранением порядка и повтором неудачной страницы."""
+    failed_once = set()
+
+    def get(url, params, **kwargs):
+        start = params['start']
+        if start == 200 and start not in failed_once:
+            failed_once.add(start)
+            return make_response(make_search_page(start, success=0))
+        return make_response(make_search_page(start))
+
+    steam_api.account.session.get.side_effect = get
+    pages = []
+    items = steam_api.get_market_listings(appid=730, max_workers=3, on_page=pages.append)
+
+    assert [item.name for item in items][::2] == [f'Item {start}' for start in range(0, 450, 100)]
+    assert len(pages) == 5
+    assert steam_api.account.session.get.call_count == 6
+
+
+def test_get_market_listings_respects_max_items_load(steam_api):
+    """Тест ограничения количества загружаемых страниц."""
+    steam_api.account.session.get.side_effect = lambda url, params, **kwargs: make_response(make_search_page(params['start'], total_count=5000))
+    items = steam_api.get_market_listings(appid=730, max_items_load=300)
+    assert len(items) == 6
+    assert sorted(call.kwargs['params']['start'] for call in steam_api.account.session.get.call_args_list) == [0, 100, 200]
+
+
+def make_mylistings_page(listing_ids: list[str], start: int, count: int) -> dict:
+    return {
+        'success': 1,
+        'start': start,
+        'pagesize': count,
+        'total_count': len(listing_ids),
+        'listings': [{'listingid': listing_id} for listing_id in listing_ids[start:start + count]],
+    }
+
+
+def test_fetch_my_listings_parallel_pages(steam_api):
+    """Тест параллельной загрузки своих лотов с настраиваемым размером страницы."""
+    listing_ids = [str(num) for num in range(250)]
+    steam_api.account.session.get.side_effect = lambda url, params, **kwargs: make_response(make_mylistings_page(listing_ids, params['start'], params['count']))
+
+    listings = steam_api.fetch_my_listings(count=50, max_workers=3)
+
+    assert [listing.listingid for listing in listings.listings] == listing_ids
+    assert sorted(call.kwargs['params']['start'] for call in steam_api.account.session.get.call_args_list) == [0, 50, 100, 150, 200]
+
+
+def test_post_web_api_retries_once_on_auth_failure(steam_api):
+    """Тест повтора запроса Web API со свежим токеном после 401."""
+    steam_api.account.get_steam_web_token.side_effect = ['old_token', 'new_token']
+    with patch.object(steam_api.transport, 'post', side_effect=[make_response(status_code=401), make_response({'response': {}})]) as post_mock:
+        response = steam_api.post_web_api('https://api.steampowered.com/IInventoryService/CombineItemStacks/v1/', data={'appid': 730})
+
+    assert response.status_code == 200
+    steam_api.account.invalidate_steam_web_token.assert_called_once_with('old_token')
+    assert [call.kwargs['data']['access_token'] for call in post_mock.call_args_list] == ['old_token', 'new_token']
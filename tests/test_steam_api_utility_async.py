@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from app.package.data_collectors.histogram_cache import HistogramCache
+from app.package.data_collectors.steam_api_utility import InventoryItem
+from app.package.data_collectors.steam_api_utility_async import AsyncSteamAPIUtility
+from app.package.data_collectors.steam_transport import SteamTransport, RetryPolicy
+
+
+class FakeResponse:
+    def __init__(self, data: dict | str = None, status: int = 200):
+        self.status = status
+        self.headers = {}
+        self.__text = data if isinstance(data, str) else json.dumps(data or {})
+
+    async def text(self) -> str:
+        return self.__text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession:
+    def __init__(self, handler: callable):
+        self.handler = handler
+        self.calls: list[tuple[str, str, dict]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def request(self, method: str, url: str, **kwargs):
+        self.calls.append((method, url, kwargs))
+        session = self
+
+        class Context:
+            async def __aenter__(self):
+                session.in_flight += 1
+                session.max_in_flight = max(session.max_in_flight, session.in_flight)
+                await asyncio.sleep(0.01)
+                session.in_flight -= 1
+                return session.handler(method, url, kwargs)
+
+            async def __aexit__(self, *args):
+                pass
+
+        return Context()
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def account():
+    """Фикстура аккаунта с requests-сессией и кошельком."""
+    account = Mock()
+    account.steam_id = '76561198000000000'
+    account.is_alive_session.return_value = True
+    account.session = requests.Session()
+    account.session.cookies.set('steamLoginSecure', 'token', domain='steamcommunity.com')
+    account.wallet_country = 'KZ'
+    account.wallet_currency = 37
+    return account
+
+
+def run_with_session(account, handler, coroutine_factory, max_concurrency: int = 4):
+    async def run():
+        transport = SteamTransport(rates={name: (1000.0, 1000) for name in SteamTransport.default_rates}, retry_policy=RetryPolicy(max_attempts=2, backoff_base=0.001))
+        async with AsyncSteamAPIUtility(account, max_concurrency=max_concurrency, transport=transport, histogram_cache=HistogramCache()) as steam_api:
+            cookies = {cookie.key: cookie.value for cookie in steam_api._AsyncSteamAPIUtility__session.cookie_jar}
+            await steam_api._AsyncSteamAPIUtility__session.close()
+            fake_session = FakeSession(handler)
+            steam_api._AsyncSteamAPIUtility__session = fake_session
+            return await coroutine_factory(steam_api), fake_session, cookies
+
+    return asyncio.run(run())
+
+
+def test_fetch_histograms_bounded_concurrency(account):
+    """Тест параллельной загрузки гистограмм с ограничением одновременных запросов."""
+    def handler(method, url, kwargs):
+        item_nameid = int(url.split('item_nameid=')[1])
+        return FakeResponse({'success': 1, 'highest_buy_order': str(item_nameid)})
+
+    items = [(730, f'Item {i}') for i in range(30)] + [(730, 'Item 0')]
+    results = []
+    with patch('app.package.data_collectors.steam_api_utility_async.sql_manager') as sql_manager:
+        sql_manager.item_nameid_missing_get.return_value = []
+        sql_manager.item_nameid_get.side_effect = lambda appid, market_hash_name: int(market_hash_name.split()[1]) + 1
+        histograms, session, cookies = run_with_session(
+            account, handler,
+            lambda steam_api: steam_api.fetch_market_itemordershistograms(items, on_result=lambda *args: results.append(args)),
+        )
+
+    assert cookies == {'steamLoginSecure': 'token'}
+    assert len(histograms) == len(results) == len(session.calls) == 30
+    assert histograms[(730, 'Item 5')].highest_buy_order == '6'
+    assert 1 < session.max_in_flight <= 4
+
+
+def test_session_check_runs_outside_event_loop(account):
+    """Тест того, что блокирующая проверка сессии не выполняется в потоке event loop."""
+    loop_thread = threading.get_ident()
+    check_threads = []
+    account.is_alive_session.side_effect = lambda *args: check_threads.append(threading.get_ident()) or False
+
+    result, session, _ = run_with_session(account, lambda *args: FakeResponse({}), lambda steam_api: steam_api.fetch_my_listings())
+
+    assert result is None and session.calls == []
+    assert check_threads and loop_thread not in check_threads
+
+
+def test_sell_item_not_retried_on_server_error(account):
+    """Тест того, что продажа не повторяется после 5xx."""
+    def handler(method, url, kwargs):
+        if url.endswith('/market/'): return FakeResponse('g_sessionID = "abc";')
+        return FakeResponse(status=502)
+
+    item = InventoryItem({'appid': 730, 'contextid': '2', 'assetid': '10', 'amount': '1'})
+    status, session, _ = run_with_session(account, handler, lambda steam_api: steam_api.sell_item(item, amount=1, price=100))
+
+    assert status is None
+    assert [call[0] for call in session.calls] == ['get', 'post']
+    assert session.calls[1][2]['data']['sessionid'] == 'abc'
+
+
+def test_fetch_my_listings_merges_pages_in_order(account):
+    """Тест загрузки страниц лотов и слияния по порядку."""
+    def handler(method, url, kwargs):
+        start = kwargs['params']['start']
+        listing = {'listingid': str(start), 'asset': {'id': str(start)}}
+        return FakeResponse({'success': 1, 'start': start, 'pagesize': 10, 'total_count': 35, 'listings': [listing], 'assets': {}})
+
+    listings, session, _ = run_with_session(account, handler, lambda steam_api: steam_api.fetch_my_listings(count=10))
+
+    assert [listing.listingid for listing in listings.listings] == ['0', '10', '20', '30']
+    assert len(session.calls) == 4
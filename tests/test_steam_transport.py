@@ -0,0 +1,121 @@
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from app.package.data_collectors.steam_transport import SteamTransport, RetryPolicy, TokenBucket
+from tests.test_steam_api_utility import make_response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """Фикстура с подменой времени в модуле транспорта."""
+    fake_clock = FakeClock()
+    with patch('app.package.data_collectors.steam_transport.time', fake_clock):
+        yield fake_clock
+
+
+@pytest.fixture
+def transport(clock):
+    """Фикстура транспорта без реальных задержек."""
+    return SteamTransport(rates={'market': (1000.0, 1000)}, retry_policy=RetryPolicy(max_attempts=3))
+
+
+def test_get_endpoint():
+    """Тест определения эндпоинта по URL."""
+    assert SteamTransport.get_endpoint('https://steamcommunity.com/market/mylistings') == 'market'
+    assert SteamTransport.get_endpoint('https://steamcommunity.com/inventory/1/730/2?count=2000') == 'inventory'
+    assert SteamTransport.get_endpoint('https://steamcommunity.com/tradeoffer/new/partnerinventory/') == 'inventory'
+    assert SteamTransport.get_endpoint('https://api.steampowered.com/IInventoryService/CombineItemStacks/v1/') == 'inventory_service'
+    assert SteamTransport.get_endpoint('https://steamcommunity.com/market/removelisting/123') == 'market_removelisting'
+    assert SteamTransport.get_endpoint('https://steamcommunity.com/my/') == 'default'
+
+
+def test_get_retries_429_and_5xx(transport, clock):
+    """Тест повтора GET после 429 и 5xx."""
+    too_many_requests = make_response(status_code=429)
+    too_many_requests.headers = {'Retry-After': '7'}
+    session = Mock()
+    session.get.side_effect = [too_many_requests, make_response(status_code=502), make_response({'success': 1})]
+
+    response = transport.get(session, 'https://steamcommunity.com/market/mylistings')
+
+    assert response.json() == {'success': 1}
+    assert session.get.call_count == 3
+    assert session.get.call_args.kwargs['timeout'] == transport.timeout
+    assert clock.now >= 7
+
+
+def test_post_retries_only_429(transport):
+    """Тест того, что POST не повторяется после 5xx и сетевых ошибок."""
+    session = Mock()
+    session.post.side_effect = [make_response(status_code=429), make_response(status_code=500)]
+    assert transport.post(session, 'https://steamcommunity.com/market/sellitem/').status_code == 500
+    assert session.post.call_count == 2
+
+    session.post.side_effect = requests.ConnectionError('reset')
+    with pytest.raises(requests.ConnectionError):
+        transport.post(session, 'https://steamcommunity.com/market/sellitem/')
+
+
+def test_retry_policy_override_returns_429(transport):
+    """Тест политики повторов для одного вызова: 429 возвращается без повторов и паузы корзины."""
+    session = Mock()
+    session.post.return_value = make_response(status_code=429)
+    response = transport.post(session, 'https://steamcommunity.com/market/removelisting/1', retry_policy=RetryPolicy(max_attempts=1))
+    assert response.status_code == 429
+    assert session.post.call_count == 1
+
+
+def test_get_returns_last_response_after_attempts(transport):
+    """Тест возврата последнего ответа после исчерпания попыток."""
+    session = Mock()
+    session.get.return_value = make_response(status_code=503)
+    assert transport.get(session, 'https://steamcommunity.com/market/mylistings').status_code == 503
+    assert session.get.call_count == transport.retry_policy.max_attempts
+
+
+def test_response_listener_gets_final_response(transport):
+    """Тест передачи итогового ответа слушателю сессии и отсутствия сильной ссылки на него."""
+    session, listener = Mock(), Mock()
+    session.get.side_effect = [make_response(status_code=503), make_response(status_code=200)]
+    transport.set_response_listener(session, listener)
+
+    transport.get(session, 'https://steamcommunity.com/market/mylistings')
+    assert [call.args[0].status_code for call in listener.on_response.call_args_list] == [200]
+
+    del listener
+    session.get.side_effect = None
+    session.get.return_value = make_response(status_code=200)
+    transport.get(session, 'https://steamcommunity.com/market/mylistings')
+
+
+def test_token_bucket_waits_for_token(clock):
+    """Тест ожидания токена при исчерпании ёмкости."""
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.now == pytest.approx(0.2)
+
+    bucket.pause(5)
+    bucket.acquire()
+    assert clock.now >= 5.2
+
+    start = clock.now
+    bucket.set_rate(1.0, capacity=1)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.now - start == pytest.approx(1.0, abs=0.1)